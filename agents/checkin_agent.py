@@ -7,6 +7,8 @@ from dotenv import load_dotenv
 import datetime
 import json
 
+from analytics.online_stats import ADVERSE_DIRECTION, load_checkin_stats, score
+
 # Load environment variables
 load_dotenv()
 
@@ -29,27 +31,38 @@ class CheckInAgent(BaseTool):
         ..., 
         description="User's self-reported well-being metrics"
     )
-    previous_checkins: Optional[List[Dict]] = Field(
-        default=[],
-        description="Previous check-in data for trend analysis"
+    user_id: Optional[int] = Field(
+        default=None,
+        description="User whose running check-in statistics provide the baseline for trend analysis"
     )
 
     def _analyze_trends(self) -> Dict:
         """
-        Analyzes trends in well-being metrics over time
+        Compares the current metrics with the user's running statistics
+        (analytics.online_stats), so no check-in history is loaded
         """
-        if not self.previous_checkins:
-            return {"trend": "insufficient_data"}
-            
-        recent_mood_avg = sum(check['metrics']['mood'] for check in self.previous_checkins[-7:]) / min(7, len(self.previous_checkins))
         current_mood = self.metrics['mood']
-        
+        stats = load_checkin_stats(self.user_id) if self.user_id is not None else {}
+        mood_stats = stats.get('mood')
+        if not mood_stats or mood_stats.ewma is None:
+            return {"mood_trend": "insufficient_data", "current_mood": current_mood, "alerts": {}}
+
+        recent_mood_avg = mood_stats.ewma
+        alerts = {}
+        for metric in ADVERSE_DIRECTION:
+            if self.metrics.get(metric) is None or metric not in stats:
+                continue
+            _, alert = score(stats[metric], metric, float(self.metrics[metric]))
+            if alert:
+                alerts[metric] = alert
+
         trend = {
             "mood_trend": "improving" if current_mood > recent_mood_avg + 1 
                          else "declining" if current_mood < recent_mood_avg - 1 
                          else "stable",
             "recent_mood_avg": round(recent_mood_avg, 1),
-            "current_mood": current_mood
+            "current_mood": current_mood,
+            "alerts": alerts
         }
         
         return trend
@@ -73,6 +86,7 @@ class CheckInAgent(BaseTool):
         - Social Connection: {self.metrics.get('social_connection', 'Not reported')}/10
         
         Trend: {trends['mood_trend']}
+        Flagged metrics: {trends.get('alerts') or 'None'}
         Notes: {self.metrics.get('notes', 'No notes provided')}
         
         Provide recommendations in this JSON format:
@@ -209,20 +223,8 @@ if __name__ == "__main__":
         "notes": "Feeling okay but a bit overwhelmed with work"
     }
     
-    # Previous check-ins for trend analysis
-    previous_checkins = [
-        {
-            "timestamp": "2024-01-30T10:00:00",
-            "metrics": {"mood": 7, "energy": 8, "stress": 3}
-        },
-        {
-            "timestamp": "2024-01-29T10:00:00",
-            "metrics": {"mood": 5, "energy": 6, "stress": 6}
-        }
-    ]
-    
-    # Run check-in
-    agent = CheckInAgent(metrics=metrics, previous_checkins=previous_checkins)
+    # Run check-in against user 1's running statistics
+    agent = CheckInAgent(metrics=metrics, user_id=1)
     result = agent.run()
     
     # Print results in a readable format
@@ -41,6 +41,15 @@ class HabitTrackerAgent(BaseTool):
         description="Habit information including name, logs, etc."
     )
 
+    def _get_streak(self, habit: Dict) -> int:
+        """
+        Returns the streak precomputed on the habits row when the caller
+        provides it, and only falls back to replaying the logs otherwise
+        """
+        if habit.get('current_streak') is not None:
+            return habit['current_streak']
+        return self._calculate_streak(habit.get('logs', []), habit['frequency'])
+
     def _calculate_streak(self, logs: List[HabitLog], frequency: str) -> int:
         """
         Calculates the current streak taking into account habit frequency
@@ -48,12 +57,16 @@ class HabitTrackerAgent(BaseTool):
         if not logs:
             return 0
 
-        logs.sort(key=lambda x: x['date'], reverse=True)
+        # Parse each date once, without reordering the caller's list
+        dated_logs = sorted(
+            ((datetime.date.fromisoformat(log['date']), log) for log in logs),
+            key=lambda item: item[0],
+            reverse=True
+        )
         streak = 0
-        last_date = datetime.datetime.strptime(logs[0]['date'], "%Y-%m-%d")
+        last_date = dated_logs[0][0]
         
-        for log in logs:
-            log_date = datetime.datetime.strptime(log['date'], "%Y-%m-%-d")
+        for log_date, log in dated_logs:
             date_diff = (last_date - log_date).days
             
             if frequency == "daily" and date_diff > 1:
@@ -109,23 +122,35 @@ class HabitTrackerAgent(BaseTool):
 
     def _analyze_progress(self, habit: Dict) -> Dict:
         """
-        Analyzes habit progress and generates insights
+        Analyzes habit progress and generates insights. Uses the counts in
+        habit['progress'] when the caller precomputed them in SQL
+        (see habits.progress), and only walks habit['logs'] otherwise
         """
-        total_logs = len(habit['logs'])
-        completed_logs = sum(1 for log in habit['logs'] if log['completed'])
-        
+        progress = habit.get('progress')
+        if progress:
+            total_logs = progress['total_days']
+            completed_logs = progress['completed_days']
+            recent_completed = progress['recent_completed']
+            previous_completed = progress['previous_completed']
+            streak = progress['current_streak']
+        else:
+            logs = habit.get('logs', [])
+            total_logs = len(logs)
+            completed_logs = sum(1 for log in logs if log['completed'])
+            recent_completed = sum(1 for log in logs[-7:] if log['completed'])
+            previous_completed = sum(1 for log in logs[-14:-7] if log['completed'])
+            streak = self._get_streak(habit)
+
         if total_logs == 0:
             completion_rate = 0
         else:
             completion_rate = (completed_logs / total_logs) * 100
-            
-        streak = self._calculate_streak(habit['logs'], habit['frequency'])
-        
+
         # Calculate trend (improving, declining, or stable)
         if total_logs >= 7:
-            recent_rate = sum(1 for log in habit['logs'][-7:] if log['completed']) / 7 * 100
-            older_rate = sum(1 for log in habit['logs'][-14:-7] if log['completed']) / 7 * 100
-            
+            recent_rate = recent_completed / 7 * 100
+            older_rate = previous_completed / 7 * 100
+
             if recent_rate > older_rate + 10:
                 trend = "improving"
             elif recent_rate < older_rate - 10:
@@ -195,7 +220,7 @@ class HabitTrackerAgent(BaseTool):
             if self.action == "log":
                 # Log new habit entry
                 today = datetime.datetime.now().strftime("%Y-%m-%d")
-                streak = self._calculate_streak(habit['logs'], habit['frequency'])
+                streak = self._get_streak(habit)
                 motivation = self._generate_motivation(habit, streak)
                 
                 return {
@@ -6,6 +6,11 @@ import os
 from dotenv import load_dotenv
 from typing import List, Dict
 import datetime
+import time
+
+from classifiers.distilled import local_predictions
+from classifiers.labels import record_labels
+from classifiers.tiered import local_insight, record_tier, route
 
 # Load environment variables
 load_dotenv()
@@ -19,6 +24,9 @@ class JournalingAgent(BaseTool):
     journal_entry: str = Field(
         ..., description="User's journal entry to analyze for sentiment and themes."
     )
+    depth: bool = Field(
+        default=False, description="Always use the full LLM analysis, even in tiered mode."
+    )
 
     def _analyze_emotions(self) -> Dict:
         """
@@ -72,6 +80,8 @@ class JournalingAgent(BaseTool):
             )
             
             themes = [theme.strip() for theme in response.choices[0].message.content.split(",")]
+            # Harvested as training data for the local classifier
+            record_labels("themes", self.journal_entry, themes, "gpt-4-turbo-preview")
             return themes
             
         except Exception as e:
@@ -117,14 +127,25 @@ class JournalingAgent(BaseTool):
         Analyzes journal entry for sentiment, themes, and generates insights.
         """
         try:
+            started = time.perf_counter()
+            # In tiered mode, simple entries are answered without the LLM
+            decision = route(self.journal_entry, self.depth)
+
             # Perform emotion analysis
             emotion_data = self._analyze_emotions()
             
-            # Extract themes
-            themes = self._extract_themes()
-            
-            # Generate insights
-            insights = self._generate_insights(emotion_data, themes)
+            if decision.tier == "local":
+                theme_scores = None
+                themes = decision.analysis.themes
+                insights = local_insight(emotion_data["mood"], themes, emotion_data["sentiment_score"])
+            else:
+                # Extract themes, locally when a distilled classifier is selected
+                theme_scores = local_predictions("themes", self.journal_entry)
+                themes = list(theme_scores) if theme_scores is not None else self._extract_themes()
+                
+                # Generate insights
+                insights = self._generate_insights(emotion_data, themes)
+            record_tier(decision, time.perf_counter() - started)
             
             # Add timestamp
             timestamp = datetime.datetime.now().isoformat()
@@ -133,6 +154,15 @@ class JournalingAgent(BaseTool):
                 "timestamp": timestamp,
                 "emotion_analysis": emotion_data,
                 "themes": themes,
+                "classification": {
+                    "backend": "local" if theme_scores is not None or decision.tier == "local" else "llm",
+                    "confidence": {"themes": theme_scores} if theme_scores is not None else {}
+                },
+                "analysis": {
+                    "tier": decision.tier,
+                    "reason": decision.reason,
+                    "confidence": decision.analysis.confidences if decision.analysis else None
+                },
                 "insights": insights,
                 "entry_length": len(self.journal_entry.split())
             }
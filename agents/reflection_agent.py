@@ -5,6 +5,12 @@ from openai import OpenAI
 import os
 from dotenv import load_dotenv
 import json
+import time
+
+from classifiers.distilled import local_predictions
+from classifiers.labels import record_labels
+from classifiers.tiered import LocalAnalysis, local_guidance, local_summary, record_tier, route
+from memory.context import build_context
 
 # Load environment variables
 load_dotenv()
@@ -13,7 +19,9 @@ class ReflectionInsights(BaseModel):
     """Structure for reflection analysis results"""
     themes: List[str]
     cognitive_biases: List[str]
-    emotional_state: Dict[str, float]
+    emotional_state: Dict[str, float]  # emotion -> intensity, 0 to 1
+    # Emotions a distilled classifier picked, with its probability for each; they have no intensity
+    emotion_confidence: Dict[str, float] = {}
     follow_up_questions: List[str]
     reframing_suggestions: Optional[List[str]]
     summary: str
@@ -31,6 +39,26 @@ class ReflectionAgent(BaseTool):
         default=[],
         description="Previous reflection data for context and pattern recognition"
     )
+    user_id: Optional[int] = Field(
+        default=None,
+        description="User whose past entries, reflections and habits are retrieved as context"
+    )
+    depth: bool = Field(
+        default=False,
+        description="Always use the full LLM analysis, even in tiered mode"
+    )
+
+    def _memory_context(self) -> str:
+        """
+        Relevant history for the prompts, packed into a fixed token budget
+        and cached until the user adds new data
+        """
+        if self.user_id is None:
+            return ""
+        try:
+            return build_context(self.user_id, self.user_input).text
+        except Exception:
+            return ""
 
     def _analyze_cognitive_biases(self) -> List[str]:
         """
@@ -63,11 +91,13 @@ class ReflectionAgent(BaseTool):
             )
             
             biases = response.choices[0].message.content.split(",")
-            return [b.strip() for b in biases if b.strip().lower() != "none detected"]
+            biases = [b.strip() for b in biases if b.strip().lower() != "none detected"]
+            record_labels("cognitive_biases", self.user_input, biases, "gpt-4-turbo-preview")
+            return biases
         except Exception:
             return []
 
-    def _extract_themes_and_emotions(self) -> Dict:
+    def _extract_themes_and_emotions(self, history: str = "") -> Dict:
         """
         Extracts main themes and emotional content from the reflection
         """
@@ -78,6 +108,9 @@ class ReflectionAgent(BaseTool):
         
         Text: {self.user_input}
         
+        Relevant history (for recurring themes):
+        {history or 'None available'}
+        
         Respond in JSON format:
         {{
             "themes": ["2-3 main themes"],
@@ -92,11 +125,15 @@ class ReflectionAgent(BaseTool):
                 temperature=0.3
             )
             
-            return json.loads(response.choices[0].message.content)
+            analysis = json.loads(response.choices[0].message.content)
+            # Harvested as training data for the local classifiers
+            record_labels("themes", self.user_input, analysis.get("themes", []), "gpt-4-turbo-preview")
+            record_labels("emotions", self.user_input, analysis.get("emotions", {}), "gpt-4-turbo-preview")
+            return analysis
         except Exception:
             return {"themes": [], "emotions": {}}
 
-    def _generate_questions_and_reframing(self, biases: List[str], themes: List[str]) -> Dict:
+    def _generate_questions_and_reframing(self, biases: List[str], themes: List[str], history: str = "") -> Dict:
         """
         Generates insightful questions and reframing suggestions
         """
@@ -109,6 +146,8 @@ class ReflectionAgent(BaseTool):
         - Text: {self.user_input}
         - Identified Biases: {', '.join(biases) if biases else 'None detected'}
         - Main Themes: {', '.join(themes)}
+        - Relevant History:
+        {history or 'None available'}
         
         Respond in JSON format:
         {{
@@ -121,6 +160,7 @@ class ReflectionAgent(BaseTool):
         - Use "what" and "how" more than "why"
         - Reframing should be gentle and supportive
         - Focus on growth and possibility
+        - Where the history shows a pattern, connect to it gently
         """
         
         try:
@@ -148,7 +188,7 @@ class ReflectionAgent(BaseTool):
         
         Insights:
         - Themes: {', '.join(insights.themes)}
-        - Emotions: {insights.emotional_state}
+        - Emotions: {insights.emotional_state or ', '.join(insights.emotion_confidence) or 'None detected'}
         - Biases: {', '.join(insights.cognitive_biases) if insights.cognitive_biases else 'None detected'}
         
         Original Text: {self.user_input}
@@ -172,40 +212,100 @@ class ReflectionAgent(BaseTool):
         except Exception:
             return "Thank you for sharing your reflection. I notice some important themes and patterns that we can explore further."
 
+    def _local_insights(self, analysis: LocalAnalysis) -> ReflectionInsights:
+        """
+        Insights from the local tier alone: TextBlob, noun phrases and bias
+        keywords, with templated questions and summary
+        """
+        guidance = local_guidance(analysis.biases, analysis.themes)
+        return ReflectionInsights(
+            themes=analysis.themes,
+            cognitive_biases=analysis.biases,
+            emotional_state=analysis.emotions,
+            emotion_confidence=analysis.emotion_confidence,
+            follow_up_questions=guidance["questions"],
+            reframing_suggestions=guidance["reframing"],
+            summary=local_summary(analysis.themes, analysis.biases, analysis.polarity)
+        )
+
+    def _llm_insights(self, confidence: Dict) -> ReflectionInsights:
+        """
+        The full analysis; classification steps with a selected distilled
+        model skip their LLM call
+        """
+        # Analyze cognitive biases
+        if "cognitive_biases" in confidence:
+            biases = list(confidence["cognitive_biases"])
+        else:
+            biases = self._analyze_cognitive_biases()
+        
+        # Retrieve bounded context from past entries and habits
+        history = self._memory_context()
+        
+        # Extract themes and emotions; classified emotions have probabilities, not intensities
+        emotion_confidence = {}
+        if "themes" in confidence and "emotions" in confidence:
+            content_analysis = {"themes": list(confidence["themes"]), "emotions": {}}
+            emotion_confidence = confidence["emotions"]
+        else:
+            content_analysis = self._extract_themes_and_emotions(history)
+        
+        # Generate questions and reframing suggestions
+        guidance = self._generate_questions_and_reframing(
+            biases=biases,
+            themes=content_analysis.get('themes', []),
+            history=history
+        )
+        
+        # Create insights object
+        insights = ReflectionInsights(
+            themes=content_analysis.get('themes', []),
+            cognitive_biases=biases,
+            emotional_state=content_analysis.get('emotions', {}),
+            emotion_confidence=emotion_confidence,
+            follow_up_questions=guidance.get('questions', []),
+            reframing_suggestions=guidance.get('reframing', []),
+            summary=""  # Will be filled below
+        )
+        
+        # Generate summary
+        insights.summary = self._generate_summary(insights)
+        return insights
+
     def run(self) -> Dict:
         """
         Main function to process reflection and generate insights
         """
         try:
-            # Analyze cognitive biases
-            biases = self._analyze_cognitive_biases()
-            
-            # Extract themes and emotions
-            content_analysis = self._extract_themes_and_emotions()
-            
-            # Generate questions and reframing suggestions
-            guidance = self._generate_questions_and_reframing(
-                biases=biases,
-                themes=content_analysis.get('themes', [])
-            )
-            
-            # Create insights object
-            insights = ReflectionInsights(
-                themes=content_analysis.get('themes', []),
-                cognitive_biases=biases,
-                emotional_state=content_analysis.get('emotions', {}),
-                follow_up_questions=guidance.get('questions', []),
-                reframing_suggestions=guidance.get('reframing', []),
-                summary=""  # Will be filled below
-            )
-            
-            # Generate summary
-            insights.summary = self._generate_summary(insights)
+            started = time.perf_counter()
+            # In tiered mode, simple reflections are answered without the LLM
+            decision = route(self.user_input, self.depth)
+
+            confidence = {}
+            if decision.tier == "local":
+                insights = self._local_insights(decision.analysis)
+            else:
+                # Classified locally when a distilled classifier is selected and trained
+                confidence = {
+                    task: scores for task in ("cognitive_biases", "themes", "emotions")
+                    if (scores := local_predictions(task, self.user_input)) is not None
+                }
+                insights = self._llm_insights(confidence)
+            record_tier(decision, time.perf_counter() - started)
             
             # Format response
             return {
                 "status": "success",
                 "insights": insights.dict(),
+                "classification": {
+                    "backend": "local" if confidence or decision.tier == "local" else "llm",
+                    "confidence": confidence
+                },
+                "analysis": {
+                    "tier": decision.tier,
+                    "reason": decision.reason,
+                    "confidence": decision.analysis.confidences if decision.analysis else None
+                },
                 "reflection_text": self.user_input
             }
             
@@ -216,7 +316,6 @@ class ReflectionAgent(BaseTool):
                 "reflection_text": self.user_input
             }
 
-
 if __name__ == "__main__":
     # Example usage
     test_reflections = [
@@ -258,5 +357,7 @@ if __name__ == "__main__":
         print("\n📊 Emotional Insights:")
         for emotion, intensity in insights["emotional_state"].items():
             print(f"• {emotion}: {int(intensity * 100)}%")
+        for emotion, probability in insights["emotion_confidence"].items():
+            print(f"• {emotion} ({int(probability * 100)}% confidence)")
     else:
         print(f"Error: {result['message']}")
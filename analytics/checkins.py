@@ -0,0 +1,120 @@
+from typing import Dict, Optional
+from sqlalchemy import distinct, func, select
+from sqlalchemy.orm import Session
+import numpy as np
+import pandas as pd
+
+from database.models import CheckIn, DailyUserStat, HabitLog
+
+CHECKIN_METRICS = ("mood", "energy", "stress")
+ROLLING_WINDOW = 7  # check-ins
+EWMA_SPAN = 7
+SERIES_POINTS = 90
+
+def load_check_ins(db: Session, user_id: int) -> pd.DataFrame:
+    """Loads a user's check-ins as columnar arrays, indexed by time."""
+    result = db.execute(
+        select(CheckIn.created_at, CheckIn.mood, CheckIn.energy, CheckIn.stress)
+        .where(CheckIn.user_id == user_id)
+        .order_by(CheckIn.created_at)
+    )
+    rows = result.all()
+    frame = pd.DataFrame(rows, columns=list(result.keys()))
+    frame["created_at"] = pd.to_datetime(frame["created_at"])
+    frame[list(CHECKIN_METRICS)] = frame[list(CHECKIN_METRICS)].astype("float64")
+    return frame.set_index("created_at")
+
+def load_daily_context(db: Session, user_id: int) -> pd.DataFrame:
+    """Daily habit completions and mean journal sentiment, for cross-correlation."""
+    habits = db.execute(
+        select(HabitLog.logged_on.label("day"), func.count(distinct(HabitLog.habit_id)).label("habit_completions"))
+        .where(HabitLog.user_id == user_id, HabitLog.completed)
+        .group_by(HabitLog.logged_on)
+    ).all()
+    sentiment = db.execute(
+        select(
+            DailyUserStat.day,
+            (DailyUserStat.value_sum / DailyUserStat.count).label("journal_sentiment")
+        )
+        .where(DailyUserStat.user_id == user_id, DailyUserStat.metric == "sentiment")
+    ).all()
+
+    habit_frame = pd.DataFrame(habits, columns=["day", "habit_completions"])
+    sentiment_frame = pd.DataFrame(sentiment, columns=["day", "journal_sentiment"])
+    for frame in (habit_frame, sentiment_frame):
+        frame["day"] = pd.to_datetime(frame["day"])
+    context = habit_frame.set_index("day").join(sentiment_frame.set_index("day"), how="outer")
+    return context.astype("float64")
+
+def _clean(value):
+    """Converts NumPy scalars and NaN into JSON-friendly values."""
+    if value is None:
+        return None
+    value = float(value)
+    return None if np.isnan(value) else round(value, 3)
+
+def _matrix(frame: pd.DataFrame, rows, columns) -> Dict:
+    return {row: {column: _clean(frame.at[row, column]) for column in columns} for row in rows}
+
+def analyze_check_ins(
+    check_ins: pd.DataFrame,
+    daily_context: Optional[pd.DataFrame] = None,
+    points: int = SERIES_POINTS
+) -> Dict:
+    """
+    Computes rolling means, EWMA, volatility and cross-correlations over
+    every metric column at once.
+    """
+    metrics = list(CHECKIN_METRICS)
+    if check_ins.empty:
+        return {"count": 0, "trend": "insufficient_data"}
+
+    values = check_ins[metrics]
+    rolling = values.rolling(ROLLING_WINDOW, min_periods=1).mean()
+    ewma = values.ewm(span=EWMA_SPAN, adjust=False).mean()
+    volatility = values.rolling(ROLLING_WINDOW, min_periods=2).std()
+    correlation = values.corr()
+
+    # Habit completion and journal sentiment are daily signals
+    daily = values.resample("D").mean().dropna(how="all")
+    context_correlation = {}
+    if daily_context is not None and not daily_context.empty:
+        joined = daily.join(daily_context, how="left")
+        joined["habit_completions"] = joined["habit_completions"].fillna(0.0)
+        context_columns = list(daily_context.columns)
+        context_correlation = _matrix(joined.corr(), context_columns, metrics)
+
+    latest = values.iloc[-1]
+    # Not iloc[-points:], which returns everything for points=0
+    series = pd.concat(
+        {"rolling_mean": rolling, "ewma": ewma, "volatility": volatility}, axis=1
+    ).iloc[max(len(values) - points, 0):]
+
+    return {
+        "count": int(len(values)),
+        "first_check_in": values.index[0].isoformat(),
+        "last_check_in": values.index[-1].isoformat(),
+        "latest": {
+            metric: {
+                "value": _clean(latest[metric]),
+                "rolling_mean": _clean(rolling[metric].iloc[-1]),
+                "ewma": _clean(ewma[metric].iloc[-1]),
+                "volatility": _clean(volatility[metric].iloc[-1]),
+                "mean": _clean(values[metric].mean()),
+            }
+            for metric in metrics
+        },
+        "correlation": _matrix(correlation, metrics, metrics),
+        "context_correlation": context_correlation,
+        "series": [
+            {
+                "timestamp": timestamp.isoformat(),
+                **{
+                    f"{metric}_{kind}": _clean(row[(kind, metric)])
+                    for kind in ("rolling_mean", "ewma", "volatility")
+                    for metric in metrics
+                }
+            }
+            for timestamp, row in series.iterrows()
+        ],
+    }
@@ -0,0 +1,181 @@
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import DateTime, String, delete, func, insert, literal, select
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+import argparse
+import json
+import math
+
+from database.database import engine
+from database.hooks import on_insert
+from database.models import Base, DailyUserStat
+from database.upsert import upsert
+
+# Source column for each rolled-up metric, per table
+DAILY_METRICS = {
+    "journal_entries": {"sentiment": "sentiment_score"},
+    "check_ins": {"mood": "mood", "energy": "energy", "stress": "stress"},
+}
+ALL_METRICS = tuple(metric for metrics in DAILY_METRICS.values() for metric in metrics)
+
+RollupKey = Tuple[int, date, str]
+
+def _as_day(value) -> date:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.fromisoformat(str(value)).date()
+
+def aggregate_rows(table_name: str, rows: Iterable[Dict]) -> Dict[RollupKey, Dict]:
+    """Folds inserted rows into per (user, day, metric) partial aggregates."""
+    aggregates: Dict[RollupKey, Dict] = {}
+    for row in rows:
+        if row.get("user_id") is None:
+            continue
+        day = _as_day(row.get("created_at") or datetime.utcnow())
+        for metric, column in DAILY_METRICS[table_name].items():
+            value = row.get(column)
+            if value is None:
+                continue
+            value = float(value)
+            key = (row["user_id"], day, metric)
+            current = aggregates.get(key)
+            if current is None:
+                aggregates[key] = {
+                    "count": 1, "value_sum": value, "value_sum_sq": value * value,
+                    "value_min": value, "value_max": value
+                }
+            else:
+                current["count"] += 1
+                current["value_sum"] += value
+                current["value_sum_sq"] += value * value
+                current["value_min"] = min(current["value_min"], value)
+                current["value_max"] = max(current["value_max"], value)
+    return aggregates
+
+def apply_aggregates(connection: Connection, aggregates: Dict[RollupKey, Dict]) -> None:
+    """Merges partial aggregates into daily_user_stats with one upsert."""
+    if not aggregates:
+        return
+
+    table = DailyUserStat.__table__
+    if connection.dialect.name == "sqlite":
+        least, greatest = func.min, func.max
+    else:
+        least, greatest = func.least, func.greatest
+
+    now = datetime.utcnow()
+    upsert(
+        connection, table,
+        [
+            {"user_id": user_id, "day": day, "metric": metric, "updated_at": now, **values}
+            for (user_id, day, metric), values in aggregates.items()
+        ],
+        index_elements=("user_id", "day", "metric"),
+        update=lambda excluded: {
+            "count": table.c.count + excluded.count,
+            "value_sum": table.c.value_sum + excluded.value_sum,
+            "value_sum_sq": table.c.value_sum_sq + excluded.value_sum_sq,
+            "value_min": least(table.c.value_min, excluded.value_min),
+            "value_max": greatest(table.c.value_max, excluded.value_max),
+            "updated_at": now,
+        }
+    )
+
+@on_insert("journal_entries")
+def record_journal_entries(connection: Connection, rows: List[Dict]) -> None:
+    apply_aggregates(connection, aggregate_rows("journal_entries", rows))
+
+@on_insert("check_ins")
+def record_check_ins(connection: Connection, rows: List[Dict]) -> None:
+    apply_aggregates(connection, aggregate_rows("check_ins", rows))
+
+def rebuild_daily_stats(bind: Engine = engine, user_id: Optional[int] = None) -> int:
+    """Recomputes the rollups from the source tables, for one user or everyone."""
+    rollups = DailyUserStat.__table__
+    now = datetime.utcnow()
+    with bind.begin() as connection:
+        clear = delete(rollups)
+        if user_id is not None:
+            clear = clear.where(rollups.c.user_id == user_id)
+        connection.execute(clear)
+
+        for table_name, metrics in DAILY_METRICS.items():
+            source = Base.metadata.tables[table_name]
+            day = func.date(source.c.created_at)
+            for metric, column in metrics.items():
+                value = source.c[column]
+                query = (
+                    select(
+                        source.c.user_id,
+                        day,
+                        literal(metric, String),
+                        func.count(value),
+                        func.sum(value),
+                        func.sum(value * value),
+                        func.min(value),
+                        func.max(value),
+                        literal(now, DateTime),
+                    )
+                    .where(value.isnot(None), source.c.user_id.isnot(None))
+                    .group_by(source.c.user_id, day)
+                )
+                if user_id is not None:
+                    query = query.where(source.c.user_id == user_id)
+                connection.execute(insert(rollups).from_select(
+                    ["user_id", "day", "metric", "count", "value_sum", "value_sum_sq",
+                     "value_min", "value_max", "updated_at"],
+                    query
+                ))
+
+        count_query = select(func.count()).select_from(rollups)
+        if user_id is not None:
+            count_query = count_query.where(rollups.c.user_id == user_id)
+        return connection.execute(count_query).scalar()
+
+def summarize(stat: DailyUserStat) -> Dict:
+    """Derives mean and standard deviation from a rollup row."""
+    mean = stat.value_sum / stat.count if stat.count else None
+    variance = max(stat.value_sum_sq / stat.count - mean * mean, 0.0) if stat.count else None
+    return {
+        "count": stat.count,
+        "mean": round(mean, 3) if mean is not None else None,
+        "stddev": round(math.sqrt(variance), 3) if variance is not None else None,
+        "min": stat.value_min,
+        "max": stat.value_max,
+    }
+
+def get_daily_stats(
+    db: Session,
+    user_id: int,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    metrics: Optional[List[str]] = None
+) -> List[Dict]:
+    """Reads a user's rollups for a date range, one item per day."""
+    query = select(DailyUserStat).where(DailyUserStat.user_id == user_id)
+    if start:
+        query = query.where(DailyUserStat.day >= start)
+    if end:
+        query = query.where(DailyUserStat.day <= end)
+    if metrics:
+        query = query.where(DailyUserStat.metric.in_(metrics))
+
+    days: Dict[date, Dict] = {}
+    for stat in db.execute(query.order_by(DailyUserStat.day, DailyUserStat.metric)).scalars():
+        days.setdefault(stat.day, {})[stat.metric] = summarize(stat)
+    return [{"day": day, "metrics": values} for day, values in days.items()]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintain the daily_user_stats rollup table")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    rebuild = subcommands.add_parser("rebuild", help="Recompute rollups from journal entries and check-ins")
+    rebuild.add_argument("--user-id", type=int, help="Only rebuild this user's rollups")
+    args = parser.parse_args()
+
+    if args.command == "rebuild":
+        rows = rebuild_daily_stats(user_id=args.user_id)
+        print(json.dumps({"status": "success", "rollup_rows": rows}))
@@ -0,0 +1,220 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import delete, select
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+import argparse
+import json
+import logging
+import math
+
+from database.database import SessionLocal, engine
+from database.hooks import on_insert
+from database.models import CheckIn, CheckInStat
+from database.upsert import upsert
+
+logger = logging.getLogger(__name__)
+
+# Which way a metric moves when things get worse
+ADVERSE_DIRECTION = {"mood": -1, "energy": -1, "stress": 1}
+# Values that are flagged as distress regardless of the user's baseline
+DISTRESS_THRESHOLDS = {"mood": 2, "stress": 9}
+
+EWMA_SPAN = 7  # check-ins
+MIN_BASELINE = 5  # check-ins before change detection kicks in
+MIN_STDDEV = 0.5  # floor so a very steady user is not flagged for a one-point move
+CUSUM_SLACK = 0.5  # standard deviations tolerated per check-in
+CUSUM_THRESHOLD = 4.0  # standard deviations accumulated before flagging a shift
+SUDDEN_DROP = 3.0  # standard deviations in a single check-in
+
+@dataclass(frozen=True)
+class OnlineState:
+    """Running statistics for one user and metric."""
+    count: int = 0
+    mean: float = 0.0
+    m2: float = 0.0
+    ewma: Optional[float] = None
+    cusum: float = 0.0
+    last_value: Optional[float] = None
+    alert: Optional[str] = None
+
+    @property
+    def stddev(self) -> Optional[float]:
+        return math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else None
+
+def score(state: OnlineState, metric: str, value: float) -> Tuple[float, Optional[str]]:
+    """
+    CUSUM statistic and alert for a new value against the baseline in state,
+    without folding the value in.
+    """
+    threshold = DISTRESS_THRESHOLDS.get(metric)
+    direction = ADVERSE_DIRECTION[metric]
+    distress = threshold is not None and direction * (value - threshold) >= 0
+
+    if state.count < MIN_BASELINE:
+        return 0.0, "distress" if distress else None
+
+    deviation = direction * (value - state.mean) / max(state.stddev or 0.0, MIN_STDDEV)
+    cusum = max(0.0, state.cusum + deviation - CUSUM_SLACK)
+    if distress:
+        return cusum, "distress"
+    if cusum > CUSUM_THRESHOLD or deviation >= SUDDEN_DROP:
+        return cusum, "change"
+    return cusum, None
+
+def fold(state: OnlineState, metric: str, value: float) -> OnlineState:
+    """Applies one check-in value in O(1): Welford mean/variance, EWMA and CUSUM."""
+    cusum, alert = score(state, metric, value)
+    if alert == "change":
+        cusum = 0.0  # restart accumulation once a shift has been flagged
+
+    count = state.count + 1
+    delta = value - state.mean
+    mean = state.mean + delta / count
+    alpha = 2 / (EWMA_SPAN + 1)
+    ewma = value if state.ewma is None else alpha * value + (1 - alpha) * state.ewma
+    return OnlineState(
+        count=count,
+        mean=mean,
+        m2=state.m2 + delta * (value - mean),
+        ewma=ewma,
+        cusum=cusum,
+        last_value=value,
+        alert=alert,
+    )
+
+def _state(stat) -> OnlineState:
+    return OnlineState(
+        count=stat.count or 0,
+        mean=stat.mean or 0.0,
+        m2=stat.m2 or 0.0,
+        ewma=stat.ewma,
+        cusum=stat.cusum or 0.0,
+        last_value=stat.last_value,
+        alert=stat.alert,
+    )
+
+def _save(connection: Connection, states: Dict[Tuple[int, str], OnlineState], alerted: Dict) -> None:
+    now = datetime.utcnow()
+    columns = ("count", "mean", "m2", "ewma", "cusum", "last_value", "alert", "alerted_at", "updated_at")
+    upsert(
+        connection, CheckInStat.__table__,
+        [
+            {
+                "user_id": user_id,
+                "metric": metric,
+                "count": state.count,
+                "mean": state.mean,
+                "m2": state.m2,
+                "ewma": state.ewma,
+                "cusum": state.cusum,
+                "last_value": state.last_value,
+                "alert": state.alert,
+                "alerted_at": alerted.get((user_id, metric)),
+                "updated_at": now,
+            }
+            for (user_id, metric), state in states.items()
+        ],
+        index_elements=("user_id", "metric"),
+        update=lambda excluded: {column: excluded[column] for column in columns}
+    )
+
+@on_insert("check_ins")
+def update_checkin_stats(connection: Connection, rows: List[Dict]) -> None:
+    """Folds new check-ins into each user's running statistics and flags drops."""
+    rows = [row for row in rows if row.get("user_id") is not None]
+    if not rows:
+        return
+
+    table = CheckInStat.__table__
+    query = select(table).where(table.c.user_id.in_({row["user_id"] for row in rows}))
+    if connection.dialect.name == "postgresql":
+        query = query.with_for_update()
+
+    states: Dict[Tuple[int, str], OnlineState] = {}
+    alerted: Dict[Tuple[int, str], Optional[datetime]] = {}
+    for stat in connection.execute(query):
+        states[(stat.user_id, stat.metric)] = _state(stat)
+        alerted[(stat.user_id, stat.metric)] = stat.alerted_at
+
+    for row in sorted(rows, key=lambda r: r.get("created_at") or datetime.utcnow()):
+        for metric in ADVERSE_DIRECTION:
+            if row.get(metric) is None:
+                continue
+            key = (row["user_id"], metric)
+            state = fold(states.get(key, OnlineState()), metric, float(row[metric]))
+            states[key] = state
+            if state.alert:
+                alerted[key] = row.get("created_at") or datetime.utcnow()
+                logger.warning(
+                    "Check-in %s for user %s: %s %s (baseline mean %.1f)",
+                    state.alert, row["user_id"], metric, state.last_value, state.mean
+                )
+
+    _save(connection, states, alerted)
+
+def get_checkin_stats(db: Session, user_id: int) -> Dict[str, OnlineState]:
+    """A user's running statistics, keyed by metric."""
+    stats = db.execute(select(CheckInStat).where(CheckInStat.user_id == user_id)).scalars()
+    return {stat.metric: _state(stat) for stat in stats}
+
+def load_checkin_stats(user_id: int, session_factory=SessionLocal) -> Dict[str, OnlineState]:
+    """get_checkin_stats for callers without a request session, such as agents."""
+    with session_factory() as db:
+        return get_checkin_stats(db, user_id)
+
+def check_in_alerts(db: Session, user_id: int) -> Dict[str, str]:
+    """Metrics flagged by the user's latest check-in."""
+    return {metric: state.alert for metric, state in get_checkin_stats(db, user_id).items() if state.alert}
+
+def summarize(state: OnlineState) -> Dict:
+    return {
+        "count": state.count,
+        "mean": round(state.mean, 3) if state.count else None,
+        "stddev": round(state.stddev, 3) if state.stddev is not None else None,
+        "ewma": round(state.ewma, 3) if state.ewma is not None else None,
+        "cusum": round(state.cusum, 3),
+        "last_value": state.last_value,
+        "alert": state.alert,
+    }
+
+def rebuild_checkin_stats(bind: Engine = engine, user_id: Optional[int] = None) -> int:
+    """Replays check-ins in order to recompute the running statistics, for one user or everyone."""
+    table = CheckInStat.__table__
+    query = select(CheckIn.user_id, CheckIn.mood, CheckIn.energy, CheckIn.stress, CheckIn.created_at) \
+        .where(CheckIn.user_id.isnot(None)) \
+        .order_by(CheckIn.user_id, CheckIn.created_at, CheckIn.id)
+    clear = delete(table)
+    if user_id is not None:
+        query = query.where(CheckIn.user_id == user_id)
+        clear = clear.where(table.c.user_id == user_id)
+
+    states: Dict[Tuple[int, str], OnlineState] = {}
+    alerted: Dict[Tuple[int, str], Optional[datetime]] = {}
+    with bind.begin() as connection:
+        connection.execute(clear)
+        for row in connection.execution_options(yield_per=1000).execute(query):
+            for metric in ADVERSE_DIRECTION:
+                value = getattr(row, metric)
+                if value is None:
+                    continue
+                key = (row.user_id, metric)
+                states[key] = fold(states.get(key, OnlineState()), metric, float(value))
+                if states[key].alert:
+                    alerted[key] = row.created_at
+        if states:
+            _save(connection, states, alerted)
+    return len(states)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintain the checkin_stats online statistics table")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    rebuild = subcommands.add_parser("rebuild", help="Replay check-ins to recompute running statistics")
+    rebuild.add_argument("--user-id", type=int, help="Only rebuild this user's statistics")
+    args = parser.parse_args()
+
+    if args.command == "rebuild":
+        rows = rebuild_checkin_stats(user_id=args.user_id)
+        print(json.dumps({"status": "success", "stat_rows": rows}))
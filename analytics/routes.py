@@ -0,0 +1,67 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.orm import Session
+from datetime import date
+from typing import Optional
+
+from database.database import get_db
+from database.models import User
+from analytics.daily_stats import ALL_METRICS, get_daily_stats
+from analytics.checkins import SERIES_POINTS, analyze_check_ins, load_check_ins, load_daily_context
+from analytics.online_stats import get_checkin_stats, summarize
+
+router = APIRouter()
+
+@router.get("/stats/daily")
+def read_daily_stats(
+    user_id: int,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    metrics: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """Daily mood, energy, stress and sentiment aggregates, read from the rollup table."""
+    user = db.query(User).filter(User.id == user_id).first()
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    selected = [metric.strip() for metric in metrics.split(",")] if metrics else None
+    unknown = [metric for metric in selected or [] if metric not in ALL_METRICS]
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown metrics: {', '.join(unknown)}"
+        )
+
+    return {
+        "user_id": user.id,
+        "days": get_daily_stats(db, user.id, start, end, selected)
+    }
+
+@router.get("/stats/check-ins")
+def read_check_in_analytics(
+    user_id: int,
+    points: int = SERIES_POINTS,
+    db: Session = Depends(get_db)
+):
+    """Rolling means, EWMA, volatility and cross-correlations for a user's check-ins."""
+    user = db.query(User).filter(User.id == user_id).first()
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    check_ins = load_check_ins(db, user.id)
+    return {
+        "user_id": user.id,
+        **analyze_check_ins(check_ins, load_daily_context(db, user.id), points=max(points, 0))
+    }
+
+@router.get("/stats/check-ins/online")
+def read_online_check_in_stats(user_id: int, db: Session = Depends(get_db)):
+    """Running mean, variance, EWMA and change-detection state, updated on every check-in."""
+    user = db.query(User).filter(User.id == user_id).first()
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    return {
+        "user_id": user.id,
+        "metrics": {metric: summarize(state) for metric, state in get_checkin_stats(db, user.id).items()}
+    }
@@ -0,0 +1,64 @@
+"""
+Benchmark for the vectorized check-in analytics.
+
+Run from the repository root:
+    python -m benchmarks.checkin_analytics
+"""
+from datetime import datetime
+import time
+
+import numpy as np
+import pandas as pd
+
+from analytics.checkins import CHECKIN_METRICS, analyze_check_ins
+
+SIZES = (1_000, 10_000, 100_000)
+REPEATS = 5
+
+def synthetic_check_ins(count: int, seed: int = 7) -> pd.DataFrame:
+    """Roughly two check-ins a day with correlated mood, energy and stress."""
+    rng = np.random.default_rng(seed)
+    start = datetime(2020, 1, 1)
+    timestamps = pd.to_datetime(start) + pd.to_timedelta(np.sort(rng.uniform(0, count / 2, count)), unit="D")
+    mood = np.clip(np.round(6 + np.cumsum(rng.normal(0, 0.3, count)) % 4 + rng.normal(0, 1, count)), 1, 10)
+    energy = np.clip(np.round(mood + rng.normal(0, 1.5, count)), 1, 10)
+    stress = np.clip(np.round(11 - mood + rng.normal(0, 2, count)), 1, 10)
+    frame = pd.DataFrame({"mood": mood, "energy": energy, "stress": stress}, index=timestamps)
+    frame.index.name = "created_at"
+    return frame
+
+def synthetic_context(check_ins: pd.DataFrame, seed: int = 11) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    days = check_ins.index.normalize().unique()
+    return pd.DataFrame({
+        "habit_completions": rng.integers(0, 4, len(days)).astype("float64"),
+        "journal_sentiment": rng.uniform(-1, 1, len(days)),
+    }, index=days)
+
+def python_baseline(check_ins: pd.DataFrame) -> dict:
+    """What _analyze_trends-style code costs: a Python loop over dicts."""
+    records = check_ins.reset_index().to_dict("records")
+    window = []
+    for record in records:
+        window.append(record)
+        window = window[-7:]
+        averages = {m: sum(r[m] for r in window) / len(window) for m in CHECKIN_METRICS}
+    return averages
+
+def timed(fn, *args) -> float:
+    best = float("inf")
+    for _ in range(REPEATS):
+        started = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+if __name__ == "__main__":
+    print(f"{'check-ins':>10} {'vectorized (ms)':>16} {'python rolling mean only (ms)':>30}")
+    for size in SIZES:
+        check_ins = synthetic_check_ins(size)
+        context = synthetic_context(check_ins)
+        vectorized = timed(analyze_check_ins, check_ins, context)
+        baseline = timed(python_baseline, check_ins)
+        print(f"{size:>10} {vectorized * 1000:>16.1f} {baseline * 1000:>30.1f}")
@@ -0,0 +1,90 @@
+"""
+Benchmark: statements and time to build the dashboard for users with small
+and large histories, against touching the User relationships lazily. Fails
+if load_dashboard issues more than DASHBOARD_QUERIES statements.
+
+Run from the repository root:
+    python -m benchmarks.dashboard_queries [--entries 5000] [--habits 30]
+"""
+import argparse
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from dashboard.service import DASHBOARD_QUERIES, load_dashboard
+from database.models import Base, CheckIn, Habit, HabitLog, JournalEntry, User
+from habits.streaks import streak_summary
+
+class StatementCounter:
+    def __init__(self, bind):
+        self.count = 0
+        event.listen(bind, "before_cursor_execute", self._count)
+
+    def _count(self, *args):
+        self.count += 1
+
+def seed(session, username: str, entries: int, habits: int) -> int:
+    user = User(username=username, email=f"{username}@example.com")
+    session.add(user)
+    session.flush()
+    now = datetime.utcnow()
+    session.add_all(
+        JournalEntry(user_id=user.id, entry_text=f"entry {i} about the day", sentiment_score=0.1, mood="Neutral",
+                     created_at=now - timedelta(hours=i))
+        for i in range(entries)
+    )
+    session.add_all(
+        CheckIn(user_id=user.id, mood=5 + i % 3, energy=6, stress=4, created_at=now - timedelta(hours=i))
+        for i in range(entries)
+    )
+    for h in range(habits):
+        habit = Habit(user_id=user.id, habit_name=f"habit {h}", frequency="daily", streak=h % 5,
+                      best_streak=h % 7, last_completed_on=now.date(), last_logged=now)
+        session.add(habit)
+        session.flush()
+        session.add_all(
+            HabitLog(habit_id=habit.id, user_id=user.id, logged_on=(now - timedelta(days=d)).date())
+            for d in range(10)
+        )
+    session.commit()
+    return user.id
+
+def lazy_dashboard(session, user_id: int) -> dict:
+    # What a handler touching the relationships directly ends up doing
+    user = session.get(User, user_id)
+    entries = sorted(user.journal_entries, key=lambda entry: entry.created_at, reverse=True)[:5]
+    check_ins = sorted(user.check_ins, key=lambda check_in: check_in.created_at, reverse=True)[:5]
+    habits = [{**streak_summary(habit), "logs": len(habit.logs)} for habit in user.habits]
+    return {"entries": entries, "check_ins": check_ins, "habits": habits}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--entries", type=int, default=5000)
+    parser.add_argument("--habits", type=int, default=30)
+    args = parser.parse_args()
+
+    bind = create_engine("sqlite://")
+    Base.metadata.create_all(bind)
+    Session = sessionmaker(bind=bind)
+    with Session() as session:
+        users = {
+            "small": seed(session, "small", 10, 2),
+            "large": seed(session, "large", args.entries, args.habits),
+        }
+
+    counter = StatementCounter(bind)
+    for label, user_id in users.items():
+        for name, load in (("load_dashboard", load_dashboard), ("lazy relationships", lazy_dashboard)):
+            with Session() as session:
+                counter.count = 0
+                started = time.perf_counter()
+                load(session, user_id)
+                elapsed = time.perf_counter() - started
+            print(f"{label:>5} history, {name:>18}: {counter.count:3d} statements, {elapsed * 1000:7.2f} ms")
+            if load is load_dashboard:
+                assert counter.count == DASHBOARD_QUERIES, \
+                    f"load_dashboard issued {counter.count} statements, expected {DASHBOARD_QUERIES}"
+    print(f"ok: load_dashboard issues {DASHBOARD_QUERIES} statements regardless of history size")
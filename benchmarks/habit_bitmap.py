@@ -0,0 +1,81 @@
+"""
+Benchmark: bitmap-based habit analysis against the dict-based path used by
+HabitTrackerAgent._analyze_progress.
+
+Run from the repository root:
+    python -m benchmarks.habit_bitmap
+"""
+from datetime import date, timedelta
+import time
+
+import numpy as np
+
+from habits.bitmap import Schedule, analyze_bitmap, calendar_heatmap, set_bit
+
+YEARS = (1, 5, 10)
+REPEATS = 20
+
+def synthetic_logs(days: int, seed: int = 3) -> list:
+    rng = np.random.default_rng(seed)
+    start = date(2016, 1, 1)
+    completed = rng.random(days) < 0.7
+    return [
+        {"date": (start + timedelta(days=i)).isoformat(), "completed": bool(done), "notes": None}
+        for i, done in enumerate(completed)
+    ]
+
+def dict_analysis(logs: list) -> dict:
+    """Mirrors _analyze_progress and _calculate_streak over a list of log dicts."""
+    total_logs = len(logs)
+    completed_logs = sum(1 for log in logs if log["completed"])
+    completion_rate = completed_logs / total_logs * 100 if total_logs else 0
+
+    dated = sorted(((date.fromisoformat(log["date"]), log) for log in logs), key=lambda item: item[0], reverse=True)
+    streak, last_date = 0, dated[0][0]
+    for log_date, log in dated:
+        if (last_date - log_date).days > 1 or not log["completed"]:
+            break
+        streak += 1
+        last_date = log_date
+
+    recent_rate = sum(1 for log in logs[-7:] if log["completed"]) / 7 * 100
+    older_rate = sum(1 for log in logs[-14:-7] if log["completed"]) / 7 * 100
+    return {
+        "completion_rate": round(completion_rate, 1),
+        "current_streak": streak,
+        "recent_rate": recent_rate,
+        "older_rate": older_rate,
+    }
+
+def build_bitmap(logs: list) -> bytes:
+    bitmap = b""
+    for slot, log in enumerate(logs):
+        if log["completed"]:
+            bitmap = set_bit(bitmap, slot)
+    return bitmap
+
+def timed(fn, *args, **kwargs) -> float:
+    best = float("inf")
+    for _ in range(REPEATS):
+        started = time.perf_counter()
+        fn(*args, **kwargs)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+if __name__ == "__main__":
+    print(f"{'years':>5} {'logs':>6} {'bitmap bytes':>12} {'dict path (ms)':>15} {'bitmap (ms)':>12} {'+heatmap (ms)':>14}")
+    for years in YEARS:
+        days = years * 365
+        logs = synthetic_logs(days)
+        schedule = Schedule("daily", date.fromisoformat(logs[0]["date"]))
+        today = date.fromisoformat(logs[-1]["date"])
+        bitmap = build_bitmap(logs)
+
+        bitmap_result = analyze_bitmap(bitmap, schedule, today)
+        assert bitmap_result["completion_rate"] == dict_analysis(logs)["completion_rate"]
+
+        dict_time = timed(dict_analysis, logs)
+        bitmap_time = timed(analyze_bitmap, bitmap, schedule, today)
+        heatmap_time = timed(calendar_heatmap, bitmap, schedule, today)
+        print(f"{years:>5} {days:>6} {len(bitmap):>12} {dict_time * 1000:>15.3f} {bitmap_time * 1000:>12.3f} {heatmap_time * 1000:>14.3f}")
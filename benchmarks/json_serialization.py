@@ -0,0 +1,111 @@
+"""
+Benchmark: time to turn a 1k-row listing into a JSON body, through
+FastAPI's default response_model path against the opt-in fast path
+(column rows, a pre-built TypeAdapter and pydantic-core's dump_json).
+Fails if the two paths produce different payloads.
+
+Run from the repository root:
+    python -m benchmarks.json_serialization [--rows 1000] [--repeat 20]
+"""
+import argparse
+import asyncio
+import json
+import time
+from datetime import datetime, timedelta
+from typing import List
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from dashboard.listings import list_check_ins, list_habits, list_journal_entries
+from database.models import Base, CheckIn, Habit, JournalEntry, User
+from schemas.serialization import dump_list
+from schemas.validation import CheckInResponse, HabitResponse, JournalEntryResponse
+
+def seed(session, rows: int) -> int:
+    user = User(username="bench", email="bench@example.com")
+    session.add(user)
+    session.flush()
+    now = datetime.utcnow()
+    session.add_all(
+        JournalEntry(user_id=user.id, entry_text=f"entry {i}: a walk, some reading and an early night",
+                     sentiment_score=0.2, mood="Calm", ai_reflection=f"reflection {i}",
+                     created_at=now - timedelta(hours=i))
+        for i in range(rows)
+    )
+    session.add_all(
+        Habit(user_id=user.id, habit_name=f"habit {i}", frequency="weekly", target_days="Monday,Friday",
+              streak=i % 9, created_at=now - timedelta(days=i), last_logged=now)
+        for i in range(rows)
+    )
+    session.add_all(
+        CheckIn(user_id=user.id, mood=5 + i % 3, energy=6, stress=4, notes="fine",
+                created_at=now - timedelta(hours=i))
+        for i in range(rows)
+    )
+    session.commit()
+    return user.id
+
+def orm_journal_entries(session, user_id: int, limit: int) -> List[dict]:
+    # The listing as it was: full ORM objects through the identity map
+    entries = (
+        session.query(JournalEntry)
+        .filter(JournalEntry.user_id == user_id)
+        .order_by(JournalEntry.created_at.desc(), JournalEntry.id.desc())
+        .limit(limit)
+        .all()
+    )
+    return [{"id": entry.id, "entry_text": entry.entry_text, "mood": entry.mood,
+             "created_at": entry.created_at, "ai_insights": entry.ai_reflection} for entry in entries]
+
+def default_body(model, rows: List[dict]) -> bytes:
+    # What a response_model endpoint returning a list of models goes through
+    field = create_response_field(name=f"Response_{model.__name__}", type_=List[model])
+    content = [model(**row) for row in rows]
+    serialized = asyncio.run(serialize_response(field=field, response_content=content, is_coroutine=True))
+    return JSONResponse(serialized).body
+
+def timed(repeat: int, func, *args):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = func(*args)
+    return result, (time.perf_counter() - started) / repeat
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    bind = create_engine("sqlite://")
+    Base.metadata.create_all(bind)
+    Session = sessionmaker(bind=bind)
+    with Session() as session:
+        user_id = seed(session, args.rows)
+
+    listings = (
+        ("journal_entries", JournalEntryResponse, list_journal_entries, orm_journal_entries),
+        ("habits", HabitResponse, list_habits, None),
+        ("check_ins", CheckInResponse, list_check_ins, None),
+    )
+    for name, model, listing, orm_listing in listings:
+        with Session() as session:
+            if orm_listing is not None:
+                _, orm_load = timed(args.repeat, lambda: orm_listing(session, user_id, args.rows))
+                session.expunge_all()
+            rows, load = timed(args.repeat, lambda: listing(session, user_id, limit=args.rows))
+        rows = [{**row, "user_id": "bench"} for row in rows]
+
+        default, default_time = timed(args.repeat, default_body, model, rows)
+        fast, fast_time = timed(args.repeat, dump_list, model, rows)
+        assert json.loads(default) == json.loads(fast), f"{name}: fast path payload differs"
+
+        if orm_listing is not None:
+            print(f"{name:>15} load: ORM objects {orm_load * 1000:7.2f} ms, column rows {load * 1000:7.2f} ms")
+        print(f"{name:>15} body: default {default_time * 1000:7.2f} ms, fast {fast_time * 1000:7.2f} ms "
+              f"({default_time / fast_time:4.1f}x, {len(fast) / 1024:.0f} KiB)")
+    print(f"ok: fast path payloads match the default serialization at {args.rows} rows")
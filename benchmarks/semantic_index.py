@@ -0,0 +1,88 @@
+"""
+Benchmark: embedding throughput, incremental appends and top-k search over
+a memory-mapped semantic index of synthetic journal entries.
+
+Run from the repository root:
+    python -m benchmarks.semantic_index [--entries 100000]
+"""
+import argparse
+import tempfile
+import time
+
+import numpy as np
+
+from memory.semantic_index import DIMENSIONS, EMBED_BATCH, UserIndex, random_model, train_model
+
+TOPICS = {
+    "work": "meeting deadline project manager email office presentation colleague overtime",
+    "sleep": "tired insomnia rest nap bedtime dream awake exhausted morning",
+    "family": "mom dad sister brother dinner kids visit call birthday home",
+    "exercise": "run gym workout yoga walk stretch sweat bike swim training",
+    "anxiety": "worried nervous panic anxious overthinking racing heart fear uneasy",
+    "gratitude": "thankful grateful appreciate kind gift smile happy blessed joy",
+}
+FILLER = "today felt really quite just some very then again later still maybe".split()
+QUERIES = 200
+
+def synthetic_entries(count: int, seed: int = 7) -> list:
+    rng = np.random.default_rng(seed)
+    topics = [words.split() for words in TOPICS.values()]
+    entries = []
+    for _ in range(count):
+        words = list(rng.choice(topics[rng.integers(len(topics))], size=8)) + list(rng.choice(FILLER, size=12))
+        rng.shuffle(words)
+        entries.append(" ".join(words))
+    return entries
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--entries", type=int, default=100000)
+    args = parser.parse_args()
+
+    entries = synthetic_entries(args.entries)
+
+    started = time.perf_counter()
+    model = train_model(entries[:20000])
+    print(f"train on {min(len(entries), 20000)} entries: {time.perf_counter() - started:.2f} s")
+    print(f"random projection model: {random_model().components.nbytes / 1e6:.0f} MB")
+
+    with tempfile.TemporaryDirectory() as root:
+        index = UserIndex(1, root)
+
+        started = time.perf_counter()
+        vectors = np.vstack([model.embed(entries[i:i + EMBED_BATCH]) for i in range(0, len(entries), EMBED_BATCH)])
+        embed_time = time.perf_counter() - started
+        index.replace(np.arange(1, len(entries) + 1), vectors, model.version)
+        print(f"embed {len(entries)} entries: {embed_time:.2f} s ({len(entries) / embed_time:,.0f}/s), "
+              f"index {vectors.nbytes / 1e6:.1f} MB ({DIMENSIONS} x float32)")
+
+        started = time.perf_counter()
+        for i in range(100):
+            index.append([len(entries) + 1 + i], model.embed([entries[i]]))
+        print(f"incremental append: {(time.perf_counter() - started) / 100 * 1000:.3f} ms/entry")
+
+        queries = [model.embed([text])[0] for text in synthetic_entries(QUERIES, seed=11)]
+        timings = []
+        for query in queries:
+            started = time.perf_counter()
+            index.search(query, k=10)
+            timings.append(time.perf_counter() - started)
+        timings = np.array(timings) * 1000
+        print(f"top-10 search over {len(entries) + 100} vectors: "
+              f"p50 {np.percentile(timings, 50):.2f} ms, p95 {np.percentile(timings, 95):.2f} ms")
+
+        # Nearest neighbours should mostly share the query's topic
+        topic_words = {word: topic for topic, words in TOPICS.items() for word in words.split()}
+        def topic_of(text: str) -> str:
+            counts = {}
+            for word in text.split():
+                if word in topic_words:
+                    counts[topic_words[word]] = counts.get(topic_words[word], 0) + 1
+            return max(counts, key=counts.get)
+        hits = total = 0
+        for text, query in zip(synthetic_entries(QUERIES, seed=11), queries):
+            for entry_id, _ in index.search(query, k=10):
+                hits += topic_of(entries[(entry_id - 1) % len(entries)]) == topic_of(text)
+                total += 1
+        print(f"same-topic precision@10: {hits / total:.2%}")
@@ -0,0 +1,99 @@
+"""
+Benchmark: storage size and read/write throughput of journal text stored
+plain, zstd-compressed, and zstd-compressed with a trained dictionary.
+
+Run from the repository root:
+    python -m benchmarks.text_compression [--entries 50000]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+from sqlalchemy import Column, Integer, MetaData, String, Table, create_engine, insert, select
+
+from benchmarks.semantic_index import synthetic_entries
+from database import compression
+from database.compression import CompressedText, train_dictionary
+
+OPENERS = [
+    "It sounds like today asked a lot of you.",
+    "Thank you for sharing something so personal.",
+    "There is a lot of care in how you describe this.",
+]
+QUESTIONS = [
+    "What helped you most when you felt this way before?",
+    "Which part of the day would you like to have more of?",
+    "What would you say to a friend who wrote this entry?",
+]
+
+def synthetic_reflection(entry: str, rng: np.random.Generator) -> str:
+    # LLM reflections echo the entry and reuse stock phrasing, which is what the dictionary learns
+    words = entry.split()
+    return " ".join([
+        OPENERS[rng.integers(len(OPENERS))],
+        f"You mentioned {words[0]} and {words[-1]}, and it seems they shaped how you felt.",
+        "Noticing these patterns is a meaningful step toward understanding yourself.",
+        QUESTIONS[rng.integers(len(QUESTIONS))],
+    ])
+
+def run(bind, rows, text_type) -> dict:
+    table = Table(
+        "journal_entries", MetaData(),
+        Column("id", Integer, primary_key=True),
+        Column("entry_text", text_type),
+        Column("ai_reflection", text_type),
+    )
+    table.create(bind)
+    started = time.perf_counter()
+    with bind.begin() as connection:
+        for i in range(0, len(rows), 1000):
+            connection.execute(insert(table), rows[i:i + 1000])
+    write = time.perf_counter() - started
+
+    started = time.perf_counter()
+    with bind.connect() as connection:
+        count = sum(len(row.entry_text) for row in connection.execute(select(table)))
+    read = time.perf_counter() - started
+    assert count == sum(len(row["entry_text"]) for row in rows)
+    return {"write": write, "read": read}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--entries", type=int, default=50000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(3)
+    entries = synthetic_entries(args.entries)
+    rows = [{"entry_text": entry, "ai_reflection": synthetic_reflection(entry, rng)} for entry in entries]
+    raw_bytes = sum(len(row["entry_text"].encode()) + len(row["ai_reflection"].encode()) for row in rows)
+
+    sample = [text for row in rows[:compression.TRAIN_SAMPLE] for text in row.values()]
+    started = time.perf_counter()
+    compression.register_dictionary(1, train_dictionary(sample))
+    print(f"train dictionary on {len(sample)} texts: {time.perf_counter() - started:.2f} s")
+
+    print(f"{len(rows)} entries with reflections, {raw_bytes / 1e6:.1f} MB of text")
+    for label, text_type, dictionary_id in (
+        ("plain", String(), None),
+        ("zstd", CompressedText(), 0),
+        ("zstd + dictionary", CompressedText(), 1),
+    ):
+        if dictionary_id is not None:
+            stored = sum(
+                len(compression.compress_text(text, dictionary_id)) for row in rows for text in row.values()
+            )
+        else:
+            stored = raw_bytes
+        # The column type compresses with the active dictionary; 0 stands for none
+        compression._active_id = dictionary_id or None
+        compression._checked_at = float("inf")
+        with tempfile.TemporaryDirectory() as root:
+            path = os.path.join(root, "bench.db")
+            timings = run(create_engine(f"sqlite:///{path}"), rows, text_type)
+            file_size = os.path.getsize(path)
+        print(f"{label:>18}: values {stored / 1e6:6.2f} MB ({stored / raw_bytes:.0%}), "
+              f"db file {file_size / 1e6:6.2f} MB, "
+              f"write {len(rows) / timings['write']:,.0f} rows/s, read {len(rows) / timings['read']:,.0f} rows/s")
@@ -0,0 +1,122 @@
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Dict, List, Optional, Set, Tuple
+from fastapi import Request, Response
+from sqlalchemy import select
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from database.hooks import on_change, on_insert
+from database.models import CollectionVersion
+from database.upsert import upsert
+
+ETAG_FORMAT = 1  # bump when the listing payloads change shape, so old ETags stop matching
+
+def bump_versions(connection: Connection, keys: Set[Tuple[int, str]]) -> None:
+    """Increments the (user_id, collection) version stamps with one upsert."""
+    if not keys:
+        return
+
+    table = CollectionVersion.__table__
+    now = datetime.utcnow()
+    upsert(
+        connection, table,
+        [
+            {"user_id": user_id, "collection": collection, "version": 1, "updated_at": now}
+            for user_id, collection in sorted(keys)
+        ],
+        index_elements=("user_id", "collection"),
+        update=lambda excluded: {"version": table.c.version + 1, "updated_at": now}
+    )
+
+def _bump_rows(connection: Connection, rows: List[Dict], collection: str) -> None:
+    bump_versions(connection, {(row["user_id"], collection) for row in rows if row.get("user_id") is not None})
+
+# Stamps move in the same transaction as the write, so an ETag can never
+# describe data that was rolled back or not yet committed. Edits and deletes
+# bump them too; only ORM flushes report those
+
+@on_insert("journal_entries")
+@on_change("journal_entries", "update", "delete")
+def stamp_journal_entries(connection: Connection, rows: List[Dict]) -> None:
+    _bump_rows(connection, rows, "journal_entries")
+
+@on_insert("habits")
+@on_change("habits", "update", "delete")
+def stamp_habits(connection: Connection, rows: List[Dict]) -> None:
+    _bump_rows(connection, rows, "habits")
+
+@on_insert("habit_logs")
+@on_change("habit_logs", "update", "delete")
+def stamp_habit_logs(connection: Connection, rows: List[Dict]) -> None:
+    # A log moves the habit's streak
+    _bump_rows(connection, rows, "habits")
+
+@on_insert("check_ins")
+@on_change("check_ins", "update", "delete")
+def stamp_check_ins(connection: Connection, rows: List[Dict]) -> None:
+    _bump_rows(connection, rows, "check_ins")
+
+def collection_version(db: Session, user_id: int, collection: str) -> Tuple[int, Optional[datetime]]:
+    """(version, last write time) of a user's collection; (0, None) before its first write."""
+    row = db.execute(
+        select(CollectionVersion.version, CollectionVersion.updated_at)
+        .where(CollectionVersion.user_id == user_id, CollectionVersion.collection == collection)
+    ).first()
+    return (row.version, row.updated_at) if row else (0, None)
+
+def make_etag(user_id: int, collection: str, version: int, params: Tuple = ()) -> str:
+    """Strong ETag: the same stamp and parameters always serialize to the same bytes."""
+    return '"' + ".".join(str(part) for part in (ETAG_FORMAT, collection, user_id, version, *params)) + '"'
+
+def _etag_matches(header: str, etag: str) -> bool:
+    # If-None-Match uses the weak comparison, so W/ prefixes are ignored
+    candidates = [candidate.strip() for candidate in header.split(",")]
+    return "*" in candidates or any(candidate.removeprefix("W/") == etag for candidate in candidates)
+
+def _not_modified_since(header: str, last_modified: Optional[datetime]) -> bool:
+    if not header or last_modified is None:
+        return False
+    try:
+        since = parsedate_to_datetime(header)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    # HTTP dates have one-second resolution
+    return last_modified.replace(tzinfo=timezone.utc, microsecond=0) <= since
+
+def conditional_response(
+    request: Request,
+    response: Response,
+    db: Session,
+    user_id: int,
+    collection: str,
+    params: Tuple = (),
+    changes_at: Optional[datetime] = None
+) -> Tuple[Optional[Response], int]:
+    """
+    Sets ETag and Last-Modified for a user's collection on response. Returns
+    a 304 response when the client's copy is current, so the caller can
+    return it before loading any rows, and the version the ETag was built
+    from. Callers key the read cache on that version, so a body cached by
+    another worker is never sent under a newer ETag. changes_at is a time
+    the listing changes without a write (e.g. streaks lapsing at midnight);
+    Last-Modified is never earlier than it.
+    """
+    version, updated_at = collection_version(db, user_id, collection)
+    if updated_at is not None and changes_at is not None:
+        updated_at = max(updated_at, changes_at)
+    etag = make_etag(user_id, collection, version, params)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if updated_at is not None:
+        headers["Last-Modified"] = format_datetime(updated_at.replace(tzinfo=timezone.utc, microsecond=0), usegmt=True)
+    response.headers.update(headers)
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        current = _etag_matches(if_none_match, etag)
+    else:
+        # If-Modified-Since only counts when there is no If-None-Match
+        current = _not_modified_since(request.headers.get("if-modified-since", ""), updated_at)
+    return (Response(status_code=304, headers=headers) if current else None), version
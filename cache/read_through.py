@@ -0,0 +1,298 @@
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from sqlalchemy.engine import Connection
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+from database.hooks import on_insert
+
+# Read-cache configuration
+# Off by default: with several workers, only the sqlite backend shares invalidations
+READ_CACHE_ENABLED = os.getenv("READ_CACHE_ENABLED", "false").lower() in ("1", "true", "yes")
+READ_CACHE_BACKEND = os.getenv("READ_CACHE_BACKEND", "memory")  # memory, sqlite
+READ_CACHE_PATH = os.getenv("READ_CACHE_PATH", "data/read_cache.sqlite3")
+READ_CACHE_MAX_ENTRIES = int(os.getenv("READ_CACHE_MAX_ENTRIES", "10000"))
+READ_CACHE_TTL_SECONDS = float(os.getenv("READ_CACHE_TTL_SECONDS", "300"))
+
+BACKENDS = ("memory", "sqlite")
+PRUNE_EVERY = 200  # shared-backend writes between expiry sweeps
+
+class MemoryBackend:
+    """Per-process versions and an LRU of cached values."""
+
+    def __init__(self, max_entries: int = READ_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._versions: Dict[Tuple[int, str], int] = {}
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def version(self, user_id: int, resource: str) -> int:
+        return self._versions.get((user_id, resource), 0)
+
+    def bump(self, user_id: int, resource: str) -> None:
+        with self._lock:
+            self._versions[(user_id, resource)] = self._versions.get((user_id, resource), 0) + 1
+
+    def get(self, key: str) -> Optional[Tuple[float, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key: str, stored_at: float, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = (stored_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+class SQLiteBackend:
+    """
+    Versions and values in a local SQLite file, shared by every worker
+    process on the host so a write in one worker invalidates the others.
+    """
+
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS versions (user_id INTEGER, resource TEXT, version INTEGER, "
+        "PRIMARY KEY (user_id, resource))",
+        "CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, stored_at REAL, value BLOB)",
+        "CREATE INDEX IF NOT EXISTS ix_entries_stored_at ON entries (stored_at)",
+    )
+
+    def __init__(self, path: str = READ_CACHE_PATH, max_entries: int = READ_CACHE_MAX_ENTRIES,
+                 ttl: float = READ_CACHE_TTL_SECONDS):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._local = threading.local()
+        self._writes = 0
+        self.evictions = 0
+        with self._connection() as connection:
+            for statement in self.SCHEMA:
+                connection.execute(statement)
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=OFF")  # a lost cache write only costs a miss
+            self._local.connection = connection
+        return connection
+
+    def version(self, user_id: int, resource: str) -> int:
+        row = self._connection().execute(
+            "SELECT version FROM versions WHERE user_id = ? AND resource = ?", (user_id, resource)
+        ).fetchone()
+        return row[0] if row else 0
+
+    def bump(self, user_id: int, resource: str) -> None:
+        self._connection().execute(
+            "INSERT INTO versions (user_id, resource, version) VALUES (?, ?, 1) "
+            "ON CONFLICT (user_id, resource) DO UPDATE SET version = version + 1",
+            (user_id, resource)
+        )
+
+    def get(self, key: str) -> Optional[Tuple[float, Any]]:
+        row = self._connection().execute("SELECT stored_at, value FROM entries WHERE key = ?", (key,)).fetchone()
+        return (row[0], pickle.loads(row[1])) if row else None
+
+    def set(self, key: str, stored_at: float, value: Any) -> None:
+        connection = self._connection()
+        connection.execute(
+            "INSERT OR REPLACE INTO entries (key, stored_at, value) VALUES (?, ?, ?)",
+            (key, stored_at, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+        )
+        self._writes += 1
+        if self._writes % PRUNE_EVERY == 0:
+            self.prune()
+
+    def prune(self) -> None:
+        """Drops expired values, then the oldest ones beyond max_entries."""
+        connection = self._connection()
+        expired = connection.execute("DELETE FROM entries WHERE stored_at < ?", (time.time() - self.ttl,)).rowcount
+        overflow = connection.execute(
+            "DELETE FROM entries WHERE key IN (SELECT key FROM entries ORDER BY stored_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,)
+        ).rowcount
+        self.evictions += expired + overflow
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    shared_hits: int = 0  # hits served from the shared backend rather than this process
+    misses: int = 0
+    invalidations: int = 0
+    age_total: float = 0.0  # seconds between caching and serving, over all hits
+    age_max: float = 0.0
+    by_resource: Dict[str, List[int]] = field(default_factory=dict)  # resource -> [hits, misses]
+
+class ReadThroughCache:
+    """
+    Caches per-user listing and summary responses. Keys embed the user's
+    current version of the resource, so bumping the version on a write makes
+    every older value unreachable without having to find and delete it.
+    Values also expire after ttl seconds, which bounds staleness if a
+    write path ever skips the bump.
+    """
+
+    def __init__(self, backend: str = READ_CACHE_BACKEND, ttl: float = READ_CACHE_TTL_SECONDS,
+                 max_entries: int = READ_CACHE_MAX_ENTRIES):
+        if backend not in BACKENDS:
+            raise ValueError(f"backend must be one of {BACKENDS}, got {backend!r}")
+        self.ttl = ttl
+        self.local = MemoryBackend(max_entries)
+        self.shared = SQLiteBackend(max_entries=max_entries, ttl=ttl) if backend == "sqlite" else None
+        self.stats = CacheStats()
+        self._stats_lock = threading.Lock()
+
+    def _version_store(self):
+        return self.shared or self.local
+
+    def version(self, user_id: int, resource: str) -> int:
+        return self._version_store().version(user_id, resource)
+
+    def key(self, user_id: int, resource: str, params: Tuple = (), depends_on: Tuple[str, ...] = ()) -> str:
+        """Cache key for a value built from depends_on (by default just resource)."""
+        versions = ",".join(str(self.version(user_id, source)) for source in depends_on or (resource,))
+        return f"{resource}:{user_id}:{versions}:{params!r}"
+
+    def _record(self, resource: str, hit: bool, age: float = 0.0, shared: bool = False) -> None:
+        with self._stats_lock:
+            counts = self.stats.by_resource.setdefault(resource, [0, 0])
+            if hit:
+                self.stats.hits += 1
+                self.stats.shared_hits += shared
+                self.stats.age_total += age
+                self.stats.age_max = max(self.stats.age_max, age)
+                counts[0] += 1
+            else:
+                self.stats.misses += 1
+                counts[1] += 1
+
+    def get_or_load(
+        self,
+        user_id: int,
+        resource: str,
+        params: Tuple,
+        loader: Callable[[], Any],
+        depends_on: Tuple[str, ...] = ()
+    ) -> Any:
+        """
+        The cached value for (user, resource, params), calling loader on a
+        miss. A summary built from several resources lists them in depends_on
+        so a write to any of them invalidates it.
+        """
+        key = self.key(user_id, resource, params, depends_on)
+        now = time.time()
+        for backend in filter(None, (self.local, self.shared)):
+            entry = backend.get(key)
+            if entry is not None and now - entry[0] <= self.ttl:
+                if backend is self.shared:
+                    self.local.set(key, *entry)
+                self._record(resource, True, now - entry[0], backend is self.shared)
+                return entry[1]
+
+        self._record(resource, False)
+        value = loader()
+        for backend in filter(None, (self.local, self.shared)):
+            backend.set(key, now, value)
+        return value
+
+    def invalidate(self, user_id: int, resource: str) -> None:
+        """Makes every cached value of a user's resource unreachable."""
+        self._version_store().bump(user_id, resource)
+        with self._stats_lock:
+            self.stats.invalidations += 1
+
+    def metrics(self) -> Dict:
+        stats = self.stats
+        requests = stats.hits + stats.misses
+        return {
+            "backend": "sqlite" if self.shared else "memory",
+            "requests": requests,
+            "hits": stats.hits,
+            "shared_hits": stats.shared_hits,
+            "misses": stats.misses,
+            "hit_ratio": round(stats.hits / requests, 4) if requests else None,
+            "invalidations": stats.invalidations,
+            "evictions": self.local.evictions + (self.shared.evictions if self.shared else 0),
+            "local_entries": len(self.local._entries),
+            "staleness_seconds": {
+                "mean": round(stats.age_total / stats.hits, 3) if stats.hits else None,
+                "max": round(stats.age_max, 3),
+                "ttl": self.ttl,
+            },
+            "by_resource": {
+                resource: {"hits": hits, "misses": misses, "hit_ratio": round(hits / (hits + misses), 4)}
+                for resource, (hits, misses) in stats.by_resource.items()
+            },
+        }
+
+_cache: Optional[ReadThroughCache] = None
+_cache_lock = threading.Lock()
+
+def get_read_cache() -> Optional[ReadThroughCache]:
+    """Return the shared cache, or None when read caching is disabled."""
+    global _cache
+    if not READ_CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = ReadThroughCache()
+    return _cache
+
+def cached(
+    user_id: int,
+    resource: str,
+    params: Tuple,
+    loader: Callable[[], Any],
+    depends_on: Tuple[str, ...] = ()
+) -> Any:
+    """Read-through helper for routes; calls loader directly when caching is off."""
+    cache = get_read_cache()
+    return cache.get_or_load(user_id, resource, params, loader, depends_on) if cache else loader()
+
+def invalidate(user_id: Optional[int], *resources: str) -> None:
+    """Bumps a user's resource versions; called by write paths once they commit."""
+    cache = get_read_cache()
+    if cache is None or user_id is None:
+        return
+    for resource in resources:
+        cache.invalidate(user_id, resource)
+
+def _invalidate_rows(rows: List[Dict], resource: str) -> None:
+    for user_id in {row.get("user_id") for row in rows}:
+        invalidate(user_id, resource)
+
+# Versions are bumped while the inserting transaction is still open, so every
+# write path (ORM, group commit, bulk import) invalidates. The create endpoints
+# bump again after committing, so a read that raced the transaction cannot
+# keep old data cached under the new version.
+
+@on_insert("journal_entries")
+def invalidate_journal_entries(connection: Connection, rows: List[Dict]) -> None:
+    _invalidate_rows(rows, "journal_entries")
+
+@on_insert("habits")
+def invalidate_habits(connection: Connection, rows: List[Dict]) -> None:
+    _invalidate_rows(rows, "habits")
+
+@on_insert("habit_logs")
+def invalidate_habit_logs(connection: Connection, rows: List[Dict]) -> None:
+    # A log moves the habit's streak
+    _invalidate_rows(rows, "habits")
+
+@on_insert("check_ins")
+def invalidate_check_ins(connection: Connection, rows: List[Dict]) -> None:
+    _invalidate_rows(rows, "check_ins")
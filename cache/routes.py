@@ -0,0 +1,13 @@
+from fastapi import APIRouter, HTTPException
+
+from cache.read_through import get_read_cache
+
+router = APIRouter()
+
+@router.get("/cache/stats")
+def read_cache_stats():
+    """Hit ratio, invalidations and staleness of the read cache in this process."""
+    cache = get_read_cache()
+    if cache is None:
+        raise HTTPException(status_code=404, detail="Read cache is disabled")
+    return cache.metrics()
@@ -0,0 +1,218 @@
+from dataclasses import dataclass
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import precision_recall_fscore_support
+from sklearn.model_selection import train_test_split
+from sklearn.multiclass import OneVsRestClassifier
+from sklearn.preprocessing import MultiLabelBinarizer
+import argparse
+import json
+import joblib
+import logging
+import numpy as np
+import os
+import time
+
+from classifiers.labels import TASKS, load_dataset
+
+logger = logging.getLogger(__name__)
+
+CLASSIFIER_DIR = os.getenv("CLASSIFIER_DIR", "data/classifiers")
+CLASSIFIER_BACKEND = os.getenv("CLASSIFIER_BACKEND", "llm")  # llm, or local to use trained models when present
+MIN_TRAIN_EXAMPLES = 50
+MIN_LABEL_SUPPORT = 5  # rarer labels are left to the LLM
+TEST_FRACTION = 0.2
+PREDICT_THRESHOLD = 0.5
+
+# (min, max) labels returned per text, matching what the prompts ask for
+TASK_LIMITS = {"themes": (1, 5), "emotions": (1, 4), "cognitive_biases": (0, 3)}
+
+@dataclass(frozen=True)
+class DistilledClassifier:
+    """
+    TF-IDF features and one logistic regression per label, trained on LLM
+    answers. The regressions are stacked into one weight matrix, so scoring
+    a text is a sparse product rather than a call per label.
+    """
+    task: str
+    version: str
+    labels: Tuple[str, ...]
+    vectorizer: TfidfVectorizer
+    coef: np.ndarray  # (len(labels), vocabulary)
+    intercept: np.ndarray  # (len(labels),)
+
+    def predict_proba(self, texts: Sequence[str]) -> np.ndarray:
+        """(len(texts), len(labels)) label probabilities."""
+        scores = np.asarray(self.vectorizer.transform(list(texts)) @ self.coef.T) + self.intercept
+        return 1.0 / (1.0 + np.exp(-scores))
+
+    def decide(self, probabilities: np.ndarray, threshold: float = PREDICT_THRESHOLD) -> Dict[str, float]:
+        """Labels above threshold, most confident first, within the task's limits."""
+        least, most = TASK_LIMITS[self.task]
+        order = np.argsort(-probabilities)[:most]
+        chosen = [i for i in order if probabilities[i] >= threshold] or list(order[:least])
+        return {self.labels[i]: round(float(probabilities[i]), 3) for i in chosen}
+
+    def predict(self, text: str, threshold: float = PREDICT_THRESHOLD) -> Dict[str, float]:
+        """{label: confidence} for one text."""
+        return self.decide(self.predict_proba([text])[0], threshold)
+
+def train_classifier(task: str, texts: Sequence[str], label_lists: Sequence[List[str]]) -> DistilledClassifier:
+    """Fits a multi-label model on labels seen at least MIN_LABEL_SUPPORT times."""
+    if len(texts) < MIN_TRAIN_EXAMPLES:
+        raise ValueError(f"Need at least {MIN_TRAIN_EXAMPLES} labelled texts to train the {task} classifier")
+    support: Dict[str, int] = {}
+    for labels in label_lists:
+        for label in labels:
+            support[label] = support.get(label, 0) + 1
+    # A label on every text carries no signal and cannot be fitted
+    kept = sorted(label for label, count in support.items() if MIN_LABEL_SUPPORT <= count < len(texts))
+    if not kept:
+        raise ValueError(f"No {task} label has {MIN_LABEL_SUPPORT} or more examples")
+
+    known = set(kept)
+    targets = MultiLabelBinarizer(classes=kept).fit_transform(
+        [[label for label in labels if label in known] for labels in label_lists]
+    )
+    vectorizer = TfidfVectorizer(ngram_range=(1, 2), min_df=2, max_features=50000, sublinear_tf=True,
+                                 stop_words="english", dtype=np.float32)
+    model = OneVsRestClassifier(LogisticRegression(C=4.0, solver="liblinear", max_iter=1000))
+    model.fit(vectorizer.fit_transform(list(texts)), targets)
+    return DistilledClassifier(
+        task, f"{task}-{datetime.utcnow():%Y%m%d%H%M%S}", tuple(kept), vectorizer,
+        np.vstack([estimator.coef_ for estimator in model.estimators_]).astype(np.float32),
+        np.concatenate([estimator.intercept_ for estimator in model.estimators_]).astype(np.float32),
+    )
+
+def evaluate_classifier(
+    classifier: DistilledClassifier,
+    texts: Sequence[str],
+    label_lists: Sequence[List[str]]
+) -> Dict:
+    """
+    Agreement with the LLM labels on held-out texts. Labels the model never
+    learned count as misses, so recall reflects what the LLM would still find.
+    """
+    probabilities = classifier.predict_proba(texts)
+    predicted = [classifier.decide(row) for row in probabilities]
+    classes = sorted(set(classifier.labels).union(*label_lists))
+    binarizer = MultiLabelBinarizer(classes=classes)
+    expected = binarizer.fit_transform(label_lists)
+    actual = binarizer.transform([list(labels) for labels in predicted])
+
+    report = {"task": classifier.task, "version": classifier.version, "examples": len(texts),
+              "labels": len(classifier.labels)}
+    for average in ("micro", "macro"):
+        precision, recall, f1, _ = precision_recall_fscore_support(expected, actual, average=average, zero_division=0)
+        report[average] = {"precision": round(precision, 3), "recall": round(recall, 3), "f1": round(f1, 3)}
+    sample_f1 = np.array([_f1(set(p), set(e)) for p, e in zip(predicted, label_lists)])
+    report["samples_f1"] = round(float(sample_f1.mean()), 3)
+    report["exact_match"] = round(float(np.mean([set(p) == set(e) for p, e in zip(predicted, label_lists)])), 3)
+
+    # How well confidence separates answers that agree with the LLM from those that do not
+    confidence = np.array([min(labels.values()) if labels else 1.0 for labels in predicted])
+    report["by_confidence"] = [
+        {"min_confidence": cutoff, "coverage": round(float(np.mean(confidence >= cutoff)), 3),
+         "f1": round(float(sample_f1[confidence >= cutoff].mean()), 3) if np.any(confidence >= cutoff) else None}
+        for cutoff in (0.5, 0.7, 0.9)
+    ]
+
+    per_label = precision_recall_fscore_support(expected, actual, average=None, zero_division=0)
+    report["per_label"] = {
+        label: {"f1": round(float(per_label[2][i]), 3), "support": int(per_label[3][i])}
+        for i, label in enumerate(classes) if label in classifier.labels
+    }
+
+    timings = []
+    for text in texts[:500]:
+        started = time.perf_counter()
+        classifier.predict(text)
+        timings.append((time.perf_counter() - started) * 1e6)
+    report["latency_us"] = {"p50": round(float(np.percentile(timings, 50)), 1),
+                            "p99": round(float(np.percentile(timings, 99)), 1)}
+    return report
+
+def _f1(predicted: set, expected: set) -> float:
+    if not predicted and not expected:
+        return 1.0
+    overlap = len(predicted & expected)
+    return 2 * overlap / (len(predicted) + len(expected))
+
+def save_classifier(classifier: DistilledClassifier, report: Optional[Dict] = None) -> None:
+    os.makedirs(CLASSIFIER_DIR, exist_ok=True)
+    # Stored as plain fields so loading does not depend on where the class was defined
+    joblib.dump(vars(classifier), os.path.join(CLASSIFIER_DIR, f"{classifier.task}.joblib"))
+    if report is not None:
+        with open(os.path.join(CLASSIFIER_DIR, f"{classifier.task}.report.json"), "w") as f:
+            json.dump(report, f, indent=2)
+    get_classifier.cache_clear()
+
+@lru_cache(maxsize=None)
+def get_classifier(task: str) -> Optional[DistilledClassifier]:
+    """The trained model for a task, or None before one has been trained."""
+    try:
+        return DistilledClassifier(**joblib.load(os.path.join(CLASSIFIER_DIR, f"{task}.joblib")))
+    except FileNotFoundError:
+        return None
+
+def local_classifier(task: str) -> Optional[DistilledClassifier]:
+    """The trained model for a task when CLASSIFIER_BACKEND is local, else None."""
+    if CLASSIFIER_BACKEND != "local":
+        return None
+    return get_classifier(task)
+
+def local_predictions(task: str, text: str) -> Optional[Dict[str, float]]:
+    """
+    {label: confidence} from the local model when CLASSIFIER_BACKEND is
+    local and the task has one; None means ask the LLM.
+    """
+    if not text:
+        return None
+    classifier = local_classifier(task)
+    return classifier.predict(text) if classifier is not None else None
+
+def distill(task: str, limit: Optional[int] = None) -> Dict:
+    """
+    Trains on a split of the harvested labels to write the evaluation
+    report, then refits on all of them and saves the model. The report is
+    skipped when the training split is too small to fit on its own.
+    """
+    texts, label_lists = load_dataset(task, limit=limit)
+    classifier = train_classifier(task, texts, label_lists)
+    train_texts, test_texts, train_labels, test_labels = train_test_split(
+        texts, label_lists, test_size=TEST_FRACTION, random_state=0
+    )
+    try:
+        report = evaluate_classifier(train_classifier(task, train_texts, train_labels), test_texts, test_labels)
+    except ValueError as e:
+        logger.warning(f"Skipping the {task} evaluation report: {e}")
+        report = {"task": task, "evaluated": False, "reason": str(e)}
+    report.update(version=classifier.version, trained_on=len(texts))
+    save_classifier(classifier, report)
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Distil LLM classifications into local models")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    train = subcommands.add_parser("train", help="Evaluate against held-out LLM labels, then train on all of them")
+    train.add_argument("--task", choices=TASKS, action="append", help="Task to train (default: all)")
+    train.add_argument("--limit", type=int, help="Use only the newest N labelled texts")
+    evaluate = subcommands.add_parser("evaluate", help="Score the saved models against the harvested labels")
+    evaluate.add_argument("--task", choices=TASKS, action="append", help="Task to evaluate (default: all)")
+    args = parser.parse_args()
+
+    for task in args.task or TASKS:
+        if args.command == "train":
+            report = distill(task, args.limit)
+        else:
+            classifier = get_classifier(task)
+            if classifier is None:
+                print(json.dumps({"status": "error", "task": task, "message": "No trained model"}))
+                continue
+            # Includes the texts the model was trained on, so read it as an upper bound
+            report = evaluate_classifier(classifier, *load_dataset(task))
+        print(json.dumps({"status": "success", **report}))
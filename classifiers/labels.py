@@ -0,0 +1,93 @@
+from typing import Dict, List, Optional, Tuple, Union
+from sqlalchemy import select
+from sqlalchemy.engine import Engine
+import json
+import logging
+import os
+import re
+
+from database.database import engine
+from database.models import LLMLabel
+
+logger = logging.getLogger(__name__)
+
+# Classification tasks the agents send to the LLM and the local models learn
+TASKS = ("themes", "emotions", "cognitive_biases")
+
+# The biases the reflection prompt asks about; free-text answers are mapped onto these
+COGNITIVE_BIASES = (
+    "all-or-nothing thinking",
+    "overgeneralization",
+    "mental filtering",
+    "jumping to conclusions",
+    "catastrophizing",
+    "emotional reasoning",
+    "should statements",
+    "personalization",
+)
+
+# Opt-in: harvested rows copy journal text and are not tied to a user, so they outlive account deletion
+LABEL_HARVEST_ENABLED = os.getenv("LABEL_HARVEST_ENABLED", "false").lower() in ("1", "true", "yes")
+EMOTION_MIN_INTENSITY = 0.3  # emotions weaker than this are not training labels
+
+Labels = Union[List[str], Dict[str, float]]
+
+def normalize_label(label: str) -> str:
+    """Lowercase, without list markers, quotes or trailing punctuation."""
+    label = re.sub(r"^[\s\-*•\d.)]+", "", str(label).lower())
+    return re.sub(r"\s+", " ", label.strip(" \t\n\"'.;:")).strip()
+
+def canonical_bias(label: str) -> Optional[str]:
+    label = normalize_label(label).replace("black-and-white", "all-or-nothing")
+    for bias in COGNITIVE_BIASES:
+        if bias in label or (len(label) > 5 and label in bias):
+            return bias
+    return None
+
+def label_set(task: str, labels: Labels) -> List[str]:
+    """The training labels in one stored LLM answer."""
+    if task == "emotions":
+        names = []
+        for emotion, intensity in (labels or {}).items():
+            try:
+                if float(intensity) >= EMOTION_MIN_INTENSITY:
+                    names.append(normalize_label(emotion))
+            except (TypeError, ValueError):
+                continue
+    elif task == "cognitive_biases":
+        names = [canonical_bias(label) for label in labels or []]
+    else:
+        names = [normalize_label(label) for label in labels or []]
+    return sorted({name for name in names if name})
+
+def record_labels(task: str, text: str, labels: Labels, model: str, bind: Engine = engine) -> None:
+    """
+    Keeps an LLM classification as a training example. Best effort: the
+    agent's answer never depends on this write succeeding.
+    """
+    if not LABEL_HARVEST_ENABLED or not text:
+        return
+    try:
+        with bind.begin() as connection:
+            connection.execute(LLMLabel.__table__.insert().values(
+                task=task, text=text, labels=json.dumps(labels), model=model
+            ))
+    except Exception as e:
+        logger.warning(f"Could not record {task} labels: {e}")
+
+def load_dataset(task: str, bind: Engine = engine, limit: Optional[int] = None) -> Tuple[List[str], List[List[str]]]:
+    """
+    (texts, label lists) harvested for a task. When a text was labelled
+    more than once, the newest answer wins.
+    """
+    query = select(LLMLabel.text, LLMLabel.labels).where(LLMLabel.task == task).order_by(LLMLabel.id.desc())
+    if limit is not None:
+        query = query.limit(limit)
+    with bind.connect() as connection:
+        rows = connection.execute(query).all()
+
+    examples: Dict[str, List[str]] = {}
+    for text, labels in rows:
+        if text and text not in examples:
+            examples[text] = label_set(task, json.loads(labels))
+    return list(examples), list(examples.values())
@@ -0,0 +1,10 @@
+from fastapi import APIRouter
+
+from classifiers.tiered import tier_metrics
+
+router = APIRouter()
+
+@router.get("/analysis/stats")
+def read_analysis_stats():
+    """Share of agent analyses served by the local tier and latency per tier in this process."""
+    return tier_metrics()
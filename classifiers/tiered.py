@@ -0,0 +1,207 @@
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Deque, Dict, List, Optional
+from textblob import TextBlob
+import logging
+import numpy as np
+import os
+import re
+import threading
+
+from classifiers.distilled import local_classifier
+from classifiers.labels import normalize_label
+
+logger = logging.getLogger(__name__)
+
+ANALYSIS_MODE = os.getenv("ANALYSIS_MODE", "full")  # full: every request goes to the LLM; tiered: local first
+LOCAL_MAX_WORDS = int(os.getenv("LOCAL_MAX_WORDS", "150"))  # longer entries always get the LLM
+LOCAL_MIN_CONFIDENCE = float(os.getenv("LOCAL_MIN_CONFIDENCE", "0.6"))
+MAX_THEMES = 5
+LATENCY_SAMPLES = 1000  # recent requests kept per tier for percentiles
+
+# Phrasings that signal each bias; a match is strong evidence, a miss is weak evidence
+BIAS_PATTERNS = {
+    "all-or-nothing thinking": r"\b(complete|total|utter)(ly)? (failure|disaster|waste)\b|\bnothing (ever )?(works|goes right)\b|\bperfect or\b",
+    "overgeneralization": r"\b(every ?(time|one|body)|no ?one ever|nobody ever|this always happens|always (happens|like this))\b",
+    "mental filtering": r"\b(the only thing|all i can (think|focus) (about|on)|can'?t stop thinking about the one)\b",
+    "jumping to conclusions": r"\b(they (must|probably) (think|hate)|i just know|(is|are) going to (hate|laugh at|judge)|will (definitely|surely) fail)\b",
+    "catastrophizing": r"\b(disaster|catastroph\w*|end of the world|worst (thing|day|possible)|ruin(ed|s)? (everything|my life)|can'?t (cope|handle (it|this)))\b",
+    "emotional reasoning": r"\bi feel (like )?(a |an |so )?(failure|stupid|useless|worthless|idiot)\b|\bfeel\w* .{0,30}so it must\b",
+    "should statements": r"\b(i|you|they|we) (should(n'?t)?|must|ought to|have to) (be|have|always|never)\b",
+    "personalization": r"\b(my fault|because of me|i (caused|ruined)|blame myself|i'?m to blame)\b",
+}
+_bias_patterns = {bias: re.compile(pattern, re.IGNORECASE) for bias, pattern in BIAS_PATTERNS.items()}
+
+@dataclass(frozen=True)
+class LocalAnalysis:
+    """What the local tier can say about a text, with a confidence per part."""
+    polarity: float
+    subjectivity: float
+    themes: List[str]
+    biases: List[str]
+    emotions: Dict[str, float]  # emotion -> intensity, from TextBlob sentiment
+    confidences: Dict[str, float]
+    emotion_confidence: Dict[str, float] = field(default_factory=dict)  # classifier probabilities, in place of emotions
+
+    @property
+    def confidence(self) -> float:
+        return min(self.confidences.values())
+
+@dataclass(frozen=True)
+class TierDecision:
+    tier: str  # local or llm
+    reason: str  # confident, low_confidence, long_entry, depth_requested or full_mode
+    analysis: Optional[LocalAnalysis] = None
+
+def _noun_phrase_themes(blob: TextBlob) -> List[str]:
+    try:
+        phrases = [normalize_label(phrase) for phrase in blob.noun_phrases]
+    except Exception as e:
+        # Missing NLTK corpora leave the tier without themes, which escalates to the LLM
+        logger.warning(f"Noun phrase extraction failed: {e}")
+        return []
+    counts: Dict[str, int] = {}
+    for phrase in phrases:
+        if phrase:
+            counts[phrase] = counts.get(phrase, 0) + 1
+    # Most frequent first, then longest, as longer phrases are more specific
+    return sorted(counts, key=lambda phrase: (-counts[phrase], -len(phrase.split()), phrase))[:MAX_THEMES]
+
+def local_analysis(text: str) -> LocalAnalysis:
+    """
+    TextBlob sentiment, noun-phrase themes and keyword bias detection. When
+    CLASSIFIER_BACKEND is local, the distilled classifiers are used in place
+    of the heuristics for any task that has a trained model.
+    """
+    blob = TextBlob(text)
+    polarity, subjectivity = blob.sentiment.polarity, blob.sentiment.subjectivity
+    confidences = {}
+
+    theme_model = local_classifier("themes")
+    if theme_model is not None:
+        scores = theme_model.predict(text)
+        themes = list(scores)
+        confidences["themes"] = min(scores.values(), default=0.0)
+    else:
+        themes = _noun_phrase_themes(blob)
+        confidences["themes"] = min(1.0, 0.3 + 0.3 * len(themes)) if themes else 0.0
+
+    # Subjective text with near-zero polarity is usually mixed feelings TextBlob cannot resolve
+    confidences["sentiment"] = 0.5 if subjectivity >= 0.5 and abs(polarity) < 0.1 else 0.9
+
+    biases = [bias for bias, pattern in _bias_patterns.items() if pattern.search(text)]
+    bias_model = local_classifier("cognitive_biases")
+    if bias_model is not None:
+        biases += [bias for bias in bias_model.predict(text) if bias not in biases]
+    # Distress with no recognisable phrasing is where keyword matching misses biases
+    confidences["cognitive_biases"] = 0.8 if biases else (0.5 if polarity < -0.3 else 0.9)
+
+    emotion_model = local_classifier("emotions")
+    emotion_confidence = {}
+    if emotion_model is not None:
+        # Probabilities that each emotion is present, not how strongly it is felt
+        emotions, emotion_confidence = {}, emotion_model.predict(text)
+    elif polarity > 0.1:
+        emotions = {"positive": round(polarity, 2)}
+    elif polarity < -0.1:
+        emotions = {"negative": round(-polarity, 2)}
+    else:
+        emotions = {"neutral": round(1 - subjectivity, 2)}
+
+    return LocalAnalysis(round(polarity, 2), round(subjectivity, 2), themes, biases[:3], emotions,
+                         {part: round(value, 3) for part, value in confidences.items()}, emotion_confidence)
+
+def route(text: str, depth: bool = False) -> TierDecision:
+    """Picks the tier for a request; only runs the local analysis when it could be used."""
+    if ANALYSIS_MODE != "tiered":
+        return TierDecision("llm", "full_mode")
+    if depth:
+        return TierDecision("llm", "depth_requested")
+    if len(text.split()) > LOCAL_MAX_WORDS:
+        return TierDecision("llm", "long_entry")
+    analysis = local_analysis(text)
+    if analysis.confidence < LOCAL_MIN_CONFIDENCE:
+        return TierDecision("llm", "low_confidence", analysis)
+    return TierDecision("local", "confident", analysis)
+
+# Templated text for the local tier, so it never needs the LLM
+
+def local_insight(mood: str, themes: List[str], polarity: float) -> str:
+    focus = f", centred on {' and '.join(themes[:2])}" if themes else ""
+    if polarity > 0.1:
+        follow_up = "Notice what made this possible, so you can come back to it."
+    elif polarity < -0.1:
+        follow_up = "Naming what weighed on you is a first step; consider one small thing that might ease it."
+    else:
+        follow_up = "It may help to note what stood out most today, and why."
+    return f"Your entry reads as {mood.lower()}{focus}. {follow_up}"
+
+BIAS_GUIDANCE = {
+    "all-or-nothing thinking": ("What would a middle ground between success and failure look like here?",
+                                "Partial progress still counts; most outcomes sit somewhere in between."),
+    "overgeneralization": ("Can you think of a time when this did not happen?",
+                           "One event is information about this situation, not a rule about all of them."),
+    "mental filtering": ("What else happened that you might be overlooking?",
+                         "The difficult part is real, and so are the parts that went well."),
+    "jumping to conclusions": ("What evidence do you have for how others see this?",
+                               "Without knowing what others think, a kinder guess is as likely as a harsh one."),
+    "catastrophizing": ("What is the most likely outcome, rather than the worst one?",
+                        "This is hard, and it is also something you can take one step at a time."),
+    "emotional reasoning": ("How might you see this if the feeling were less intense?",
+                            "Feeling like a failure is not the same as being one."),
+    "should statements": ("What would change if 'should' became 'would like to'?",
+                          "Holding yourself to flexible preferences leaves room to be human."),
+    "personalization": ("What other factors might have played a part?",
+                        "Many things shaped this outcome; it is not all on you."),
+}
+
+def local_guidance(biases: List[str], themes: List[str]) -> Dict[str, List[str]]:
+    questions = [BIAS_GUIDANCE[bias][0] for bias in biases if bias in BIAS_GUIDANCE][:2]
+    reframing = [BIAS_GUIDANCE[bias][1] for bias in biases if bias in BIAS_GUIDANCE][:2]
+    if themes:
+        questions.append(f"What matters most to you about {themes[0]} right now?")
+    questions.append("How would you like to feel about this a week from now?")
+    if not reframing:
+        reframing.append("Consider viewing this as an opportunity for growth")
+    return {"questions": questions[:3], "reframing": reframing}
+
+def local_summary(themes: List[str], biases: List[str], polarity: float) -> str:
+    tone = "positive" if polarity > 0.1 else "difficult" if polarity < -0.1 else "mixed"
+    about = f" about {', '.join(themes[:2])}" if themes else ""
+    pattern = f" There are signs of {biases[0]}, which is worth gently questioning." if biases else ""
+    return f"Thank you for sharing this {tone} reflection{about}.{pattern} Keep noticing what comes up for you."
+
+@dataclass
+class TierStats:
+    requests: Dict[str, int] = field(default_factory=dict)  # tier -> count
+    reasons: Dict[str, int] = field(default_factory=dict)  # reason -> count
+    latencies: Dict[str, Deque[float]] = field(default_factory=dict)  # tier -> recent ms
+
+_stats = TierStats()
+_stats_lock = threading.Lock()
+
+def record_tier(decision: TierDecision, seconds: float) -> None:
+    with _stats_lock:
+        _stats.requests[decision.tier] = _stats.requests.get(decision.tier, 0) + 1
+        _stats.reasons[decision.reason] = _stats.reasons.get(decision.reason, 0) + 1
+        _stats.latencies.setdefault(decision.tier, deque(maxlen=LATENCY_SAMPLES)).append(seconds * 1000)
+
+def tier_metrics() -> Dict:
+    """Share of analyses served locally and latency percentiles per tier, in this process."""
+    with _stats_lock:
+        requests = dict(_stats.requests)
+        reasons = dict(_stats.reasons)
+        latencies = {tier: np.array(samples) for tier, samples in _stats.latencies.items()}
+    total = sum(requests.values())
+    return {
+        "mode": ANALYSIS_MODE,
+        "requests": total,
+        "local_share": round(requests.get("local", 0) / total, 4) if total else None,
+        "by_tier": requests,
+        "by_reason": reasons,
+        "latency_ms": {
+            tier: {"samples": len(samples), "mean": round(float(samples.mean()), 2),
+                   **{f"p{q}": round(float(np.percentile(samples, q)), 2) for q in (50, 90, 99)}}
+            for tier, samples in latencies.items()
+        },
+    }
@@ -0,0 +1,64 @@
+from datetime import date
+from typing import Dict, List, Optional
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from database.models import CheckIn, Habit, JournalEntry
+from habits.streaks import StreakState, current_streak
+
+# Plain dicts rather than ORM objects, so results can be cached and shared
+# between requests and processes. Columns are selected directly, so rows are
+# mapped straight to dicts without entering the session's identity map.
+
+def list_journal_entries(db: Session, user_id: int, skip: int = 0, limit: int = 10) -> List[Dict]:
+    """A page of the user's journal entries, newest first."""
+    rows = db.execute(
+        select(JournalEntry.id, JournalEntry.entry_text, JournalEntry.mood, JournalEntry.created_at,
+               JournalEntry.ai_reflection.label("ai_insights"))
+        .where(JournalEntry.user_id == user_id)
+        .order_by(JournalEntry.created_at.desc(), JournalEntry.id.desc())
+        .offset(skip)
+        .limit(limit)
+    ).mappings()
+    return [dict(row) for row in rows]
+
+def list_habits(db: Session, user_id: int, skip: int = 0, limit: int = 10, today: Optional[date] = None) -> List[Dict]:
+    """
+    A page of the user's habits with their current streaks, oldest first.
+    A streak with a whole period since its last completion reads as 0, as
+    on the dashboard.
+    """
+    rows = db.execute(
+        select(Habit.id, Habit.habit_name, Habit.frequency, Habit.target_days, Habit.streak,
+               Habit.best_streak, Habit.last_completed_on, Habit.created_at, Habit.last_logged)
+        .where(Habit.user_id == user_id)
+        .order_by(Habit.id)
+        .offset(skip)
+        .limit(limit)
+    ).mappings()
+    return [
+        {
+            "id": row["id"],
+            "habit_name": row["habit_name"],
+            "frequency": row["frequency"],
+            "target_days": row["target_days"].split(",") if row["target_days"] else None,
+            "streak": current_streak(
+                StreakState(row["streak"] or 0, row["best_streak"] or 0, row["last_completed_on"]),
+                row["frequency"], today
+            ),
+            "created_at": row["created_at"],
+            "last_logged": row["last_logged"],
+        }
+        for row in rows
+    ]
+
+def list_check_ins(db: Session, user_id: int, skip: int = 0, limit: int = 10) -> List[Dict]:
+    """A page of the user's check-ins, newest first."""
+    rows = db.execute(
+        select(CheckIn.id, CheckIn.mood, CheckIn.energy, CheckIn.stress, CheckIn.notes, CheckIn.created_at)
+        .where(CheckIn.user_id == user_id)
+        .order_by(CheckIn.created_at.desc(), CheckIn.id.desc())
+        .offset(skip)
+        .limit(limit)
+    ).mappings()
+    return [dict(row) for row in rows]
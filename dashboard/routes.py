@@ -0,0 +1,26 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from datetime import datetime
+
+from cache.read_through import cached
+from dashboard.service import DASHBOARD_SOURCES, load_dashboard
+from database.database import get_db
+from schemas.serialization import FAST_JSON_ENABLED, FastJSONResponse
+
+router = APIRouter()
+
+@router.get("/dashboard")
+def read_dashboard(user_id: int, db: Session = Depends(get_db)):
+    """Everything the home screen needs in one response, loaded in a fixed number of queries."""
+    today = datetime.utcnow().date()
+
+    def load():
+        dashboard = load_dashboard(db, user_id, today)
+        if dashboard is None:
+            # Raised inside the loader so unknown users are never cached
+            raise HTTPException(status_code=404, detail="User not found")
+        return dashboard
+
+    # Streaks and weekly stats depend on the day, so it is part of the key
+    dashboard = cached(user_id, "dashboard", (today,), load, DASHBOARD_SOURCES)
+    return FastJSONResponse(dashboard) if FAST_JSON_ENABLED else dashboard
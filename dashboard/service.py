@@ -0,0 +1,77 @@
+from datetime import date, datetime, timedelta
+from typing import Dict, Optional
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session, selectinload
+
+from analytics.daily_stats import ALL_METRICS
+from database.models import CheckIn, DailyUserStat, JournalEntry, User
+from dashboard.listings import list_check_ins, list_journal_entries
+from habits.streaks import streak_summary
+
+RECENT_ENTRIES = 5
+RECENT_CHECK_INS = 5
+ACTIVE_HABIT_DAYS = 30  # habits logged within this many days count as active
+STATS_DAYS = 7
+
+# Statements load_dashboard issues, whatever the size of the user's history:
+# user, habits (selectinload), entries, check-ins, totals, weekly rollups
+DASHBOARD_QUERIES = 6
+
+# Resources the dashboard is built from, for read-cache invalidation
+DASHBOARD_SOURCES = ("journal_entries", "habits", "check_ins")
+
+def _is_active(habit, summary: Dict, since: datetime) -> bool:
+    return summary["current_streak"] > 0 or (habit.last_logged is not None and habit.last_logged >= since)
+
+def load_dashboard(db: Session, user_id: int, today: Optional[date] = None) -> Optional[Dict]:
+    """
+    Recent entries, active habits with streaks, latest check-ins and
+    headline stats for one user, in DASHBOARD_QUERIES statements. The
+    User relationships are never touched lazily; habits come in with
+    selectinload and the unbounded lists are fetched with their own limits.
+    """
+    today = today or datetime.utcnow().date()
+    user = db.query(User).options(selectinload(User.habits)).filter(User.id == user_id).first()
+    if user is None:
+        return None
+
+    since = datetime.combine(today - timedelta(days=ACTIVE_HABIT_DAYS), datetime.min.time())
+    habits = []
+    for habit in sorted(user.habits, key=lambda habit: habit.id):
+        summary = streak_summary(habit, today)
+        if not _is_active(habit, summary, since):
+            continue
+        habits.append({
+            "id": habit.id,
+            "habit_name": habit.habit_name,
+            "frequency": habit.frequency,
+            "target_days": habit.target_days.split(",") if habit.target_days else None,
+            "last_logged": habit.last_logged,
+            **summary,
+        })
+
+    totals = db.execute(select(
+        select(func.count()).select_from(JournalEntry).where(JournalEntry.user_id == user_id).scalar_subquery(),
+        select(func.count()).select_from(CheckIn).where(CheckIn.user_id == user_id).scalar_subquery(),
+    )).one()
+    weekly = db.execute(
+        select(DailyUserStat.metric, func.sum(DailyUserStat.count), func.sum(DailyUserStat.value_sum))
+        .where(DailyUserStat.user_id == user_id, DailyUserStat.day > today - timedelta(days=STATS_DAYS))
+        .group_by(DailyUserStat.metric)
+    ).all()
+    means = {metric: round(value_sum / count, 3) for metric, count, value_sum in weekly if count}
+
+    return {
+        "user_id": user.id,
+        "username": user.username,
+        "recent_entries": list_journal_entries(db, user.id, limit=RECENT_ENTRIES),
+        "habits": habits,
+        "check_ins": list_check_ins(db, user.id, limit=RECENT_CHECK_INS),
+        "stats": {
+            "journal_entries": totals[0],
+            "check_ins": totals[1],
+            "active_habits": len(habits),
+            "days": STATS_DAYS,
+            "means": {metric: means.get(metric) for metric in ALL_METRICS},
+        },
+    }
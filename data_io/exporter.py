@@ -0,0 +1,114 @@
+from datetime import date, datetime
+from typing import Dict, Iterable, Iterator, List, Sequence
+from sqlalchemy import select
+from sqlalchemy.orm import Session, sessionmaker
+import csv
+import io
+import json
+import os
+
+from database.database import SessionLocal
+from database.models import CheckIn, Habit, HabitLog, JournalEntry
+
+EXPORT_YIELD_PER = int(os.getenv("EXPORT_YIELD_PER", "1000"))
+EXPORT_FORMATS = ("ndjson", "csv")
+EXPORT_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+# Record types in export order
+EXPORT_MODELS = {
+    "journal_entries": JournalEntry,
+    "habits": Habit,
+    "habit_logs": HabitLog,
+    "check_ins": CheckIn,
+}
+
+# Columns of the owning row exported with each record, so the importer can
+# match it by name rather than by an id from another database
+EXPORT_PARENT_COLUMNS = {
+    "habit_logs": (Habit.habit_name, Habit.frequency, Habit.target_days),
+}
+
+# Derived columns that are rebuilt from other rows and have no JSON or CSV form
+INTERNAL_COLUMNS = {"completion_bitmap", "bitmap_start"}  # habits, from habit_logs
+
+# Rows buffered into each chunk written to the response
+ROWS_PER_CHUNK = 500
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def _exported_columns(model) -> List:
+    return [column for column in model.__table__.columns if column.key not in INTERNAL_COLUMNS]
+
+def export_columns(kinds: Sequence[str]) -> List[str]:
+    """CSV header: the record type followed by the union of exported columns."""
+    columns = {"record_type": None}
+    for kind in kinds:
+        columns.update((column.key, None) for column in _exported_columns(EXPORT_MODELS[kind]))
+        columns.update((column.key, None) for column in EXPORT_PARENT_COLUMNS.get(kind, ()))
+    return list(columns)
+
+def iter_export_records(session: Session, user_id: int, kinds: Sequence[str]) -> Iterator[Dict]:
+    """
+    Yields a user's rows one at a time. Plain column selects with yield_per use a
+    server-side cursor and skip the ORM identity map, so memory use does not
+    grow with history size.
+    """
+    for kind in kinds:
+        model = EXPORT_MODELS[kind]
+        parent_columns = EXPORT_PARENT_COLUMNS.get(kind, ())
+        stmt = select(*_exported_columns(model), *parent_columns)
+        if parent_columns:
+            stmt = stmt.join_from(model, parent_columns[0].class_)
+        stmt = (
+            stmt
+            .where(model.user_id == user_id)
+            .order_by(model.id)
+            .execution_options(yield_per=EXPORT_YIELD_PER)
+        )
+        for row in session.execute(stmt).mappings():
+            yield {"record_type": kind, **row}
+
+def _chunked(records: Iterable[Dict], size: int = ROWS_PER_CHUNK) -> Iterator[List[Dict]]:
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def stream_export(
+    user_id: int,
+    kinds: Sequence[str],
+    fmt: str,
+    session_factory: sessionmaker = SessionLocal
+) -> Iterator[str]:
+    """
+    Generator for a StreamingResponse. It opens its own session because the
+    request-scoped one is closed before the response body is sent.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format {fmt!r}, expected one of {EXPORT_FORMATS}")
+
+    with session_factory() as session:
+        records = iter_export_records(session, user_id, kinds)
+
+        if fmt == "ndjson":
+            for chunk in _chunked(records):
+                yield "".join(json.dumps(record, default=_json_default) + "\n" for record in chunk)
+            return
+
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=export_columns(kinds))
+        writer.writeheader()
+        for chunk in _chunked(records):
+            writer.writerows(chunk)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue()
@@ -0,0 +1,333 @@
+from concurrent.futures import ProcessPoolExecutor
+from collections import deque
+from datetime import date, datetime, timezone
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+from sqlalchemy import select, text, tuple_
+from sqlalchemy.engine import Connection, Engine
+from textblob import TextBlob
+import argparse
+import csv
+import io
+import json
+import logging
+import os
+import sys
+import time
+
+from database.compression import compress_text
+from database.database import engine
+from database.hooks import begin, run_insert_hooks
+from database.models import Habit, HabitLog, JournalEntry
+
+logger = logging.getLogger(__name__)
+
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "1000"))
+SUPPORTED_FORMATS = ("ndjson", "csv")
+
+# Column names other journaling apps commonly export
+TEXT_FIELDS = ("entry_text", "text", "content", "body", "entry")
+DATE_FIELDS = ("created_at", "date", "timestamp", "created")
+
+COPY_COLUMNS = ("id", "user_id", "entry_text", "sentiment_score", "mood", "created_at")
+
+# Record type of habit logs in our own exports; each carries its habit's name and schedule
+HABIT_LOG_RECORD_TYPE = "habit_logs"
+FREQUENCIES = ("daily", "weekly", "monthly")
+
+def detect_format(filename: str) -> str:
+    """Guess the import format from a file name."""
+    extension = os.path.splitext(filename or "")[1].lower()
+    if extension in (".ndjson", ".jsonl", ".json"):
+        return "ndjson"
+    if extension == ".csv":
+        return "csv"
+    raise ValueError(f"Cannot detect import format from {filename!r}, expected one of {SUPPORTED_FORMATS}")
+
+def iter_records(stream: TextIO, fmt: str) -> Iterator[Optional[Dict]]:
+    """
+    Streams raw records from an NDJSON or CSV file. Lines that cannot be
+    parsed are yielded as None so the caller can count them as skipped.
+    """
+    if fmt == "ndjson":
+        for line in stream:
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                yield None
+                continue
+            yield record if isinstance(record, dict) else None
+    elif fmt == "csv":
+        yield from csv.DictReader(stream)
+    else:
+        raise ValueError(f"Unsupported import format {fmt!r}, expected one of {SUPPORTED_FORMATS}")
+
+def _parse_datetime(value) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(str(value).strip().replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    # Stored timestamps are naive UTC
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+def _parse_date(value) -> Optional[date]:
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(str(value).strip()[:10])
+    except ValueError:
+        return None
+
+def _parse_bool(value) -> bool:
+    # CSV exports write Python booleans as text; anything unrecognised counts as completed
+    if isinstance(value, str):
+        return value.strip().lower() not in ("false", "0", "no")
+    return value is not False
+
+def normalize_habit_log(record: Dict) -> Optional[Dict]:
+    """Maps an exported habit log onto habit log fields plus its habit's, or None if incomplete."""
+    habit_name = record.get("habit_name")
+    logged_on = _parse_date(record.get("logged_on"))
+    if not isinstance(habit_name, str) or not habit_name.strip() or logged_on is None:
+        return None
+    frequency = record.get("frequency")
+    return {
+        "habit_name": habit_name,
+        "frequency": frequency if frequency in FREQUENCIES else "daily",
+        "target_days": record.get("target_days") or None,
+        "logged_on": logged_on,
+        "completed": _parse_bool(record.get("completed", True)),
+        "notes": record.get("notes") or None,
+        "created_at": _parse_datetime(record.get("created_at")) or datetime.utcnow()
+    }
+
+def normalize_record(record: Optional[Dict]) -> Optional[Dict]:
+    """Maps a raw record onto journal entry fields, or None if it has no text."""
+    if not record:
+        return None
+    text = next((record[f] for f in TEXT_FIELDS if record.get(f)), None)
+    if not isinstance(text, str) or not text.strip():
+        return None
+    created_at = next((record[f] for f in DATE_FIELDS if record.get(f)), None)
+    return {
+        "entry_text": text,
+        "created_at": _parse_datetime(created_at) or datetime.utcnow()
+    }
+
+def score_batch(texts: List[str]) -> List[Tuple[float, str]]:
+    """Scores sentiment for a batch of entries, using the same mood labels as POST /journal/."""
+    scores = []
+    for text in texts:
+        sentiment = TextBlob(text).sentiment.polarity
+        mood = "Positive" if sentiment > 0 else "Negative" if sentiment < 0 else "Neutral"
+        scores.append((sentiment, mood))
+    return scores
+
+def _batched(records: Iterable[Optional[Dict]], batch_size: int) -> Iterator[Tuple[List[Dict], List[Dict], int]]:
+    """
+    Groups normalized records into batches of journal entries and habit
+    logs, reporting how many were skipped.
+    """
+    batch, habit_logs, skipped = [], [], 0
+    for record in records:
+        if record and record.get("record_type") == HABIT_LOG_RECORD_TYPE:
+            habit_log = normalize_habit_log(record)
+            if habit_log is None:
+                skipped += 1
+            else:
+                habit_logs.append(habit_log)
+        else:
+            entry = normalize_record(record)
+            if entry is None:
+                skipped += 1
+                continue
+            batch.append(entry)
+        if len(batch) + len(habit_logs) >= batch_size:
+            yield batch, habit_logs, skipped
+            batch, habit_logs, skipped = [], [], 0
+    if batch or habit_logs or skipped:
+        yield batch, habit_logs, skipped
+
+def _copy_rows(connection: Connection, rows: List[Dict]) -> None:
+    """Writes rows with COPY ... FROM STDIN (PostgreSQL)."""
+    # COPY cannot return generated keys, so reserve the ids up front for the insert hooks
+    ids = connection.execute(
+        text("SELECT nextval(pg_get_serial_sequence(:table, 'id')) FROM generate_series(1, :count)"),
+        {"table": JournalEntry.__tablename__, "count": len(rows)}
+    ).scalars()
+    for row, row_id in zip(rows, ids):
+        row["id"] = row_id
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        values = dict(row)
+        values["created_at"] = row["created_at"].isoformat()
+        # COPY bypasses column types, so compress here and send bytea in hex form
+        values["entry_text"] = "\\x" + compress_text(row["entry_text"]).hex()
+        writer.writerow([values[column] for column in COPY_COLUMNS])
+    buffer.seek(0)
+
+    cursor = connection.connection.cursor()
+    try:
+        cursor.copy_expert(
+            f"COPY {JournalEntry.__tablename__} ({', '.join(COPY_COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+            buffer
+        )
+    finally:
+        cursor.close()
+
+def write_rows(connection: Connection, rows: List[Dict]) -> None:
+    """Writes a batch of journal rows with the fastest path the backend offers."""
+    if not rows:
+        return
+    if connection.dialect.name == "postgresql":
+        _copy_rows(connection, rows)
+    else:
+        # executemany on SQLite and other backends
+        table = JournalEntry.__table__
+        ids = connection.execute(table.insert().returning(table.c.id, sort_by_parameter_order=True), rows).scalars()
+        for row, row_id in zip(rows, ids):
+            row["id"] = row_id
+
+def write_habit_logs(connection: Connection, user_id: int, logs: List[Dict]) -> List[Dict]:
+    """
+    Writes a batch of habit logs, creating the user's habits that do not
+    exist yet by name. A day the habit already has a log for keeps it, as
+    does a repeated day within the batch. Returns the rows inserted.
+    """
+    habits = Habit.__table__
+    names = {log["habit_name"] for log in logs}
+    habit_ids = dict(connection.execute(
+        select(habits.c.habit_name, habits.c.id).where(habits.c.user_id == user_id, habits.c.habit_name.in_(names))
+    ).all())
+
+    missing = {}
+    for log in logs:
+        if log["habit_name"] not in habit_ids:
+            missing.setdefault(log["habit_name"], {
+                "user_id": user_id, "habit_name": log["habit_name"], "frequency": log["frequency"],
+                "target_days": log["target_days"], "streak": 0, "best_streak": 0, "created_at": datetime.utcnow()
+            })
+    if missing:
+        new_habits = list(missing.values())
+        ids = connection.execute(habits.insert().returning(habits.c.id, sort_by_parameter_order=True), new_habits).scalars()
+        for habit, habit_id in zip(new_habits, ids):
+            habit["id"] = habit_ids[habit["habit_name"]] = habit_id
+        run_insert_hooks(connection, Habit.__tablename__, new_habits)
+
+    rows = {}
+    for log in logs:
+        key = (habit_ids[log["habit_name"]], log["logged_on"])
+        rows.setdefault(key, {
+            "habit_id": key[0], "user_id": user_id, "logged_on": key[1],
+            "completed": log["completed"], "notes": log["notes"], "created_at": log["created_at"]
+        })
+    table = HabitLog.__table__
+    existing = set(connection.execute(
+        select(table.c.habit_id, table.c.logged_on)
+        .where(tuple_(table.c.habit_id, table.c.logged_on).in_(list(rows)))
+    ).all())
+    rows = [row for key, row in rows.items() if key not in existing]
+    if rows:
+        ids = connection.execute(table.insert().returning(table.c.id, sort_by_parameter_order=True), rows).scalars()
+        for row, row_id in zip(rows, ids):
+            row["id"] = row_id
+        run_insert_hooks(connection, HabitLog.__tablename__, rows)
+    return rows
+
+def import_journal_entries(
+    stream: TextIO,
+    user_id: int,
+    fmt: str,
+    bind: Engine = engine,
+    batch_size: int = IMPORT_BATCH_SIZE,
+    workers: int = 1,
+    on_progress: Optional[Callable[[int, int], None]] = None
+) -> Dict:
+    """
+    Streams journal entries, and the habit logs of a full export, from a
+    file into the database. Sentiment is scored one batch at a time (across
+    a process pool when workers > 1) and every batch is written in its own
+    transaction.
+    """
+    started = time.perf_counter()
+    imported = habit_logs_imported = skipped = batches = 0
+
+    def store(batch: List[Dict], habit_logs: List[Dict], scores: List[Tuple[float, str]], batch_skipped: int) -> None:
+        nonlocal imported, habit_logs_imported, skipped, batches
+        rows = [
+            {"user_id": user_id, "sentiment_score": sentiment, "mood": mood, **entry}
+            for entry, (sentiment, mood) in zip(batch, scores)
+        ]
+        if rows or habit_logs:
+            with begin(bind) as connection:
+                if rows:
+                    write_rows(connection, rows)
+                    run_insert_hooks(connection, JournalEntry.__tablename__, rows)
+                if habit_logs:
+                    habit_logs_imported += len(write_habit_logs(connection, user_id, habit_logs))
+            batches += 1
+        imported += len(rows)
+        skipped += batch_skipped
+        logger.info(f"Journal import for user {user_id}: {imported} imported, "
+                    f"{habit_logs_imported} habit logs, {skipped} skipped")
+        if on_progress:
+            on_progress(imported, skipped)
+
+    batched = _batched(iter_records(stream, fmt), batch_size)
+    if workers > 1:
+        # Keep a bounded number of batches in flight so the file is still streamed
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            in_flight = deque()
+            for batch, habit_logs, batch_skipped in batched:
+                future = executor.submit(score_batch, [e["entry_text"] for e in batch])
+                in_flight.append((batch, habit_logs, batch_skipped, future))
+                if len(in_flight) >= workers * 2:
+                    batch, habit_logs, batch_skipped, future = in_flight.popleft()
+                    store(batch, habit_logs, future.result(), batch_skipped)
+            while in_flight:
+                batch, habit_logs, batch_skipped, future = in_flight.popleft()
+                store(batch, habit_logs, future.result(), batch_skipped)
+    else:
+        for batch, habit_logs, batch_skipped in batched:
+            store(batch, habit_logs, score_batch([e["entry_text"] for e in batch]), batch_skipped)
+
+    return {
+        "imported": imported,
+        "habit_logs_imported": habit_logs_imported,
+        "skipped": skipped,
+        "batches": batches,
+        "elapsed_seconds": round(time.perf_counter() - started, 3)
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk import journal entries and habit logs from NDJSON or CSV")
+    parser.add_argument("path", help="File to import")
+    parser.add_argument("--user-id", type=int, required=True, help="User the entries belong to")
+    parser.add_argument("--format", choices=SUPPORTED_FORMATS, help="File format (detected from the extension by default)")
+    parser.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Processes used for sentiment scoring")
+    args = parser.parse_args()
+
+    fmt = args.format or detect_format(args.path)
+
+    def print_progress(imported: int, skipped: int) -> None:
+        print(f"\r📥 {imported} imported, {skipped} skipped", end="", file=sys.stderr, flush=True)
+
+    with open(args.path, encoding="utf-8", newline="") as f:
+        summary = import_journal_entries(
+            f, args.user_id, fmt,
+            batch_size=args.batch_size,
+            workers=args.workers,
+            on_progress=print_progress
+        )
+
+    print(file=sys.stderr)
+    print(json.dumps(summary, indent=2))
@@ -0,0 +1,81 @@
+from fastapi import APIRouter, Depends, File, HTTPException, UploadFile, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from typing import Optional
+import io
+import logging
+
+from database.database import get_db
+from database.models import User
+from data_io.importer import SUPPORTED_FORMATS, detect_format, import_journal_entries
+from data_io.exporter import EXPORT_FORMATS, EXPORT_MEDIA_TYPES, EXPORT_MODELS, stream_export
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+@router.post("/journal/import", status_code=status.HTTP_201_CREATED)
+def import_journal(
+    user_id: int,
+    file: UploadFile = File(...),
+    format: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """Bulk import journal entries, and habit logs from a full export, from an NDJSON or CSV file."""
+    user = db.query(User).filter(User.id == user_id).first()
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    try:
+        fmt = format or detect_format(file.filename)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if fmt not in SUPPORTED_FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unsupported format '{fmt}', expected one of {', '.join(SUPPORTED_FORMATS)}"
+        )
+
+    stream = io.TextIOWrapper(file.file, encoding="utf-8", newline="")
+    try:
+        summary = import_journal_entries(stream, user.id, fmt)
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Import file must be UTF-8 encoded")
+    finally:
+        stream.detach()
+
+    logger.info(f"Imported {summary['imported']} journal entries and {summary['habit_logs_imported']} habit logs "
+                f"for user {user.id}")
+    return {"message": "Journal import complete", **summary}
+
+@router.get("/export/{user_id}")
+def export_history(
+    user_id: int,
+    format: str = "ndjson",
+    kinds: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """Stream a user's journal entries, habits, habit logs and check-ins as NDJSON or CSV."""
+    user = db.query(User).filter(User.id == user_id).first()
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unsupported format '{format}', expected one of {', '.join(EXPORT_FORMATS)}"
+        )
+
+    selected = [kind.strip() for kind in kinds.split(",")] if kinds else list(EXPORT_MODELS)
+    unknown = [kind for kind in selected if kind not in EXPORT_MODELS]
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown record types: {', '.join(unknown)}"
+        )
+
+    return StreamingResponse(
+        stream_export(user.id, selected, format),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="mindmirror-export-{user.id}.{format}"'}
+    )
@@ -0,0 +1,220 @@
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence
+from sqlalchemy import Integer, LargeBinary, bindparam, column, func, select, table, types
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import SQLAlchemyError
+import argparse
+import json
+import logging
+import os
+import threading
+import time
+import zstandard
+
+logger = logging.getLogger(__name__)
+
+COMPRESSION_LEVEL = int(os.getenv("COMPRESSION_LEVEL", "3"))
+DICTIONARY_SIZE = 64 * 1024
+TRAIN_SAMPLE = 10000  # texts used to train a dictionary
+MIN_TRAIN_SAMPLES = 100  # zstd cannot build a useful dictionary from fewer
+MIN_COMPRESS_BYTES = 32  # shorter values are stored as plain UTF-8
+DICTIONARY_REFRESH_SECONDS = 300  # how often a process looks for a newer dictionary
+RECOMPRESS_BATCH = 1000
+
+# Every stored value starts with a format byte. Compressed frames record the
+# id of the dictionary they were written with, so older dictionaries keep
+# decoding their rows after a new one is trained.
+RAW = b"\x00"
+ZSTD = b"\x01"
+
+dictionaries = table(
+    "compression_dictionaries",
+    column("id", Integer),
+    column("data", LargeBinary),
+    column("samples", Integer),
+    column("created_at"),
+)
+
+# (table, columns) whose values are compressed, for the recompress command
+COMPRESSED_COLUMNS = {"journal_entries": ("entry_text", "ai_reflection")}
+
+_dictionaries: Dict[int, zstandard.ZstdCompressionDict] = {}
+_active_id: Optional[int] = None
+_checked_at = 0.0
+_lock = threading.Lock()
+_local = threading.local()  # zstd contexts are not thread-safe
+
+def register_dictionary(dictionary_id: int, data: bytes) -> None:
+    """Makes a dictionary available to this process and uses the newest one for writes."""
+    global _active_id
+    with _lock:
+        _dictionaries[dictionary_id] = zstandard.ZstdCompressionDict(data)
+        if _active_id is None or dictionary_id > _active_id:
+            _active_id = dictionary_id
+
+def load_dictionaries(connection: Connection) -> int:
+    """Registers every stored dictionary; returns how many there are."""
+    global _checked_at
+    rows = connection.execute(select(dictionaries.c.id, dictionaries.c.data)).all()
+    for row in rows:
+        if row.id not in _dictionaries:
+            register_dictionary(row.id, row.data)
+    _checked_at = time.monotonic()
+    return len(rows)
+
+def _load_from_default_engine() -> None:
+    global _checked_at
+    from database.database import engine
+    try:
+        with engine.connect() as connection:
+            load_dictionaries(connection)
+    except SQLAlchemyError as e:
+        # Before the migration has run there are no dictionaries to load
+        logger.debug(f"Could not load compression dictionaries: {str(e)}")
+        _checked_at = time.monotonic()
+
+def _dictionary(dictionary_id: int) -> zstandard.ZstdCompressionDict:
+    if dictionary_id not in _dictionaries:
+        _load_from_default_engine()
+    if dictionary_id not in _dictionaries:
+        raise LookupError(f"Compression dictionary {dictionary_id} is not available")
+    return _dictionaries[dictionary_id]
+
+def active_dictionary_id() -> Optional[int]:
+    """The dictionary new values are compressed with, rechecked periodically."""
+    if time.monotonic() - _checked_at > DICTIONARY_REFRESH_SECONDS:
+        _load_from_default_engine()
+    return _active_id
+
+def _compressor(dictionary_id: Optional[int]) -> zstandard.ZstdCompressor:
+    compressors = _local.__dict__.setdefault("compressors", {})
+    if dictionary_id not in compressors:
+        compressors[dictionary_id] = zstandard.ZstdCompressor(
+            level=COMPRESSION_LEVEL,
+            dict_data=_dictionary(dictionary_id) if dictionary_id else None
+        )
+    return compressors[dictionary_id]
+
+def _decompressor(dictionary_id: int) -> zstandard.ZstdDecompressor:
+    decompressors = _local.__dict__.setdefault("decompressors", {})
+    if dictionary_id not in decompressors:
+        decompressors[dictionary_id] = zstandard.ZstdDecompressor(
+            dict_data=_dictionary(dictionary_id) if dictionary_id else None
+        )
+    return decompressors[dictionary_id]
+
+def compress_text(value: str, dictionary_id: Optional[int] = None) -> bytes:
+    """Encodes text for storage, with the given or the active dictionary."""
+    raw = value.encode("utf-8")
+    if len(raw) < MIN_COMPRESS_BYTES:
+        return RAW + raw
+    if dictionary_id is None:
+        dictionary_id = active_dictionary_id()
+    compressed = _compressor(dictionary_id).compress(raw)
+    return ZSTD + compressed if len(compressed) < len(raw) else RAW + raw
+
+def decompress_text(value) -> str:
+    """Decodes a stored value; plain strings written before compression pass through."""
+    if isinstance(value, str):
+        return value
+    value = bytes(value)
+    if value[:1] == RAW:
+        return value[1:].decode("utf-8")
+    if value[:1] != ZSTD:
+        raise ValueError("Unknown compressed text format")
+    frame = value[1:]
+    dictionary_id = zstandard.get_frame_parameters(frame).dict_id
+    return _decompressor(dictionary_id).decompress(frame).decode("utf-8")
+
+class CompressedText(types.TypeDecorator):
+    """
+    A text column stored as zstd-compressed bytes. Reads and writes see
+    plain str; the dictionary in use is tracked per value.
+    """
+    impl = LargeBinary
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return None if value is None else compress_text(value)
+
+    def process_result_value(self, value, dialect):
+        return None if value is None else decompress_text(value)
+
+def train_dictionary(texts: Sequence[str], size: int = DICTIONARY_SIZE, dictionary_id: int = 1) -> bytes:
+    """Trains a zstd dictionary on a sample of texts."""
+    samples = [text.encode("utf-8") for text in texts if text]
+    if len(samples) < MIN_TRAIN_SAMPLES:
+        raise ValueError(f"Need at least {MIN_TRAIN_SAMPLES} texts to train a compression dictionary")
+    return zstandard.train_dictionary(size, samples, dict_id=dictionary_id, level=COMPRESSION_LEVEL).as_bytes()
+
+def sample_texts(connection: Connection, limit: int = TRAIN_SAMPLE) -> List[str]:
+    """A random sample of stored texts from every compressed column."""
+    texts: List[str] = []
+    for table_name, column_names in COMPRESSED_COLUMNS.items():
+        # Untyped, so values are read as stored whatever the column type
+        source = table(table_name, *(column(name) for name in column_names))
+        for name in column_names:
+            values = connection.execute(
+                select(source.c[name]).where(source.c[name].isnot(None)).order_by(func.random()).limit(limit)
+            ).scalars()
+            texts.extend(decompress_text(value) for value in values)
+    return texts
+
+def create_dictionary(connection: Connection, texts: Optional[Sequence[str]] = None) -> int:
+    """Trains, stores and activates a new dictionary; returns its id."""
+    load_dictionaries(connection)
+    dictionary_id = (connection.execute(select(func.max(dictionaries.c.id))).scalar() or 0) + 1
+    texts = sample_texts(connection) if texts is None else texts
+    data = train_dictionary(texts, dictionary_id=dictionary_id)
+    connection.execute(dictionaries.insert().values(
+        id=dictionary_id, data=data, samples=len(texts), created_at=datetime.utcnow()
+    ))
+    register_dictionary(dictionary_id, data)
+    return dictionary_id
+
+def recompress(bind: Engine, batch_size: int = RECOMPRESS_BATCH) -> int:
+    """Rewrites every compressed value with the active dictionary, one transaction per batch."""
+    with bind.connect() as connection:
+        load_dictionaries(connection)
+    dictionary_id = active_dictionary_id()
+    rewritten = 0
+    for table_name, column_names in COMPRESSED_COLUMNS.items():
+        source = table(table_name, column("id", Integer), *(column(name) for name in column_names))
+        update = source.update().where(source.c.id == bindparam("row_id"))
+        last_id = 0
+        while True:
+            with bind.begin() as connection:
+                rows = connection.execute(
+                    select(source).where(source.c.id > last_id).order_by(source.c.id).limit(batch_size)
+                ).mappings().all()
+                if not rows:
+                    break
+                connection.execute(update, [
+                    {"row_id": row["id"], **{
+                        name: None if row[name] is None else compress_text(decompress_text(row[name]), dictionary_id)
+                        for name in column_names
+                    }}
+                    for row in rows
+                ])
+            rewritten += len(rows)
+            last_id = rows[-1]["id"]
+    return rewritten
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage zstd dictionaries for compressed text columns")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    train = subcommands.add_parser("train", help="Train a new dictionary on stored texts and use it for new writes")
+    train.add_argument("--sample", type=int, default=TRAIN_SAMPLE, help="Texts sampled per column")
+    rewrite = subcommands.add_parser("recompress", help="Rewrite stored values with the newest dictionary")
+    rewrite.add_argument("--batch-size", type=int, default=RECOMPRESS_BATCH)
+    args = parser.parse_args()
+
+    from database.database import engine
+    if args.command == "train":
+        with engine.begin() as connection:
+            texts = sample_texts(connection, args.sample)
+            dictionary_id = create_dictionary(connection, texts)
+        print(json.dumps({"status": "success", "dictionary_id": dictionary_id, "samples": len(texts)}))
+    elif args.command == "recompress":
+        rewritten = recompress(engine, args.batch_size)
+        print(json.dumps({"status": "success", "dictionary_id": active_dictionary_id(), "rows": rewritten}))
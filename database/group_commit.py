@@ -0,0 +1,197 @@
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+from sqlalchemy import Table
+from sqlalchemy.engine import Engine
+import logging
+import os
+import queue
+import threading
+import time
+
+from database.database import engine
+from database.hooks import begin, run_insert_hooks
+
+logger = logging.getLogger(__name__)
+
+# Group-commit configuration
+GROUP_COMMIT_ENABLED = os.getenv("GROUP_COMMIT_ENABLED", "false").lower() in ("1", "true", "yes")
+GROUP_COMMIT_MAX_DELAY_MS = float(os.getenv("GROUP_COMMIT_MAX_DELAY_MS", "5"))
+GROUP_COMMIT_MAX_BATCH = int(os.getenv("GROUP_COMMIT_MAX_BATCH", "500"))
+GROUP_COMMIT_DURABILITY = os.getenv("GROUP_COMMIT_DURABILITY", "commit")  # commit, enqueue
+
+DURABILITY_MODES = ("commit", "enqueue")
+
+@dataclass
+class _PendingInsert:
+    """A single row waiting to be written by the group-commit writer."""
+    table: Table
+    values: Dict
+    future: Future = field(default_factory=Future)
+
+class GroupCommitWriter:
+    """
+    Collects single-row inserts from concurrent requests and writes them
+    in one transaction as multi-row INSERTs.
+
+    With durability="commit" a caller is acknowledged with its row id once
+    the batch has committed. With durability="enqueue" the caller is
+    acknowledged as soon as the row is queued; the id is not known yet and
+    write failures are only logged.
+    """
+
+    def __init__(
+        self,
+        bind: Engine,
+        max_delay_ms: float = GROUP_COMMIT_MAX_DELAY_MS,
+        max_batch: int = GROUP_COMMIT_MAX_BATCH,
+        durability: str = GROUP_COMMIT_DURABILITY
+    ):
+        if durability not in DURABILITY_MODES:
+            raise ValueError(f"durability must be one of {DURABILITY_MODES}, got {durability!r}")
+        self.bind = bind
+        self.max_delay = max_delay_ms / 1000
+        self.max_batch = max_batch
+        self.durability = durability
+        self._queue: "queue.Queue[Optional[_PendingInsert]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        """Start the background flush thread."""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="group-commit-writer", daemon=True
+                )
+                self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Flush everything still queued and stop the background thread."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(None)
+            thread.join(timeout)
+
+    def submit(self, table: Table, values: Dict) -> Future:
+        """
+        Queue a row for insertion. The returned future resolves to the new
+        row id (durability="commit") or to None right away (durability="enqueue").
+        """
+        if self._thread is None:
+            raise RuntimeError("GroupCommitWriter is not running")
+
+        pending = _PendingInsert(table=table, values=dict(values))
+        self._queue.put(pending)
+
+        if self.durability == "enqueue":
+            acknowledged = Future()
+            acknowledged.set_result(None)
+            return acknowledged
+        return pending.future
+
+    def insert(self, table: Table, values: Dict, timeout: Optional[float] = None) -> Optional[int]:
+        """Queue a row and block until it is acknowledged."""
+        return self.submit(table, values).result(timeout)
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            first = self._queue.get()
+            if first is None:
+                break
+
+            batch = [first]
+            deadline = time.monotonic() + self.max_delay
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            self._flush(batch)
+
+        # Drain anything queued behind the stop marker
+        leftover = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None:
+                leftover.append(item)
+        for start in range(0, len(leftover), self.max_batch):
+            self._flush(leftover[start:start + self.max_batch])
+
+    def _flush(self, batch: List[_PendingInsert]) -> None:
+        try:
+            row_ids = self._write(batch)
+        except Exception as e:
+            if len(batch) == 1:
+                self._fail(batch[0], e)
+                return
+            # Retry row by row so one bad row does not fail its neighbours
+            logger.warning(f"Group commit of {len(batch)} rows failed, retrying individually: {str(e)}")
+            for pending in batch:
+                self._flush([pending])
+            return
+
+        for pending, row_id in zip(batch, row_ids):
+            if not pending.future.done():
+                pending.future.set_result(row_id)
+
+    def _write(self, batch: List[_PendingInsert]) -> List[Optional[int]]:
+        """Write a batch in one transaction, one multi-row INSERT per table and column set."""
+        groups: Dict[tuple, List[int]] = {}
+        for position, pending in enumerate(batch):
+            key = (pending.table.name, tuple(sorted(pending.values)))
+            groups.setdefault(key, []).append(position)
+
+        row_ids: List[Optional[int]] = [None] * len(batch)
+        with begin(self.bind) as connection:
+            for positions in groups.values():
+                table = batch[positions[0]].table
+                result = connection.execute(
+                    table.insert().returning(*table.columns, sort_by_parameter_order=True),
+                    [batch[position].values for position in positions]
+                )
+                rows = [dict(row) for row in result.mappings()]
+                for position, row in zip(positions, rows):
+                    row_ids[position] = row["id"]
+                run_insert_hooks(connection, table.name, rows)
+        return row_ids
+
+    def _fail(self, pending: _PendingInsert, error: Exception) -> None:
+        logger.error(f"Group commit insert into {pending.table.name} failed: {str(error)}")
+        if not pending.future.done():
+            pending.future.set_exception(error)
+
+_writer: Optional[GroupCommitWriter] = None
+_writer_lock = threading.Lock()
+
+def get_group_commit_writer() -> Optional[GroupCommitWriter]:
+    """Return the shared writer, or None when group commit is disabled."""
+    global _writer
+    if not GROUP_COMMIT_ENABLED:
+        return None
+    with _writer_lock:
+        if _writer is None:
+            _writer = GroupCommitWriter(engine)
+            _writer.start()
+    return _writer
+
+def shutdown_group_commit_writer() -> None:
+    """Flush and stop the shared writer, if it was started."""
+    global _writer
+    with _writer_lock:
+        writer, _writer = _writer, None
+    if writer is not None:
+        writer.stop()
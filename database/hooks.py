@@ -0,0 +1,159 @@
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List
+from sqlalchemy import event, inspect
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+import importlib
+import threading
+
+# Modules that register insert hooks; imported on first use so every write
+# path (ORM flushes, group commit, bulk import) sees the same hooks
+INSERT_HOOK_MODULES = (
+    "analytics.daily_stats",
+    "analytics.online_stats",
+    "habits.streaks",
+    "habits.bitmap",
+    "memory.semantic_index",
+    "search.fulltext",
+    "cache.read_through",
+    "cache.etags",
+    "sync.changes",
+)
+
+InsertHook = Callable[[Connection, List[Dict]], None]
+
+# Key of an updated row's {column: value before the flush}, for columns that changed
+PREVIOUS = "_previous"
+
+# connection.info key of {fn: items} waiting for the transaction to commit
+AFTER_COMMIT_KEY = "after_commit"
+
+_insert_hooks: Dict[str, List[InsertHook]] = defaultdict(list)
+# (table, "update" or "delete") -> hooks; only ORM flushes report these
+_change_hooks: Dict[tuple, List[InsertHook]] = defaultdict(list)
+_loaded = False
+_load_lock = threading.Lock()
+
+def on_insert(table_name: str):
+    """
+    Registers fn(connection, rows) to run inside the inserting transaction
+    whenever rows are added to table_name.
+    """
+    def decorator(fn: InsertHook) -> InsertHook:
+        _insert_hooks[table_name].append(fn)
+        return fn
+    return decorator
+
+def on_change(table_name: str, *operations: str):
+    """
+    Registers fn(connection, rows) to run inside the transaction when ORM
+    flushes update or delete rows of table_name. Core UPDATE/DELETE
+    statements do not trigger it. Updated rows carry the replaced values
+    under PREVIOUS.
+    """
+    def decorator(fn: InsertHook) -> InsertHook:
+        for operation in operations or ("update", "delete"):
+            _change_hooks[(table_name, operation)].append(fn)
+        return fn
+    return decorator
+
+def load_insert_hooks() -> None:
+    """Import every hook module once."""
+    global _loaded
+    if _loaded:
+        return
+    with _load_lock:
+        if not _loaded:
+            for module in INSERT_HOOK_MODULES:
+                importlib.import_module(module)
+            _loaded = True
+
+def run_insert_hooks(connection: Connection, table_name: str, rows: List[Dict]) -> None:
+    """Runs the hooks for a batch of freshly inserted rows."""
+    if not rows:
+        return
+    load_insert_hooks()
+    for hook in _insert_hooks.get(table_name, ()):
+        hook(connection, rows)
+
+def _row(mapper, target) -> Dict:
+    return {column.key: getattr(target, column.key) for column in mapper.local_table.columns}
+
+def _previous(mapper, target) -> Dict:
+    # Only values that were loaded are known; see active_history on the column
+    state = inspect(target)
+    previous = {}
+    for column in mapper.local_table.columns:
+        deleted = state.attrs[column.key].history.deleted
+        if deleted:
+            previous[column.key] = deleted[0]
+    return previous
+
+def _after_insert(mapper, connection, target) -> None:
+    run_insert_hooks(connection, mapper.local_table.name, [_row(mapper, target)])
+
+def _on_change(operation: str):
+    def listener(mapper, connection, target) -> None:
+        load_insert_hooks()
+        hooks = _change_hooks.get((mapper.local_table.name, operation), ())
+        if not hooks:
+            return
+        row = _row(mapper, target)
+        if operation == "update":
+            row[PREVIOUS] = _previous(mapper, target)
+        for hook in hooks:
+            hook(connection, [row])
+    return listener
+
+def listen_for_inserts(base) -> None:
+    """Routes ORM inserts, updates and deletes for every model on base through the hooks."""
+    event.listen(base, "after_insert", _after_insert, propagate=True)
+    event.listen(base, "after_update", _on_change("update"), propagate=True)
+    # Before the DELETE, while expired attributes can still be loaded
+    event.listen(base, "before_delete", _on_change("delete"), propagate=True)
+
+# Work that must only happen once a transaction has really committed, such as
+# writing outside the database. ConnectionEvents.commit fires before the
+# DBAPI commit, so callbacks run from Session.after_commit or, for Core
+# writes, when begin() below exits.
+
+def after_commit(connection: Connection, fn: Callable[[List], None], items: List) -> None:
+    """
+    Defers fn(items) until the transaction on connection commits; dropped
+    if it rolls back. Items queued for the same fn in one transaction are
+    passed to a single call.
+    """
+    connection.info.setdefault(AFTER_COMMIT_KEY, {}).setdefault(fn, []).extend(items)
+
+def _run_after_commit(info: Dict) -> None:
+    for fn, items in info.pop(AFTER_COMMIT_KEY, {}).items():
+        fn(items)
+
+@contextmanager
+def begin(bind: Engine) -> Iterator[Connection]:
+    """bind.begin() for Core writes, running after_commit callbacks once the commit has succeeded."""
+    with bind.begin() as connection:
+        info = connection.info
+        yield connection
+    _run_after_commit(info)
+
+@event.listens_for(Engine, "begin")
+@event.listens_for(Engine, "rollback")
+def _discard_after_commit(connection: Connection) -> None:
+    # Also on begin, for callbacks left behind by a commit that failed
+    connection.info.pop(AFTER_COMMIT_KEY, None)
+
+@event.listens_for(Session, "after_begin")
+def _track_connection(session: Session, transaction, connection: Connection) -> None:
+    session.info.setdefault(AFTER_COMMIT_KEY, []).append(connection.info)
+
+@event.listens_for(Session, "after_commit")
+def _session_committed(session: Session) -> None:
+    for info in session.info.pop(AFTER_COMMIT_KEY, ()):
+        _run_after_commit(info)
+
+@event.listens_for(Session, "after_transaction_end")
+def _session_transaction_end(session: Session, transaction) -> None:
+    if transaction.parent is None:
+        session.info.pop(AFTER_COMMIT_KEY, None)
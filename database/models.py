@@ -1,8 +1,11 @@
-from sqlalchemy import Column, Integer, String, DateTime, Float, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Date, Float, Boolean, LargeBinary, ForeignKey, Index, UniqueConstraint
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import column_property, relationship
 import datetime
 
+from database.compression import CompressedText
+from database.hooks import listen_for_inserts
+
 Base = declarative_base()
 
 class User(Base):
@@ -22,10 +25,11 @@ class JournalEntry(Base):
     __tablename__ = "journal_entries"
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
-    entry_text = Column(String)
+    # Loads the old text on assignment, so the search index can drop its terms
+    entry_text = column_property(Column(CompressedText), active_history=True)
     sentiment_score = Column(Float)
     mood = Column(String)
-    ai_reflection = Column(String, nullable=True)
+    ai_reflection = Column(CompressedText, nullable=True)
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
     
     # Relationship
@@ -37,12 +41,35 @@ class Habit(Base):
     user_id = Column(Integer, ForeignKey("users.id"))
     habit_name = Column(String)
     frequency = Column(String)  # daily, weekly, monthly
+    target_days = Column(String, nullable=True)  # e.g. "Monday,Wednesday,Friday" for weekly habits
     streak = Column(Integer, default=0)
+    best_streak = Column(Integer, default=0)
+    last_completed_on = Column(Date)
+    completion_bitmap = Column(LargeBinary, nullable=True)  # one bit per scheduled slot
+    bitmap_start = Column(Date, nullable=True)
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
     last_logged = Column(DateTime)
     
-    # Relationship
+    # Relationships
     user = relationship("User", back_populates="habits")
+    logs = relationship("HabitLog", back_populates="habit")
+
+class HabitLog(Base):
+    __tablename__ = "habit_logs"
+    __table_args__ = (
+        # One log per habit and day; logging again updates it
+        UniqueConstraint("habit_id", "logged_on", name="uq_habit_logs_habit_id_logged_on"),
+    )
+    id = Column(Integer, primary_key=True, index=True)
+    habit_id = Column(Integer, ForeignKey("habits.id"))
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
+    logged_on = Column(Date)
+    completed = Column(Boolean, default=True)
+    notes = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    
+    # Relationship
+    habit = relationship("Habit", back_populates="logs")
 
 class CheckIn(Base):
     __tablename__ = "check_ins"
@@ -56,3 +83,151 @@ class CheckIn(Base):
     
     # Relationship
     user = relationship("User", back_populates="check_ins")
+
+class DailyUserStat(Base):
+    __tablename__ = "daily_user_stats"
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    metric = Column(String, primary_key=True)  # sentiment, mood, energy, stress
+    count = Column(Integer, default=0)
+    value_sum = Column(Float, default=0)
+    value_sum_sq = Column(Float, default=0)
+    value_min = Column(Float)
+    value_max = Column(Float)
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
+
+class CheckInStat(Base):
+    __tablename__ = "checkin_stats"
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    metric = Column(String, primary_key=True)  # mood, energy, stress
+    count = Column(Integer, default=0)
+    mean = Column(Float, default=0)
+    m2 = Column(Float, default=0)  # Welford sum of squared deviations
+    ewma = Column(Float)
+    cusum = Column(Float, default=0)  # accumulated movement in the adverse direction
+    last_value = Column(Float)
+    alert = Column(String)  # None, "change" or "distress"
+    alerted_at = Column(DateTime)
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
+
+class ProfileSummary(Base):
+    __tablename__ = "profile_summaries"
+    __table_args__ = (
+        UniqueConstraint("user_id", "version", name="uq_profile_summaries_user_id_version"),
+    )
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
+    version = Column(Integer)
+    kind = Column(String)  # delta or compaction
+    summary = Column(String)
+    token_count = Column(Integer)
+    covered_through_entry_id = Column(Integer)  # last journal entry folded in
+    entries_folded = Column(Integer, default=0)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+class CompressionDictionary(Base):
+    __tablename__ = "compression_dictionaries"
+    id = Column(Integer, primary_key=True)  # also the zstd dictionary id written into each frame
+    data = Column(LargeBinary)
+    samples = Column(Integer)  # texts the dictionary was trained on
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+class CollectionVersion(Base):
+    __tablename__ = "collection_versions"
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    collection = Column(String, primary_key=True)  # journal_entries, habits, check_ins
+    version = Column(Integer, default=0)  # bumped in the transaction of every write
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+class ChangeLogEntry(Base):
+    __tablename__ = "change_log"
+    __table_args__ = (
+        Index("ix_change_log_user_id_collection_row_id", "user_id", "collection", "row_id"),
+    )
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    seq = Column(Integer, primary_key=True)  # per-user, increases in commit order
+    collection = Column(String)  # journal_entries, habits, habit_logs, check_ins
+    row_id = Column(Integer)
+    operation = Column(String)  # upsert or delete
+    changed_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+class SyncSequence(Base):
+    __tablename__ = "sync_sequences"
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    last_seq = Column(Integer, default=0)
+
+class LLMLabel(Base):
+    __tablename__ = "llm_labels"
+    id = Column(Integer, primary_key=True)
+    task = Column(String, index=True)  # themes, emotions or cognitive_biases
+    text = Column(CompressedText)  # the text the LLM classified
+    labels = Column(String)  # JSON: a list of labels, or {emotion: intensity} for emotions
+    model = Column(String)  # LLM that produced the labels
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+class ReviewReport(Base):
+    __tablename__ = "review_reports"
+    __table_args__ = (
+        UniqueConstraint("user_id", "period", "period_start", name="uq_review_reports_user_id_period_period_start"),
+    )
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
+    period = Column(String)  # month or quarter
+    period_start = Column(Date)
+    period_end = Column(Date)  # inclusive
+    summary = Column(String)  # JSON aggregates
+    generated_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+class ReviewReportChart(Base):
+    __tablename__ = "review_report_charts"
+    report_id = Column(Integer, ForeignKey("review_reports.id"), primary_key=True)
+    name = Column(String, primary_key=True)  # mood, habits
+    png = Column(LargeBinary)
+
+class LLMBatchJob(Base):
+    __tablename__ = "llm_batch_jobs"
+    id = Column(Integer, primary_key=True)
+    name = Column(String, unique=True)  # e.g. weekly_digest:2026-10-12; enqueueing is idempotent per name
+    task = Column(String)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+class LLMBatchRequest(Base):
+    __tablename__ = "llm_batch_requests"
+    __table_args__ = (
+        UniqueConstraint("job_id", "custom_id", name="uq_llm_batch_requests_job_id_custom_id"),
+        Index("ix_llm_batch_requests_job_id_status", "job_id", "status"),
+    )
+    id = Column(Integer, primary_key=True)
+    job_id = Column(Integer, ForeignKey("llm_batch_jobs.id"))
+    custom_id = Column(String)
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
+    body = Column(String)  # JSON: system, prompt, max_tokens
+    status = Column(String, default="pending")  # pending, submitted, done or failed
+    remote_id = Column(String)  # backend batch the request was last submitted in
+    attempts = Column(Integer, default=0)
+    result = Column(String)
+    error = Column(String)
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+class SummaryChunk(Base):
+    __tablename__ = "summary_chunks"
+    key = Column(String, primary_key=True)  # sha256 of the prompt version, model and input texts
+    level = Column(Integer)  # 0 for a chunk of entries, 1+ for reductions of partial summaries
+    summary = Column(CompressedText)
+    token_count = Column(Integer)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+class JournalPrompt(Base):
+    __tablename__ = "journal_prompts"
+    __table_args__ = (
+        Index("ix_journal_prompts_user_id_position", "user_id", "position"),
+    )
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"))
+    position = Column(Integer)  # order in the user's queue, from 0
+    prompt = Column(String)
+    through_entry_id = Column(Integer)  # newest journal entry the queue was generated from
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+# Keep derived tables in step with ORM inserts
+listen_for_inserts(Base)
@@ -0,0 +1,76 @@
+from typing import Any, Callable, Dict, List, Optional, Sequence
+from sqlalchemy import Table, and_, literal, select
+from sqlalchemy.engine import Connection, Row
+
+# Maps the proposed row to the SET clause for rows that already exist
+UpdateValues = Callable[[Any], Dict[str, Any]]
+
+def dialect_insert(connection: Connection):
+    """The dialect's INSERT with ON CONFLICT support, or None where there is none."""
+    if connection.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+        return insert
+    if connection.dialect.name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+        return insert
+    return None
+
+class _Proposed:
+    """A row's own values as bound literals, standing in for EXCLUDED on other dialects."""
+
+    def __init__(self, table: Table, row: Dict):
+        self.__dict__.update(_table=table, _row=row)
+
+    def __getattr__(self, name: str):
+        return literal(self._row.get(name), type_=self._table.c[name].type)
+
+    __getitem__ = __getattr__
+
+def upsert(
+    connection: Connection,
+    table: Table,
+    rows: List[Dict],
+    index_elements: Sequence[str],
+    update: Optional[UpdateValues] = None,
+    returning: Sequence = ()
+) -> List[Row]:
+    """
+    Inserts rows, and for rows whose index_elements already exist applies
+    update(excluded), where excluded holds the proposed row as in ON
+    CONFLICT DO UPDATE; with update=None existing rows are left as they
+    are. PostgreSQL and SQLite use one INSERT ... ON CONFLICT statement.
+    Other dialects get an UPDATE per row, then an INSERT when nothing
+    matched. With returning, the given columns are returned for each row
+    after the write.
+    """
+    if not rows:
+        return []
+
+    insert = dialect_insert(connection)
+    if insert is not None:
+        stmt = insert(table)
+        conflict = [table.c[column] for column in index_elements]
+        if update is None:
+            stmt = stmt.on_conflict_do_nothing(index_elements=conflict)
+        else:
+            stmt = stmt.on_conflict_do_update(index_elements=conflict, set_=update(stmt.excluded))
+            if returning:
+                return [connection.execute(stmt.values(row).returning(*returning)).one() for row in rows]
+        connection.execute(stmt, rows)
+    else:
+        for row in rows:
+            match = _match(table, index_elements, row)
+            if update is not None:
+                found = connection.execute(table.update().where(match).values(update(_Proposed(table, row)))).rowcount
+            else:
+                found = connection.execute(select(literal(1)).select_from(table).where(match)).first() is not None
+            if not found:
+                connection.execute(table.insert().values(row))
+
+    if not returning:
+        return []
+    # A row left alone by DO NOTHING returns nothing from RETURNING, so it is read back
+    return [connection.execute(select(*returning).where(_match(table, index_elements, row))).one() for row in rows]
+
+def _match(table: Table, index_elements: Sequence[str], row: Dict):
+    return and_(*(table.c[column] == row[column] for column in index_elements))
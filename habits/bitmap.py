@@ -0,0 +1,211 @@
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Sequence, Tuple
+from sqlalchemy import select, update
+from sqlalchemy.engine import Connection
+import calendar
+import numpy as np
+
+from database.hooks import on_change, on_insert
+from database.models import Habit
+
+WEEKDAYS = tuple(calendar.day_name)  # Monday .. Sunday
+TREND_WINDOW = 7  # slots
+HEATMAP_SLOTS = 365
+
+def parse_target_days(target_days: Optional[str]) -> Tuple[int, ...]:
+    """'Monday,Friday' -> (0, 4)"""
+    if not target_days:
+        return ()
+    names = {name.lower(): index for index, name in enumerate(WEEKDAYS)}
+    return tuple(sorted({names[day.strip().lower()] for day in target_days.split(",") if day.strip().lower() in names}))
+
+def format_target_days(target_days: Optional[Sequence[str]]) -> Optional[str]:
+    """['friday', 'Monday'] -> 'Monday,Friday'"""
+    days = parse_target_days(",".join(target_days or []))
+    return ",".join(WEEKDAYS[day] for day in days) or None
+
+@dataclass(frozen=True)
+class Schedule:
+    """
+    Maps scheduled days to bit positions: one slot per day for daily habits,
+    per target day (or per ISO week) for weekly habits and per month for
+    monthly habits. Slot 0 is the first scheduled slot on or after start.
+    """
+    frequency: str
+    start: date
+    target_days: Tuple[int, ...] = ()
+
+    def _raw(self, day: date) -> Optional[int]:
+        if self.frequency == "monthly":
+            return day.year * 12 + day.month - 1
+        if self.frequency == "weekly":
+            week = (day.toordinal() - 1 - day.weekday()) // 7  # ordinal 1 is a Monday
+            if not self.target_days:
+                return week
+            if day.weekday() not in self.target_days:
+                return None
+            return week * len(self.target_days) + self.target_days.index(day.weekday())
+        return day.toordinal()
+
+    def _first_raw(self) -> int:
+        day = self.start
+        if self.frequency == "weekly" and self.target_days:
+            while day.weekday() not in self.target_days:
+                day += timedelta(days=1)
+        return self._raw(day)
+
+    def slot(self, day: date) -> Optional[int]:
+        """Bit position for a day, or None if the day is not scheduled."""
+        raw = self._raw(day)
+        return None if raw is None else raw - self._first_raw()
+
+    def slots_until(self, day: date) -> int:
+        """Number of scheduled slots from start up to and including day."""
+        probe = day
+        if self.frequency == "weekly" and self.target_days:
+            # Last scheduled day on or before day
+            while probe.weekday() not in self.target_days:
+                probe -= timedelta(days=1)
+        slot = self.slot(probe)
+        return max(slot + 1, 0) if slot is not None else 0
+
+    def slot_date(self, slot: int) -> date:
+        """First day of a slot."""
+        raw = self._first_raw() + slot
+        if self.frequency == "monthly":
+            return date(raw // 12, raw % 12 + 1, 1)
+        if self.frequency == "weekly":
+            if not self.target_days:
+                return date.fromordinal(raw * 7 + 1)
+            week, position = divmod(raw, len(self.target_days))
+            return date.fromordinal(week * 7 + 1 + self.target_days[position])
+        return date.fromordinal(raw)
+
+def set_bit(bitmap: Optional[bytes], slot: int, value: bool = True) -> bytes:
+    """Sets or clears one bit, growing the bitmap as needed (bit i is bit i % 8 of byte i // 8)."""
+    data = bytearray(bitmap or b"")
+    byte, bit = divmod(slot, 8)
+    if byte >= len(data):
+        if not value:
+            return bytes(data)
+        data.extend(b"\x00" * (byte + 1 - len(data)))
+    if value:
+        data[byte] |= 1 << bit
+    else:
+        data[byte] &= ~(1 << bit) & 0xFF
+    return bytes(data)
+
+def shift_bitmap(bitmap: Optional[bytes], slots: int) -> bytes:
+    """Moves every bit up by slots, used when a log lands before the first slot."""
+    value = int.from_bytes(bitmap or b"", "little") << slots
+    return value.to_bytes((value.bit_length() + 7) // 8, "little")
+
+def unpack(bitmap: Optional[bytes], slots: int) -> np.ndarray:
+    """Bits for the first `slots` slots as a uint8 array of 0/1."""
+    bits = np.unpackbits(np.frombuffer(bitmap or b"", dtype=np.uint8), bitorder="little")
+    if len(bits) < slots:
+        bits = np.concatenate([bits, np.zeros(slots - len(bits), dtype=np.uint8)])
+    return bits[:slots]
+
+def _runs(bits: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Start and end indexes of every run of ones."""
+    edges = np.diff(np.concatenate(([0], bits.astype(np.int8), [0])))
+    return np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+
+def analyze_bitmap(bitmap: Optional[bytes], schedule: Schedule, today: Optional[date] = None) -> Dict:
+    """Completion rate, windowed trend and streaks from a habit's day-bitmap."""
+    today = today or datetime.utcnow().date()
+    slots = schedule.slots_until(today)
+    bits = unpack(bitmap, slots)
+    completed = int(bits.sum())
+
+    if slots >= TREND_WINDOW * 2:
+        recent_rate = bits[-TREND_WINDOW:].mean() * 100
+        older_rate = bits[-TREND_WINDOW * 2:-TREND_WINDOW].mean() * 100
+        if recent_rate > older_rate + 10:
+            trend = "improving"
+        elif recent_rate < older_rate - 10:
+            trend = "declining"
+        else:
+            trend = "stable"
+    else:
+        trend = "insufficient_data"
+
+    starts, ends = _runs(bits)
+    lengths = ends - starts
+    # The current slot still counts as open if it has not been completed yet
+    current = 0
+    if len(ends) and ends[-1] >= slots - 1:
+        current = int(lengths[-1])
+
+    return {
+        "total_days": slots,
+        "completed_days": completed,
+        "completion_rate": round(completed / slots * 100, 1) if slots else 0,
+        "current_streak": current,
+        "longest_streak": int(lengths.max()) if len(lengths) else 0,
+        "trend": trend,
+    }
+
+def calendar_heatmap(
+    bitmap: Optional[bytes],
+    schedule: Schedule,
+    today: Optional[date] = None,
+    slots: int = HEATMAP_SLOTS
+) -> List[Dict]:
+    """The most recent scheduled slots with their completion state."""
+    today = today or datetime.utcnow().date()
+    total = schedule.slots_until(today)
+    first = max(total - slots, 0)
+    bits = unpack(bitmap, total)[first:]
+    return [
+        {"date": schedule.slot_date(first + offset).isoformat(), "completed": bool(bit)}
+        for offset, bit in enumerate(bits)
+    ]
+
+def habit_schedule(habit) -> Schedule:
+    """Schedule for a habits row (ORM object or Core row)."""
+    start = habit.bitmap_start or (habit.created_at.date() if habit.created_at else datetime.utcnow().date())
+    return Schedule(habit.frequency or "daily", start, parse_target_days(habit.target_days))
+
+@on_insert("habit_logs")
+@on_change("habit_logs", "update")
+def update_bitmaps(connection: Connection, rows: List[Dict]) -> None:
+    """Sets (or clears) the bit for each new or edited habit log."""
+    habits = Habit.__table__
+    rows_by_habit: Dict[int, List[Dict]] = {}
+    for row in rows:
+        if row.get("habit_id") is not None and row.get("logged_on") is not None:
+            rows_by_habit.setdefault(row["habit_id"], []).append(row)
+    if not rows_by_habit:
+        return
+
+    query = select(
+        habits.c.id, habits.c.frequency, habits.c.target_days, habits.c.created_at,
+        habits.c.bitmap_start, habits.c.completion_bitmap
+    ).where(habits.c.id.in_(rows_by_habit))
+    if connection.dialect.name == "postgresql":
+        query = query.with_for_update()
+
+    for habit in connection.execute(query).all():
+        schedule = habit_schedule(habit)
+        bitmap = habit.completion_bitmap
+        start = schedule.start
+        for row in rows_by_habit[habit.id]:
+            slot = schedule.slot(row["logged_on"])
+            if slot is None:
+                continue  # not a target day
+            if slot < 0:
+                # Backfilled before the first slot: move the origin back
+                start = row["logged_on"]
+                schedule = Schedule(schedule.frequency, start, schedule.target_days)
+                bitmap = shift_bitmap(bitmap, -slot)
+                slot = 0
+            bitmap = set_bit(bitmap, slot, row.get("completed", True) is not False)
+
+        connection.execute(
+            update(habits)
+            .where(habits.c.id == habit.id)
+            .values(completion_bitmap=bitmap, bitmap_start=start)
+        )
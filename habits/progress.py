@@ -0,0 +1,90 @@
+from datetime import date
+from typing import Dict, Optional
+from sqlalchemy import and_, case, func, select
+from sqlalchemy.orm import Session
+
+from database.models import Habit, HabitLog
+from habits.streaks import StreakState, current_streak
+
+TREND_WINDOW = 7  # logged days
+
+def progress_query(user_id: Optional[int] = None, habit_id: Optional[int] = None):
+    """
+    One aggregate query for habit progress: day totals, completions in the
+    latest and previous TREND_WINDOW days (ranked with a window function)
+    and the streak columns already stored on the habits row. Only the newest
+    log of each day counts, so repeated logs cannot inflate the totals.
+    """
+    daily = select(
+        HabitLog.habit_id,
+        HabitLog.logged_on,
+        HabitLog.completed,
+        func.row_number().over(
+            partition_by=(HabitLog.habit_id, HabitLog.logged_on),
+            order_by=HabitLog.id.desc()
+        ).label("newest")
+    )
+    if habit_id is not None:
+        daily = daily.where(HabitLog.habit_id == habit_id)
+    if user_id is not None:
+        daily = daily.where(HabitLog.user_id == user_id)
+    daily = daily.subquery()
+
+    ranked = select(
+        daily.c.habit_id,
+        daily.c.completed,
+        func.row_number().over(partition_by=daily.c.habit_id, order_by=daily.c.logged_on.desc()).label("position")
+    ).where(daily.c.newest == 1).subquery()
+
+    done = case((ranked.c.completed.isnot(False), 1), else_=0)
+    totals = select(
+        ranked.c.habit_id,
+        func.count().label("total_days"),
+        func.sum(done).label("completed_days"),
+        func.sum(case((ranked.c.position <= TREND_WINDOW, done), else_=0)).label("recent_completed"),
+        func.sum(case(
+            (and_(ranked.c.position > TREND_WINDOW, ranked.c.position <= TREND_WINDOW * 2), done),
+            else_=0
+        )).label("previous_completed"),
+    ).group_by(ranked.c.habit_id).subquery()
+
+    query = select(
+        Habit.id,
+        Habit.habit_name,
+        Habit.frequency,
+        Habit.streak,
+        Habit.best_streak,
+        Habit.last_completed_on,
+        func.coalesce(totals.c.total_days, 0).label("total_days"),
+        func.coalesce(totals.c.completed_days, 0).label("completed_days"),
+        func.coalesce(totals.c.recent_completed, 0).label("recent_completed"),
+        func.coalesce(totals.c.previous_completed, 0).label("previous_completed"),
+    ).outerjoin(totals, totals.c.habit_id == Habit.id)
+    if habit_id is not None:
+        query = query.where(Habit.id == habit_id)
+    if user_id is not None:
+        query = query.where(Habit.user_id == user_id)
+    return query.order_by(Habit.id)
+
+def _progress(row, today: Optional[date] = None) -> Dict:
+    state = StreakState(row.streak or 0, row.best_streak or 0, row.last_completed_on)
+    return {
+        "habit_id": row.id,
+        "name": row.habit_name,
+        "frequency": row.frequency,
+        "total_days": int(row.total_days),
+        "completed_days": int(row.completed_days),
+        "recent_completed": int(row.recent_completed),
+        "previous_completed": int(row.previous_completed),
+        "current_streak": current_streak(state, row.frequency, today),
+        "best_streak": state.best,
+    }
+
+def habit_progress(db: Session, habit_id: int, today: Optional[date] = None) -> Optional[Dict]:
+    """Precomputed progress numbers for one habit, in the shape HabitTrackerAgent accepts."""
+    row = db.execute(progress_query(habit_id=habit_id)).first()
+    return _progress(row, today) if row else None
+
+def user_habit_progress(db: Session, user_id: int, today: Optional[date] = None) -> Dict[int, Dict]:
+    """Progress for all of a user's habits from a single query, keyed by habit id."""
+    return {row.id: _progress(row, today) for row in db.execute(progress_query(user_id=user_id))}
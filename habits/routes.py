@@ -0,0 +1,46 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.orm import Session
+from datetime import datetime
+
+from database.database import get_db
+from database.models import Habit
+from schemas.validation import HabitLogCreate, HabitLogResponse
+from habits.service import log_habit
+from habits.streaks import streak_summary
+from habits.bitmap import HEATMAP_SLOTS, analyze_bitmap, calendar_heatmap, habit_schedule
+
+router = APIRouter()
+
+@router.post("/habits/{habit_id}/logs", response_model=HabitLogResponse, status_code=status.HTTP_201_CREATED)
+def create_habit_log(habit_id: int, log: HabitLogCreate, db: Session = Depends(get_db)):
+    """Log a completion (or miss) for a habit and return its updated streak."""
+    habit = db.query(Habit).filter(Habit.id == habit_id).first()
+    if not habit:
+        raise HTTPException(status_code=404, detail="Habit not found")
+
+    logged_on = log.logged_on or datetime.utcnow().date()
+    log_id, habit = log_habit(db, habit, logged_on, log.completed, log.notes)
+    return HabitLogResponse(
+        id=log_id,
+        habit_id=habit.id,
+        logged_on=logged_on,
+        completed=log.completed,
+        notes=log.notes,
+        **streak_summary(habit)
+    )
+
+@router.get("/habits/{habit_id}/history")
+def read_habit_history(habit_id: int, slots: int = HEATMAP_SLOTS, db: Session = Depends(get_db)):
+    """Completion rate, trend, streaks and a calendar heatmap from the habit's day-bitmap."""
+    habit = db.query(Habit).filter(Habit.id == habit_id).first()
+    if not habit:
+        raise HTTPException(status_code=404, detail="Habit not found")
+
+    schedule = habit_schedule(habit)
+    return {
+        "habit_id": habit.id,
+        "frequency": habit.frequency,
+        "target_days": habit.target_days.split(",") if habit.target_days else [],
+        "analysis": analyze_bitmap(habit.completion_bitmap, schedule),
+        "heatmap": calendar_heatmap(habit.completion_bitmap, schedule, slots=max(slots, 0)),
+    }
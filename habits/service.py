@@ -0,0 +1,86 @@
+from datetime import date, datetime
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from cache.read_through import invalidate
+from database.group_commit import get_group_commit_writer
+from database.models import Habit, HabitLog
+from habits.bitmap import format_target_days
+
+def get_or_create_habit(
+    db: Session,
+    user_id: int,
+    habit_name: str,
+    frequency: str,
+    target_days: Optional[List[str]] = None
+) -> Habit:
+    """Finds a user's habit by name, creating it on first use."""
+    habit = db.query(Habit).filter(Habit.user_id == user_id, Habit.habit_name == habit_name).first()
+    if not habit:
+        habit = Habit(
+            user_id=user_id,
+            habit_name=habit_name,
+            frequency=frequency,
+            target_days=format_target_days(target_days)
+        )
+        db.add(habit)
+        db.commit()
+        db.refresh(habit)
+        invalidate(user_id, "habits")
+    return habit
+
+def log_habit(
+    db: Session,
+    habit: Habit,
+    logged_on: Optional[date] = None,
+    completed: bool = True,
+    notes: Optional[str] = None
+) -> Tuple[Optional[int], Habit]:
+    """
+    Stores a habit log, or updates the habit's log for that day if it has
+    one. The streak on the habit is updated by the habit_logs hooks in the
+    same transaction, so the returned habit is current.
+    """
+    log_values = {
+        "habit_id": habit.id,
+        "user_id": habit.user_id,
+        "logged_on": logged_on or datetime.utcnow().date(),
+        "completed": completed,
+        "notes": notes,
+        "created_at": datetime.utcnow()
+    }
+
+    log_id = _update_log(db, log_values)
+    if log_id is None:
+        try:
+            # Batch with concurrent writes when group commit is enabled
+            writer = get_group_commit_writer()
+            if writer:
+                log_id = writer.insert(HabitLog.__table__, log_values)
+            else:
+                habit_log = HabitLog(**log_values)
+                db.add(habit_log)
+                db.commit()
+                log_id = habit_log.id
+        except IntegrityError:
+            # A concurrent request logged the same day first
+            db.rollback()
+            log_id = _update_log(db, log_values)
+
+    db.refresh(habit)
+    invalidate(habit.user_id, "habits")
+    return log_id, habit
+
+def _update_log(db: Session, log_values: Dict) -> Optional[int]:
+    """Applies log_values to the existing log for the habit and day; None if there is none."""
+    habit_log = db.query(HabitLog).filter(
+        HabitLog.habit_id == log_values["habit_id"], HabitLog.logged_on == log_values["logged_on"]
+    ).first()
+    if habit_log is None:
+        return None
+    habit_log.completed = log_values["completed"]
+    if log_values["notes"] is not None:
+        habit_log.notes = log_values["notes"]
+    db.commit()
+    return habit_log.id
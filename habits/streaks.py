@@ -0,0 +1,139 @@
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import select, update
+from sqlalchemy.engine import Connection
+
+from database.hooks import on_change, on_insert
+from database.models import Habit, HabitLog
+
+FREQUENCIES = ("daily", "weekly", "monthly")
+
+def period_index(day: date, frequency: str) -> int:
+    """Consecutive integers for consecutive days, ISO weeks or calendar months."""
+    if frequency == "weekly":
+        return (day.toordinal() - day.weekday()) // 7
+    if frequency == "monthly":
+        return day.year * 12 + day.month - 1
+    return day.toordinal()
+
+@dataclass
+class StreakState:
+    """Precomputed streak values stored on the habits row."""
+    current: int = 0
+    best: int = 0
+    last_completed_on: Optional[date] = None
+
+def advance(state: StreakState, frequency: str, day: date, completed: bool) -> Optional[StreakState]:
+    """
+    Applies one log to the streak in O(1). Returns None when the log lands
+    before the last completed period, in which case the streak has to be
+    recomputed from history.
+    """
+    period = period_index(day, frequency)
+    last = period_index(state.last_completed_on, frequency) if state.last_completed_on else None
+
+    if last is not None and period < last:
+        return None
+
+    if not completed:
+        # A miss in the latest period breaks the streak
+        return StreakState(current=0, best=state.best, last_completed_on=state.last_completed_on)
+
+    if last is None or period > last + 1:
+        current = 1
+    elif period == last + 1:
+        current = state.current + 1
+    else:
+        # Already counted this period
+        current = max(state.current, 1)
+    return StreakState(current=current, best=max(state.best, current), last_completed_on=day)
+
+def recompute(logs: Iterable[Tuple[date, bool]], frequency: str) -> StreakState:
+    """Replays a habit's logs, oldest first. Only used for backfilled logs."""
+    state = StreakState()
+    for day, completed in sorted(logs, key=lambda log: log[0]):
+        state = advance(state, frequency, day, completed) or state
+    return state
+
+def current_streak(state: StreakState, frequency: str, today: Optional[date] = None) -> int:
+    """The stored streak, or 0 if a whole period has passed without a completion."""
+    if state.last_completed_on is None:
+        return 0
+    today = today or datetime.utcnow().date()
+    if period_index(today, frequency) > period_index(state.last_completed_on, frequency) + 1:
+        return 0
+    return state.current
+
+def streak_summary(habit: Habit, today: Optional[date] = None) -> Dict:
+    """Streak fields as the habit agent expects them."""
+    state = StreakState(habit.streak or 0, habit.best_streak or 0, habit.last_completed_on)
+    return {
+        "current_streak": current_streak(state, habit.frequency, today),
+        "best_streak": state.best,
+        "last_completed_on": state.last_completed_on.isoformat() if state.last_completed_on else None,
+    }
+
+@on_insert("habit_logs")
+def update_streaks(connection: Connection, rows: List[Dict]) -> None:
+    """Folds new habit logs into the precomputed streak on their habit."""
+    habits = Habit.__table__
+    rows_by_habit: Dict[int, List[Dict]] = {}
+    for row in rows:
+        if row.get("habit_id") is not None and row.get("logged_on") is not None:
+            rows_by_habit.setdefault(row["habit_id"], []).append(row)
+    if not rows_by_habit:
+        return
+
+    query = select(
+        habits.c.id, habits.c.frequency, habits.c.streak,
+        habits.c.best_streak, habits.c.last_completed_on
+    ).where(habits.c.id.in_(rows_by_habit))
+    if connection.dialect.name == "postgresql":
+        query = query.with_for_update()
+
+    for habit in connection.execute(query).all():
+        state = StreakState(habit.streak or 0, habit.best_streak or 0, habit.last_completed_on)
+        for row in sorted(rows_by_habit[habit.id], key=lambda r: r["logged_on"]):
+            completed = row.get("completed", True) is not False
+            state = advance(state, habit.frequency, row["logged_on"], completed)
+            if state is None:
+                logs = connection.execute(
+                    select(HabitLog.logged_on, HabitLog.completed)
+                    .where(HabitLog.habit_id == habit.id)
+                ).all()
+                state = recompute([(log.logged_on, log.completed is not False) for log in logs], habit.frequency)
+                break
+
+        connection.execute(
+            update(habits)
+            .where(habits.c.id == habit.id)
+            .values(
+                streak=state.current,
+                best_streak=state.best,
+                last_completed_on=state.last_completed_on,
+                last_logged=datetime.utcnow()
+            )
+        )
+
+@on_change("habit_logs", "update")
+def recompute_streaks(connection: Connection, rows: List[Dict]) -> None:
+    """An edited log can change any point in the history, so its habit's streak is replayed."""
+    habits = Habit.__table__
+    for habit_id in {row["habit_id"] for row in rows if row.get("habit_id") is not None}:
+        frequency = connection.execute(select(habits.c.frequency).where(habits.c.id == habit_id)).scalar()
+        logs = connection.execute(
+            select(HabitLog.logged_on, HabitLog.completed)
+            .where(HabitLog.habit_id == habit_id, HabitLog.logged_on.isnot(None))
+        ).all()
+        state = recompute([(log.logged_on, log.completed is not False) for log in logs], frequency)
+        connection.execute(
+            update(habits)
+            .where(habits.c.id == habit_id)
+            .values(
+                streak=state.current,
+                best_streak=state.best,
+                last_completed_on=state.last_completed_on,
+                last_logged=datetime.utcnow()
+            )
+        )
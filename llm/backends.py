@@ -0,0 +1,108 @@
+from typing import Callable, Dict, List, Optional, Tuple
+from openai import OpenAI
+import io
+import json
+import os
+import uuid
+
+LLM_BATCH_BACKEND = os.getenv("LLM_BATCH_BACKEND", "openai")  # openai (Batch API) or local
+LLM_BATCH_DIR = os.getenv("LLM_BATCH_DIR", "data/llm_batches")  # local backend's input and output files
+BATCH_MODEL = os.getenv("BATCH_MODEL", "gpt-4-turbo-preview")
+BACKENDS = ("openai", "local")
+
+# Backends take Batch API request lines ({"custom_id", "method", "url", "body"})
+# and hand back {custom_id: (content, error)} once the batch has finished
+
+class OpenAIBatchBackend:
+    """
+    The OpenAI Batch API: one JSONL file per batch, completed within 24
+    hours at a lower price and outside the synchronous rate limits.
+    """
+
+    def __init__(self, client: Optional[OpenAI] = None):
+        self.client = client or OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+
+    def submit(self, lines: List[Dict]) -> str:
+        data = "".join(json.dumps(line) + "\n" for line in lines).encode("utf-8")
+        upload = self.client.files.create(file=("batch.jsonl", io.BytesIO(data)), purpose="batch")
+        batch = self.client.batches.create(
+            input_file_id=upload.id, endpoint="/v1/chat/completions", completion_window="24h"
+        )
+        return batch.id
+
+    def status(self, remote_id: str) -> str:
+        """running, completed or failed; expired and cancelled batches count as failed."""
+        status = self.client.batches.retrieve(remote_id).status
+        if status == "completed":
+            return "completed"
+        if status in ("failed", "expired", "cancelled"):
+            return "failed"
+        return "running"
+
+    def results(self, remote_id: str) -> Dict[str, Tuple[Optional[str], Optional[str]]]:
+        batch = self.client.batches.retrieve(remote_id)
+        results = {}
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if file_id:
+                for line in self.client.files.content(file_id).text.splitlines():
+                    if line.strip():
+                        results.update([_parse_result(json.loads(line))])
+        return results
+
+def _parse_result(line: Dict) -> Tuple[str, Tuple[Optional[str], Optional[str]]]:
+    response = line.get("response") or {}
+    if line.get("error") or response.get("status_code") != 200:
+        error = line.get("error") or (response.get("body") or {}).get("error") or response.get("status_code")
+        return line["custom_id"], (None, json.dumps(error))
+    return line["custom_id"], (response["body"]["choices"][0]["message"]["content"], None)
+
+def chat_completion(body: Dict, client: Optional[OpenAI] = None) -> str:
+    client = client or OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    response = client.chat.completions.create(**body)
+    return response.choices[0].message.content
+
+class LocalBatchBackend:
+    """
+    Stand-in with the Batch API's file contract: writes the input JSONL,
+    runs every line through complete (synchronous chat completions by
+    default) and writes the output JSONL, so batches can be exercised
+    without the Batch API.
+    """
+
+    def __init__(self, complete: Optional[Callable[[Dict], str]] = None, directory: str = LLM_BATCH_DIR):
+        self.complete = complete or chat_completion
+        self.directory = directory
+
+    def _path(self, remote_id: str, kind: str) -> str:
+        return os.path.join(self.directory, f"{remote_id}.{kind}.jsonl")
+
+    def submit(self, lines: List[Dict]) -> str:
+        os.makedirs(self.directory, exist_ok=True)
+        remote_id = f"local_{uuid.uuid4().hex}"
+        with open(self._path(remote_id, "input"), "w") as f:
+            f.writelines(json.dumps(line) + "\n" for line in lines)
+        with open(self._path(remote_id, "output"), "w") as f:
+            for line in lines:
+                try:
+                    content = self.complete(line["body"])
+                    result = {"custom_id": line["custom_id"], "response": {"status_code": 200, "body": {
+                        "choices": [{"message": {"role": "assistant", "content": content}}]
+                    }}}
+                except Exception as e:
+                    result = {"custom_id": line["custom_id"], "response": None, "error": {"message": str(e)}}
+                f.write(json.dumps(result) + "\n")
+        return remote_id
+
+    def status(self, remote_id: str) -> str:
+        return "completed" if os.path.exists(self._path(remote_id, "output")) else "failed"
+
+    def results(self, remote_id: str) -> Dict[str, Tuple[Optional[str], Optional[str]]]:
+        with open(self._path(remote_id, "output")) as f:
+            return dict(_parse_result(json.loads(line)) for line in f if line.strip())
+
+def get_backend(name: str = LLM_BATCH_BACKEND):
+    if name == "openai":
+        return OpenAIBatchBackend()
+    if name == "local":
+        return LocalBatchBackend()
+    raise ValueError(f"Unknown batch backend: {name}")
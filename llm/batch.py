@@ -0,0 +1,275 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import func, or_, select, update
+from sqlalchemy.engine import Engine
+import argparse
+import json
+import logging
+import os
+import time
+
+from database.database import engine
+from database.models import LLMBatchJob, LLMBatchRequest
+from llm.backends import BACKENDS, BATCH_MODEL, LLM_BATCH_BACKEND, get_backend
+
+logger = logging.getLogger(__name__)
+
+LLM_BATCH_PACK_SIZE = int(os.getenv("LLM_BATCH_PACK_SIZE", "8"))  # requests per prompt; 1 sends each on its own
+MAX_BATCH_LINES = 50000  # Batch API limit per file
+MAX_ATTEMPTS = 3
+PACK_OVERHEAD_TOKENS = 30  # per packed item, for its id and the JSON around the answer
+
+PACKED_INSTRUCTIONS = """
+You will receive several independent inputs as JSON: {"items": [{"id": ..., "input": ...}]}.
+Handle each input on its own, following the instructions above, and never
+mix information between items. Respond with JSON only:
+{"results": {"<id>": "<answer for that item>", ...}} with one entry per id.
+"""
+
+@dataclass(frozen=True)
+class BatchItem:
+    """One user's small request: the prompt goes under the job's shared system message."""
+    custom_id: str  # unique within the job, e.g. user-42
+    user_id: Optional[int]
+    prompt: str
+    max_tokens: int = 300
+
+def enqueue(name: str, task: str, system: str, items: Iterable[BatchItem], bind: Engine = engine) -> int:
+    """
+    Creates the job (or reuses the one with this name) and adds the items it
+    does not have yet, so enqueueing the same job twice is harmless.
+    """
+    with bind.begin() as connection:
+        job_id = connection.execute(select(LLMBatchJob.id).where(LLMBatchJob.name == name)).scalar()
+        if job_id is None:
+            job_id = connection.execute(
+                LLMBatchJob.__table__.insert().values(name=name, task=task, created_at=datetime.utcnow())
+            ).inserted_primary_key[0]
+        existing = set(connection.execute(
+            select(LLMBatchRequest.custom_id).where(LLMBatchRequest.job_id == job_id)
+        ).scalars())
+        now = datetime.utcnow()
+        rows = [
+            {"job_id": job_id, "custom_id": item.custom_id, "user_id": item.user_id, "status": "pending",
+             "attempts": 0, "updated_at": now,
+             "body": json.dumps({"system": system, "prompt": item.prompt, "max_tokens": item.max_tokens})}
+            for item in items if item.custom_id not in existing
+        ]
+        if rows:
+            connection.execute(LLMBatchRequest.__table__.insert(), rows)
+    return job_id
+
+def pack_lines(requests: List[Tuple[int, Dict]], pack_size: int, model: str = BATCH_MODEL) -> List[Dict]:
+    """
+    Batch API lines for (request id, body) pairs. With pack_size > 1, that
+    many requests sharing a system message go into one multi-item prompt;
+    the line's custom_id lists the request ids it carries.
+    """
+    lines = []
+    groups: Dict[str, List[Tuple[int, Dict]]] = {}
+    for request_id, body in requests:
+        groups.setdefault(body["system"], []).append((request_id, body))
+    for system, group in groups.items():
+        for i in range(0, len(group), max(pack_size, 1)):
+            pack = group[i:i + max(pack_size, 1)]
+            if len(pack) == 1:
+                request_id, body = pack[0]
+                lines.append(_line(f"r-{request_id}", {
+                    "model": model,
+                    "messages": [{"role": "system", "content": system}, {"role": "user", "content": body["prompt"]}],
+                    "max_tokens": body["max_tokens"],
+                }))
+                continue
+            lines.append(_line("p-" + "-".join(str(request_id) for request_id, _ in pack), {
+                "model": model,
+                "messages": [
+                    {"role": "system", "content": system.strip() + "\n" + PACKED_INSTRUCTIONS},
+                    {"role": "user", "content": json.dumps(
+                        {"items": [{"id": str(request_id), "input": body["prompt"]} for request_id, body in pack]}
+                    )},
+                ],
+                "max_tokens": sum(body["max_tokens"] + PACK_OVERHEAD_TOKENS for _, body in pack),
+                "response_format": {"type": "json_object"},
+            }))
+    return lines
+
+def _line(custom_id: str, body: Dict) -> Dict:
+    return {"custom_id": custom_id, "method": "POST", "url": "/v1/chat/completions", "body": body}
+
+def unpack_result(custom_id: str, content: Optional[str], error: Optional[str]) -> Dict[int, Tuple[Optional[str], Optional[str]]]:
+    """{request id: (result, error)} for one output line."""
+    kind, ids = custom_id.split("-", 1)
+    request_ids = [int(request_id) for request_id in ids.split("-")]
+    if error is not None or content is None:
+        return {request_id: (None, error or "empty response") for request_id in request_ids}
+    if kind == "r":
+        return {request_ids[0]: (content.strip(), None)}
+    try:
+        answers = json.loads(content).get("results", {})
+    except (ValueError, AttributeError):
+        return {request_id: (None, "packed answer is not valid JSON") for request_id in request_ids}
+    unpacked = {}
+    for request_id in request_ids:
+        answer = answers.get(str(request_id))
+        unpacked[request_id] = (str(answer).strip(), None) if answer else (None, "missing from packed answer")
+    return unpacked
+
+def submit(job_id: int, backend, pack_size: int = LLM_BATCH_PACK_SIZE, bind: Engine = engine) -> int:
+    """
+    Sends the job's pending requests, and failed ones with attempts left, to
+    the backend. Retries go alone rather than packed, since a packed answer
+    most often drops an item when it runs out of room. If the process dies
+    between the backend accepting a batch and the commit below, the requests
+    stay pending and are sent again; results are keyed by request id, so
+    the orphaned batch is simply never collected.
+    """
+    with bind.connect() as connection:
+        rows = connection.execute(
+            select(LLMBatchRequest.id, LLMBatchRequest.body, LLMBatchRequest.attempts)
+            .where(LLMBatchRequest.job_id == job_id, or_(
+                LLMBatchRequest.status == "pending",
+                (LLMBatchRequest.status == "failed") & (LLMBatchRequest.attempts < MAX_ATTEMPTS),
+            ))
+            .order_by(LLMBatchRequest.id)
+        ).all()
+    if not rows:
+        return 0
+
+    first = [(row.id, json.loads(row.body)) for row in rows if not row.attempts]
+    retries = [(row.id, json.loads(row.body)) for row in rows if row.attempts]
+    lines = pack_lines(first, pack_size) + pack_lines(retries, 1)
+    for i in range(0, len(lines), MAX_BATCH_LINES):
+        chunk = lines[i:i + MAX_BATCH_LINES]
+        remote_id = backend.submit(chunk)
+        request_ids = [request_id for line in chunk for request_id in _request_ids(line["custom_id"])]
+        with bind.begin() as connection:
+            connection.execute(
+                update(LLMBatchRequest)
+                .where(LLMBatchRequest.id.in_(request_ids))
+                .values(status="submitted", remote_id=remote_id, attempts=LLMBatchRequest.attempts + 1,
+                        error=None, updated_at=datetime.utcnow())
+            )
+        logger.info(f"LLM batch job {job_id}: {len(request_ids)} requests in {len(chunk)} lines sent as {remote_id}")
+    return len(rows)
+
+def _request_ids(custom_id: str) -> List[int]:
+    return [int(request_id) for request_id in custom_id.split("-", 1)[1].split("-")]
+
+def collect(job_id: int, backend, bind: Engine = engine) -> int:
+    """Stores the results of every finished batch the job is waiting on; returns requests settled."""
+    with bind.connect() as connection:
+        remote_ids = connection.execute(
+            select(LLMBatchRequest.remote_id)
+            .where(LLMBatchRequest.job_id == job_id, LLMBatchRequest.status == "submitted")
+            .distinct()
+        ).scalars().all()
+
+    settled = 0
+    for remote_id in remote_ids:
+        status = backend.status(remote_id)
+        if status == "running":
+            continue
+        outcomes: Dict[int, Tuple[Optional[str], Optional[str]]] = {}
+        if status == "completed":
+            for custom_id, (content, error) in backend.results(remote_id).items():
+                outcomes.update(unpack_result(custom_id, content, error))
+
+        now = datetime.utcnow()
+        with bind.begin() as connection:
+            waiting = connection.execute(
+                select(LLMBatchRequest.id).where(
+                    LLMBatchRequest.job_id == job_id, LLMBatchRequest.remote_id == remote_id,
+                    LLMBatchRequest.status == "submitted"
+                )
+            ).scalars().all()
+            for request_id in waiting:
+                result, error = outcomes.get(request_id, (None, f"batch {status} without a result"))
+                connection.execute(
+                    update(LLMBatchRequest).where(LLMBatchRequest.id == request_id).values(
+                        status="done" if result is not None else "failed", result=result, error=error,
+                        updated_at=now
+                    )
+                )
+            settled += len(waiting)
+    return settled
+
+def job_status(job_id: int, bind: Engine = engine) -> Dict[str, int]:
+    with bind.connect() as connection:
+        return dict(connection.execute(
+            select(LLMBatchRequest.status, func.count())
+            .where(LLMBatchRequest.job_id == job_id)
+            .group_by(LLMBatchRequest.status)
+        ).all())
+
+def _unfinished(counts: Dict[str, int]) -> bool:
+    return bool(counts.get("pending") or counts.get("submitted"))
+
+def run_job(
+    job_id: int,
+    backend,
+    pack_size: int = LLM_BATCH_PACK_SIZE,
+    poll_seconds: float = 60,
+    timeout: Optional[float] = None,
+    bind: Engine = engine
+) -> Dict[str, int]:
+    """
+    Submits and collects until every request is done or out of attempts.
+    Everything lives in llm_batch_requests, so a run that stops or crashes
+    is resumed by running it again.
+    """
+    started = time.monotonic()
+    while True:
+        submit(job_id, backend, pack_size, bind)
+        collect(job_id, backend, bind)
+        counts = job_status(job_id, bind)
+        retryable = counts.get("failed") and _has_retries(job_id, bind)
+        if not _unfinished(counts) and not retryable:
+            return counts
+        if timeout is not None and time.monotonic() - started >= timeout:
+            return counts
+        if counts.get("submitted"):
+            time.sleep(poll_seconds)
+
+def _has_retries(job_id: int, bind: Engine) -> bool:
+    with bind.connect() as connection:
+        return connection.execute(
+            select(func.count()).where(
+                LLMBatchRequest.job_id == job_id, LLMBatchRequest.status == "failed",
+                LLMBatchRequest.attempts < MAX_ATTEMPTS
+            )
+        ).scalar() > 0
+
+def job_results(job_id: int, bind: Engine = engine) -> Dict[str, Tuple[Optional[int], str]]:
+    """{custom_id: (user_id, result)} for the job's finished requests."""
+    with bind.connect() as connection:
+        rows = connection.execute(
+            select(LLMBatchRequest.custom_id, LLMBatchRequest.user_id, LLMBatchRequest.result)
+            .where(LLMBatchRequest.job_id == job_id, LLMBatchRequest.status == "done")
+        ).all()
+    return {row.custom_id: (row.user_id, row.result) for row in rows}
+
+def find_job(name: str, bind: Engine = engine) -> Optional[int]:
+    with bind.connect() as connection:
+        return connection.execute(select(LLMBatchJob.id).where(LLMBatchJob.name == name)).scalar()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Submit and collect batched LLM jobs")
+    parser.add_argument("command", choices=("submit", "collect", "run", "status"))
+    parser.add_argument("job", help="Job name")
+    parser.add_argument("--backend", choices=BACKENDS, default=LLM_BATCH_BACKEND)
+    parser.add_argument("--pack-size", type=int, default=LLM_BATCH_PACK_SIZE)
+    parser.add_argument("--timeout", type=float, help="Seconds to keep polling in run")
+    args = parser.parse_args()
+
+    job_id = find_job(args.job)
+    if job_id is None:
+        raise SystemExit(f"No batch job named {args.job}")
+    if args.command == "submit":
+        submit(job_id, get_backend(args.backend), args.pack_size)
+    elif args.command == "collect":
+        collect(job_id, get_backend(args.backend))
+    elif args.command == "run":
+        run_job(job_id, get_backend(args.backend), args.pack_size, timeout=args.timeout)
+    print(json.dumps({"status": "success", "job": args.job, "requests": job_status(job_id)}))
@@ -0,0 +1,104 @@
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Tuple
+from sqlalchemy import case, func, select
+from sqlalchemy.engine import Engine
+import argparse
+import json
+
+from database.database import engine
+from database.models import DailyUserStat, HabitLog, JournalEntry, ProfileSummary
+from llm.backends import BACKENDS, LLM_BATCH_BACKEND, get_backend
+from llm.batch import LLM_BATCH_PACK_SIZE, BatchItem, enqueue, run_job
+from memory.context import truncate_tokens
+
+DIGEST_TOKENS = 200
+DIGEST_PROFILE_TOKENS = 120  # profile context given with each user's week
+
+DIGEST_SYSTEM = """
+You write short weekly digests for users of a journaling app. From one
+user's week in numbers and their profile, write 3-4 warm, specific sentences:
+how the week went, one pattern worth noticing, and one small suggestion for
+next week. Address the user as "you". Do not invent events.
+"""
+
+def week_bounds(day: date) -> Tuple[date, date]:
+    """Monday to Sunday of the week containing day."""
+    start = day - timedelta(days=day.weekday())
+    return start, start + timedelta(days=6)
+
+def digest_items(start: date, end: date, bind: Engine = engine) -> List[BatchItem]:
+    """One request per user active in the week, built from the rollups in a handful of queries."""
+    with bind.connect() as connection:
+        weeks: Dict[int, Dict] = {}
+        for user_id, metric, count, value_sum in connection.execute(
+            select(DailyUserStat.user_id, DailyUserStat.metric, func.sum(DailyUserStat.count),
+                   func.sum(DailyUserStat.value_sum))
+            .where(DailyUserStat.day.between(start, end))
+            .group_by(DailyUserStat.user_id, DailyUserStat.metric)
+        ):
+            if count:
+                weeks.setdefault(user_id, {"means": {}})["means"][metric] = round(value_sum / count, 2)
+
+        since = datetime.combine(start, datetime.min.time())
+        until = datetime.combine(end + timedelta(days=1), datetime.min.time())
+        for user_id, entries in connection.execute(
+            select(JournalEntry.user_id, func.count())
+            .where(JournalEntry.created_at >= since, JournalEntry.created_at < until, JournalEntry.user_id.isnot(None))
+            .group_by(JournalEntry.user_id)
+        ):
+            weeks.setdefault(user_id, {"means": {}})["journal_entries"] = entries
+
+        for user_id, logged, completed in connection.execute(
+            select(HabitLog.user_id, func.count(), func.sum(case((HabitLog.completed, 1), else_=0)))
+            .where(HabitLog.logged_on.between(start, end), HabitLog.user_id.isnot(None))
+            .group_by(HabitLog.user_id)
+        ):
+            weeks.setdefault(user_id, {"means": {}})["habits"] = f"{int(completed or 0)} of {logged} logged completed"
+
+        latest = (
+            select(ProfileSummary.user_id, func.max(ProfileSummary.version).label("version"))
+            .where(ProfileSummary.user_id.in_(list(weeks)))
+            .group_by(ProfileSummary.user_id)
+            .subquery()
+        )
+        profiles = dict(connection.execute(
+            select(ProfileSummary.user_id, ProfileSummary.summary)
+            .join(latest, (latest.c.user_id == ProfileSummary.user_id) & (latest.c.version == ProfileSummary.version))
+        ).all())
+
+    return [
+        BatchItem(
+            custom_id=f"user-{user_id}",
+            user_id=user_id,
+            prompt=json.dumps({
+                "week": f"{start.isoformat()} to {end.isoformat()}",
+                "journal_entries": week.get("journal_entries", 0),
+                "averages": week["means"],
+                "habits": week.get("habits", "none logged"),
+                "profile": truncate_tokens(profiles.get(user_id) or "", DIGEST_PROFILE_TOKENS) or "none yet",
+            }),
+            max_tokens=DIGEST_TOKENS,
+        )
+        for user_id, week in sorted(weeks.items())
+    ]
+
+def enqueue_digests(day: date, bind: Engine = engine) -> Tuple[str, int]:
+    """Queues the digests for the week containing day; returns the job name and id."""
+    start, end = week_bounds(day)
+    name = f"weekly_digest:{start.isoformat()}"
+    return name, enqueue(name, "weekly_digest", DIGEST_SYSTEM, digest_items(start, end, bind), bind)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate weekly digests through the batch LLM mode")
+    parser.add_argument("--date", type=date.fromisoformat,
+                        help="A day in the week to digest (default: last week)")
+    parser.add_argument("--backend", choices=BACKENDS, default=LLM_BATCH_BACKEND)
+    parser.add_argument("--pack-size", type=int, default=LLM_BATCH_PACK_SIZE)
+    parser.add_argument("--wait", action="store_true", help="Poll until the batch finishes instead of only submitting")
+    args = parser.parse_args()
+
+    name, job_id = enqueue_digests(args.date or datetime.utcnow().date() - timedelta(days=7))
+    # Without --wait, rerun later (or `python -m llm.batch collect <name>`) to pick up results
+    counts = run_job(job_id, get_backend(args.backend), args.pack_size, timeout=None if args.wait else 0)
+    print(json.dumps({"status": "success", "job": name, "requests": counts}))
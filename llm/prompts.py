@@ -0,0 +1,217 @@
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import func, select
+from sqlalchemy.engine import Engine
+import argparse
+import json
+import os
+import re
+
+from database.database import engine
+from database.models import JournalEntry, JournalPrompt, LLMBatchJob, LLMBatchRequest, ProfileSummary
+from llm.backends import BACKENDS, LLM_BATCH_BACKEND, get_backend
+from llm.batch import LLM_BATCH_PACK_SIZE, BatchItem, enqueue, job_results, run_job
+from memory.context import truncate_tokens
+
+PROMPT_QUEUE_SIZE = int(os.getenv("PROMPT_QUEUE_SIZE", "5"))  # prompts kept per user
+PROMPT_REFRESH_ENTRIES = int(os.getenv("PROMPT_REFRESH_ENTRIES", "3"))  # new entries that make a queue stale
+PROMPT_RECENT_ENTRIES = 5  # latest entries given with each user's profile
+PROMPT_ENTRY_TOKENS = 120
+PROMPT_PROFILE_TOKENS = 150
+PROMPT_TOKENS = 250
+USER_BATCH = 500  # users loaded per query when building a job
+JOB_PREFIX = "journal_prompts:"
+
+PROMPT_SYSTEM = """
+You write journaling prompts for users of a journaling app. From one user's
+profile and latest entries, write {count} short, open-ended prompts that
+invite them to continue reflecting on what they have been writing about:
+follow up on recurring themes, unresolved feelings and recent changes.
+Address the user as "you", one prompt per line, without numbering. Do not
+invent events.
+""".format(count=PROMPT_QUEUE_SIZE)
+
+# Served while a user has no queue yet, e.g. before their first entries
+DEFAULT_PROMPTS = [
+    "What is on your mind right now?",
+    "What was the best part of your day, and why?",
+    "What has been weighing on you lately?",
+    "What is one thing you are looking forward to?",
+    "What did you learn about yourself this week?",
+]
+
+def stale_users(bind: Engine = engine, min_entries: int = PROMPT_REFRESH_ENTRIES) -> List[int]:
+    """Users with at least min_entries journal entries newer than their prompt queue."""
+    queued = (
+        select(JournalPrompt.user_id, func.max(JournalPrompt.through_entry_id).label("through"))
+        .group_by(JournalPrompt.user_id)
+        .subquery()
+    )
+    query = (
+        select(JournalEntry.user_id)
+        .outerjoin(queued, queued.c.user_id == JournalEntry.user_id)
+        .where(JournalEntry.user_id.isnot(None), JournalEntry.id > func.coalesce(queued.c.through, 0))
+        .group_by(JournalEntry.user_id)
+        .having(func.count() >= max(min_entries, 1))
+        .order_by(JournalEntry.user_id)
+    )
+    with bind.connect() as connection:
+        return list(connection.execute(query).scalars())
+
+def prompt_items(user_ids: List[int], bind: Engine = engine) -> List[BatchItem]:
+    """One request per user from their latest profile and entries, loaded USER_BATCH users at a time."""
+    items = []
+    for i in range(0, len(user_ids), USER_BATCH):
+        chunk = user_ids[i:i + USER_BATCH]
+        with bind.connect() as connection:
+            recent = (
+                select(
+                    JournalEntry.user_id, JournalEntry.id, JournalEntry.entry_text, JournalEntry.created_at,
+                    func.row_number().over(partition_by=JournalEntry.user_id, order_by=JournalEntry.id.desc())
+                    .label("rank")
+                )
+                .where(JournalEntry.user_id.in_(chunk))
+                .subquery()
+            )
+            entries: Dict[int, List] = {}
+            for row in connection.execute(
+                select(recent).where(recent.c.rank <= PROMPT_RECENT_ENTRIES).order_by(recent.c.user_id, recent.c.id)
+            ):
+                entries.setdefault(row.user_id, []).append(row)
+
+            latest = (
+                select(ProfileSummary.user_id, func.max(ProfileSummary.version).label("version"))
+                .where(ProfileSummary.user_id.in_(chunk))
+                .group_by(ProfileSummary.user_id)
+                .subquery()
+            )
+            profiles = dict(connection.execute(
+                select(ProfileSummary.user_id, ProfileSummary.summary)
+                .join(latest, (latest.c.user_id == ProfileSummary.user_id) & (latest.c.version == ProfileSummary.version))
+            ).all())
+
+        for user_id in chunk:
+            if user_id not in entries:
+                continue
+            items.append(BatchItem(
+                # The newest entry id in the custom_id makes a later refresh a new request in the same job
+                custom_id=f"user-{user_id}-through-{entries[user_id][-1].id}",
+                user_id=user_id,
+                prompt=json.dumps({
+                    "profile": truncate_tokens(profiles.get(user_id) or "", PROMPT_PROFILE_TOKENS) or "none yet",
+                    "latest_entries": [
+                        f"{entry.created_at or datetime.utcnow():%Y-%m-%d}: "
+                        f"{truncate_tokens(entry.entry_text or '', PROMPT_ENTRY_TOKENS)}"
+                        for entry in entries[user_id]
+                    ],
+                }),
+                max_tokens=PROMPT_TOKENS,
+            ))
+    return items
+
+def parse_prompts(text: str) -> List[str]:
+    """The prompts in an answer, one per line, with any bullets, numbering or quotes removed."""
+    prompts = []
+    for line in text.splitlines():
+        prompt = re.sub(r"^\s*(?:[-*•]|\d+[.)])\s*", "", line).strip().strip('"').strip()
+        if prompt and prompt not in prompts:
+            prompts.append(prompt)
+    return prompts[:PROMPT_QUEUE_SIZE]
+
+def _custom_id_parts(custom_id: str) -> Tuple[int, int]:
+    _, user_id, _, through = custom_id.split("-")
+    return int(user_id), int(through)
+
+def store_prompts(job_id: int, bind: Engine = engine) -> int:
+    """
+    Replaces each user's queue with the job's answer for them, unless the
+    queue was already generated from the same or newer entries, so storing
+    a job twice or out of order is harmless. Returns the queues replaced.
+    """
+    answers: Dict[int, Tuple[int, List[str]]] = {}
+    for custom_id, (user_id, result) in job_results(job_id, bind).items():
+        _, through = _custom_id_parts(custom_id)
+        prompts = parse_prompts(result)
+        if prompts and through > answers.get(user_id, (0, []))[0]:
+            answers[user_id] = (through, prompts)
+    if not answers:
+        return 0
+
+    replaced = 0
+    now = datetime.utcnow()
+    with bind.begin() as connection:
+        current = dict(connection.execute(
+            select(JournalPrompt.user_id, func.max(JournalPrompt.through_entry_id))
+            .where(JournalPrompt.user_id.in_(list(answers)))
+            .group_by(JournalPrompt.user_id)
+        ).all())
+        rows = []
+        for user_id, (through, prompts) in answers.items():
+            if (current.get(user_id) or 0) >= through:
+                continue
+            rows += [
+                {"user_id": user_id, "position": position, "prompt": prompt, "through_entry_id": through,
+                 "created_at": now}
+                for position, prompt in enumerate(prompts)
+            ]
+            replaced += 1
+        stale = list({row["user_id"] for row in rows})
+        if stale:
+            connection.execute(JournalPrompt.__table__.delete().where(JournalPrompt.user_id.in_(stale)))
+            connection.execute(JournalPrompt.__table__.insert(), rows)
+    return replaced
+
+def open_jobs(bind: Engine = engine) -> List[int]:
+    """Prompt jobs with requests still pending or submitted."""
+    with bind.connect() as connection:
+        return list(connection.execute(
+            select(LLMBatchJob.id)
+            .join(LLMBatchRequest, LLMBatchRequest.job_id == LLMBatchJob.id)
+            .where(LLMBatchJob.name.startswith(JOB_PREFIX), LLMBatchRequest.status.in_(("pending", "submitted")))
+            .distinct()
+            .order_by(LLMBatchJob.id)
+        ).scalars())
+
+def refresh_prompts(
+    backend,
+    min_entries: int = PROMPT_REFRESH_ENTRIES,
+    pack_size: int = LLM_BATCH_PACK_SIZE,
+    timeout: Optional[float] = 0,
+    bind: Engine = engine
+) -> Dict[str, int]:
+    """
+    Collects and stores any earlier prompt jobs, then queues today's job for
+    the users whose queue is stale and runs it through the batch mode. With
+    the default timeout of 0 it submits without waiting; the next refresh
+    picks up the answers.
+    """
+    stored = 0
+    for job_id in open_jobs(bind):
+        run_job(job_id, backend, pack_size, timeout=0, bind=bind)
+        stored += store_prompts(job_id, bind)
+
+    users = stale_users(bind, min_entries)
+    counts: Dict[str, int] = {}
+    if users:
+        name = f"{JOB_PREFIX}{datetime.utcnow().date().isoformat()}"
+        job_id = enqueue(name, "journal_prompts", PROMPT_SYSTEM, prompt_items(users, bind), bind)
+        counts = run_job(job_id, backend, pack_size, timeout=timeout, bind=bind)
+        stored += store_prompts(job_id, bind)
+    return {"stale_users": len(users), "queues_stored": stored, "requests": counts}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Precompute personalized journaling prompts through the batch LLM mode")
+    parser.add_argument("--all", action="store_true",
+                        help="Refresh every queue with any new entry (the off-peak run), not only those past the threshold")
+    parser.add_argument("--min-entries", type=int, default=PROMPT_REFRESH_ENTRIES)
+    parser.add_argument("--backend", choices=BACKENDS, default=LLM_BATCH_BACKEND)
+    parser.add_argument("--pack-size", type=int, default=LLM_BATCH_PACK_SIZE)
+    parser.add_argument("--wait", action="store_true", help="Poll until the batch finishes instead of only submitting")
+    args = parser.parse_args()
+
+    result = refresh_prompts(
+        get_backend(args.backend), 1 if args.all else args.min_entries, args.pack_size,
+        timeout=None if args.wait else 0
+    )
+    print(json.dumps({"status": "success", **result}))
@@ -0,0 +1,34 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from database.database import get_db
+from database.models import JournalPrompt
+from llm.prompts import DEFAULT_PROMPTS, PROMPT_QUEUE_SIZE
+
+router = APIRouter()
+
+@router.get("/journal/prompts")
+def read_journal_prompts(user_id: int, limit: int = PROMPT_QUEUE_SIZE, db: Session = Depends(get_db)):
+    """
+    A user's precomputed journaling prompts, in one read of the
+    (user_id, position) index. Queues are filled by the refresh job, never
+    here; until a user has one, general prompts are returned.
+    """
+    limit = max(min(limit, PROMPT_QUEUE_SIZE), 0)
+    rows = db.execute(
+        select(JournalPrompt.prompt, JournalPrompt.through_entry_id, JournalPrompt.created_at)
+        .where(JournalPrompt.user_id == user_id)
+        .order_by(JournalPrompt.position)
+        .limit(limit)
+    ).all()
+    if not rows:
+        return {"user_id": user_id, "personalized": False, "prompts": DEFAULT_PROMPTS[:limit],
+                "through_entry_id": None, "generated_at": None}
+    return {
+        "user_id": user_id,
+        "personalized": True,
+        "prompts": [row.prompt for row in rows],
+        "through_entry_id": rows[0].through_entry_id,
+        "generated_at": rows[0].created_at,
+    }
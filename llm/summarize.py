@@ -0,0 +1,213 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Sequence, Tuple
+from openai import OpenAI
+from sqlalchemy import select
+from sqlalchemy.engine import Engine
+import argparse
+import hashlib
+import json
+import logging
+import os
+
+from database.database import engine
+from database.models import JournalEntry, SummaryChunk
+from database.upsert import upsert
+from memory.context import count_tokens, truncate_tokens
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_MODEL = "gpt-4-turbo-preview"
+SUMMARY_CHUNK_TOKENS = int(os.getenv("SUMMARY_CHUNK_TOKENS", "3000"))  # entry text per map prompt
+SUMMARY_CONCURRENCY = int(os.getenv("SUMMARY_CONCURRENCY", "4"))  # LLM calls in flight at once
+SUMMARY_FAN_IN = 4  # partial summaries per reduce prompt
+SUMMARY_TOKENS = 300  # each partial and the final summary
+SUMMARY_VERSION = 1  # bump when the prompts change, so cached summaries are not reused
+
+MAP_PROMPT = """
+Summarize these journal entries from one user of a journaling app. Cover the
+main events, recurring themes, emotional patterns and any changes over the
+period, in plain prose of at most {limit} tokens. Address the user as "you"
+and do not invent events.
+
+Entries:
+{entries}
+"""
+
+REDUCE_PROMPT = """
+Combine these summaries of consecutive stretches of one user's journal,
+oldest first, into one summary of at most {limit} tokens. Keep the recurring
+themes, emotional patterns and how they changed over time; drop one-off
+details. Address the user as "you" and do not invent events.
+
+Summaries:
+{summaries}
+"""
+
+@dataclass(frozen=True)
+class Entry:
+    id: int
+    created_at: datetime
+    text: str
+
+    def render(self) -> str:
+        return f"- {self.created_at:%Y-%m-%d}: {self.text}"
+
+@dataclass(frozen=True)
+class SummaryResult:
+    summary: str
+    entries: int
+    chunks: int
+    levels: int  # reduce levels above the chunk summaries
+    computed: int  # LLM calls made by this run
+    cached: int  # summaries reused from summary_chunks
+
+def load_entries(user_id: int, start: date, end: date, bind: Engine = engine) -> List[Entry]:
+    since = datetime.combine(start, datetime.min.time())
+    until = datetime.combine(end + timedelta(days=1), datetime.min.time())
+    with bind.connect() as connection:
+        rows = connection.execute(
+            select(JournalEntry.id, JournalEntry.created_at, JournalEntry.entry_text)
+            .where(JournalEntry.user_id == user_id, JournalEntry.created_at >= since, JournalEntry.created_at < until)
+            .order_by(JournalEntry.created_at, JournalEntry.id)
+        ).all()
+    return [Entry(row.id, row.created_at, row.entry_text or "") for row in rows if row.entry_text]
+
+def chunk_entries(entries: Sequence[Entry], budget: int = SUMMARY_CHUNK_TOKENS) -> List[List[Entry]]:
+    """
+    Packs entries, in order, into chunks of at most budget tokens. Chunks never
+    span two ISO weeks, so a new or edited entry only moves chunk boundaries
+    within its own week and every other chunk keeps its cached summary. An
+    entry longer than the budget is truncated to fit a chunk on its own.
+    """
+    chunks: List[List[Entry]] = []
+    used, week = 0, None
+    for entry in entries:
+        if count_tokens(entry.render()) > budget:
+            entry = Entry(entry.id, entry.created_at, truncate_tokens(entry.text, budget - 20))
+        tokens = count_tokens(entry.render())
+        entry_week = entry.created_at.isocalendar()[:2]
+        if not chunks or entry_week != week or used + tokens > budget:
+            chunks.append([])
+            used, week = 0, entry_week
+        chunks[-1].append(entry)
+        used += tokens
+    return chunks
+
+def cache_key(level: int, inputs: Sequence[str]) -> str:
+    payload = json.dumps([SUMMARY_VERSION, SUMMARY_MODEL, level, list(inputs)])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def _complete(prompt: str, client: Optional[OpenAI] = None) -> str:
+    client = client or OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    response = client.chat.completions.create(
+        model=SUMMARY_MODEL,
+        messages=[{"role": "system", "content": prompt}],
+        max_tokens=SUMMARY_TOKENS,
+        temperature=0.3
+    )
+    return response.choices[0].message.content.strip()
+
+def _prompt(level: int, inputs: Sequence[str]) -> str:
+    if level == 0:
+        return MAP_PROMPT.format(limit=SUMMARY_TOKENS, entries="\n".join(inputs))
+    return REDUCE_PROMPT.format(limit=SUMMARY_TOKENS, summaries="\n\n".join(
+        f"Part {i}:\n{summary}" for i, summary in enumerate(inputs, 1)
+    ))
+
+def _run_level(
+    level: int,
+    groups: List[List[str]],
+    bind: Engine,
+    client: Optional[OpenAI],
+    concurrency: int
+) -> Tuple[List[str], int, int]:
+    """Summaries for one level's groups of inputs: cached ones from the table, the rest concurrently."""
+    keys = [cache_key(level, group) for group in groups]
+    with bind.connect() as connection:
+        cached = dict(connection.execute(
+            select(SummaryChunk.key, SummaryChunk.summary).where(SummaryChunk.key.in_(set(keys)))
+        ).all())
+
+    missing = {key: group for key, group in zip(keys, groups) if key not in cached}
+    computed: Dict[str, str] = {}
+    failure = None
+    if missing:
+        client = client or OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(missing)))) as pool:
+            futures = {pool.submit(_complete, _prompt(level, group), client): key for key, group in missing.items()}
+            for future in as_completed(futures):
+                try:
+                    computed[futures[future]] = truncate_tokens(future.result(), SUMMARY_TOKENS)
+                except Exception as e:
+                    logger.warning(f"Summary at level {level} failed: {e}")
+                    failure = failure or e
+
+    # Summaries that succeeded are kept even if a sibling failed, so a rerun only retries the failures
+    if computed:
+        now = datetime.utcnow()
+        with bind.begin() as connection:
+            # Keys a concurrent run cached first keep its summaries, which are as good as these
+            upsert(connection, SummaryChunk.__table__, [
+                {"key": key, "level": level, "summary": summary, "token_count": count_tokens(summary),
+                 "created_at": now}
+                for key, summary in computed.items()
+            ], index_elements=("key",))
+    if failure is not None:
+        raise failure
+
+    summaries = {**cached, **computed}
+    return [summaries[key] for key in keys], len(computed), len(set(keys) & set(cached))
+
+def summarize_entries(
+    entries: Sequence[Entry],
+    bind: Engine = engine,
+    client: Optional[OpenAI] = None,
+    chunk_tokens: int = SUMMARY_CHUNK_TOKENS,
+    concurrency: int = SUMMARY_CONCURRENCY,
+    fan_in: int = SUMMARY_FAN_IN
+) -> Optional[SummaryResult]:
+    """
+    Map-reduce summary of entries in chronological order: each chunk is
+    summarized on its own, then consecutive partial summaries are combined
+    fan_in at a time until one remains. Every summary is cached by a hash of
+    its inputs, so after one new entry only that entry's chunk and the
+    reductions above it call the LLM again.
+    """
+    chunks = chunk_entries(entries, chunk_tokens)
+    if not chunks:
+        return None
+
+    summaries, computed, cached = _run_level(
+        0, [[entry.render() for entry in chunk] for chunk in chunks], bind, client, concurrency
+    )
+    level = 0
+    while len(summaries) > 1:
+        level += 1
+        groups = [summaries[i:i + max(fan_in, 2)] for i in range(0, len(summaries), max(fan_in, 2))]
+        summaries, level_computed, level_cached = _run_level(level, groups, bind, client, concurrency)
+        computed += level_computed
+        cached += level_cached
+    return SummaryResult(summaries[0], len(entries), len(chunks), level, computed, cached)
+
+def summarize_period(
+    user_id: int,
+    start: date,
+    end: date,
+    bind: Engine = engine,
+    client: Optional[OpenAI] = None
+) -> Optional[SummaryResult]:
+    """Summary of a user's entries from start to end inclusive; None when there are none."""
+    return summarize_entries(load_entries(user_id, start, end, bind), bind, client)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Summarize a user's journal entries over a period with map-reduce")
+    parser.add_argument("--user-id", type=int, required=True)
+    parser.add_argument("--start", type=date.fromisoformat, required=True)
+    parser.add_argument("--end", type=date.fromisoformat, help="Last day included (default: today)")
+    args = parser.parse_args()
+
+    result = summarize_period(args.user_id, args.start, args.end or datetime.utcnow().date())
+    print(json.dumps({"status": "success", "summary": vars(result) if result else None}))
@@ -1,7 +1,28 @@
-from fastapi import FastAPI, Depends, HTTPException, status
+from fastapi import FastAPI, Depends, HTTPException, Request, Response, status
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, Session
-from database.models import Base, JournalEntry, Habit, User
+from database.models import Base, JournalEntry, Habit, User, CheckIn
+from database.group_commit import get_group_commit_writer, shutdown_group_commit_writer
+from data_io.routes import router as data_io_router
+from analytics.routes import router as analytics_router
+from analytics.online_stats import check_in_alerts
+from cache.etags import conditional_response
+from cache.read_through import cached, invalidate
+from cache.routes import router as cache_router
+from classifiers.routes import router as classifiers_router
+from dashboard.routes import router as dashboard_router
+from dashboard.listings import list_check_ins, list_habits, list_journal_entries
+from habits.routes import router as habits_router
+from llm.routes import router as llm_router
+from schemas.serialization import FAST_JSON_ENABLED, list_response
+from schemas.validation import CheckInResponse, HabitResponse, JournalEntryResponse, StoredJournalEntryResponse
+from memory.routes import router as memory_router
+from reports.routes import router as reports_router
+from search.routes import router as search_router
+from sync.routes import router as sync_router
+from habits.service import get_or_create_habit, log_habit
+from habits.progress import habit_progress
+from habits.streaks import streak_summary
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import OAuth2PasswordBearer
 from datetime import datetime, timedelta
@@ -20,17 +41,11 @@ class UserCreate(BaseModel):
 class JournalEntryCreate(BaseModel):
     entry_text: str
 
-class JournalEntryResponse(BaseModel):
-    id: int
-    entry_text: str
-    sentiment_score: float
-    mood: str
-    ai_reflection: Optional[str]
-    created_at: datetime
-
 class HabitCreate(BaseModel):
     habit_name: str
     frequency: str
+    description: Optional[str] = None
+    target_days: Optional[List[str]] = None  # weekly habits only
 
 # Load environment variables
 DATABASE_URL = os.getenv("DATABASE_URL", "postgresql://jamesguy@localhost/mindmirror")
@@ -82,7 +97,7 @@ def create_user(user: UserCreate, db: Session = Depends(get_db)):
     db.refresh(new_user)
     return {"message": "User created successfully", "user_id": new_user.id}
 
-@app.post("/journal/", response_model=JournalEntryResponse)
+@app.post("/journal/", response_model=StoredJournalEntryResponse)
 def add_journal_entry(entry: JournalEntryCreate, user_id: int, db: Session = Depends(get_db)):
     user = db.query(User).filter(User.id == user_id).first()
     if not user:
@@ -101,10 +116,11 @@ def add_journal_entry(entry: JournalEntryCreate, user_id: int, db: Session = Dep
     db.add(journal_entry)
     db.commit()
     db.refresh(journal_entry)
+    invalidate(user.id, "journal_entries")
     
     return journal_entry
 
-@app.get("/journal/{user_id}", response_model=List[JournalEntryResponse])
+@app.get("/journal/{user_id}", response_model=List[StoredJournalEntryResponse])
 def get_journal_entries(user_id: int, db: Session = Depends(get_db)):
     user = db.query(User).filter(User.id == user_id).first()
     if not user:
@@ -119,15 +135,13 @@ def track_habit(habit: HabitCreate, user_id: int, db: Session = Depends(get_db))
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    habit_entry = Habit(
-        user_id=user.id,
-        habit_name=habit.habit_name,
-        frequency=habit.frequency,
-        last_logged=datetime.utcnow()
-    )
-    db.add(habit_entry)
-    db.commit()
-    return {"message": f"Habit '{habit.habit_name}' logged successfully."}
+    habit_entry = get_or_create_habit(db, user.id, habit.habit_name, habit.frequency, habit.target_days)
+    _, habit_entry = log_habit(db, habit_entry)
+    return {
+        "message": f"Habit '{habit.habit_name}' logged successfully.",
+        "habit_id": habit_entry.id,
+        **streak_summary(habit_entry)
+    }
 
 @app.post("/journal/analyze/")
 def analyze_journal_entry(entry: JournalEntryCreate, user_id: int, db: Session = Depends(get_db)):
@@ -160,6 +174,7 @@ def analyze_journal_entry(entry: JournalEntryCreate, user_id: int, db: Session =
     )
     db.add(journal_entry)
     db.commit()
+    invalidate(user_id, "journal_entries")
 
     return {"message": "Journal entry analyzed!", "feedback": ai_feedback, "mood": mood}
 
@@ -178,6 +193,21 @@ app.add_middleware(
 
 # Add authentication router
 app.include_router(auth_router, prefix="/auth", tags=["authentication"])
+app.include_router(data_io_router, tags=["import/export"])
+app.include_router(analytics_router, tags=["analytics"])
+app.include_router(habits_router, tags=["habits"])
+app.include_router(memory_router, tags=["memory"])
+app.include_router(search_router, tags=["search"])
+app.include_router(cache_router, tags=["cache"])
+app.include_router(dashboard_router, tags=["dashboard"])
+app.include_router(sync_router, tags=["sync"])
+app.include_router(classifiers_router, tags=["analysis"])
+app.include_router(reports_router, tags=["reviews"])
+app.include_router(llm_router, tags=["journal prompts"])
+
+@app.on_event("shutdown")
+def flush_group_commit_writer():
+    shutdown_group_commit_writer()
 
 # Security setup
 API_KEY_NAME = "X-API-KEY"
@@ -236,31 +266,59 @@ async def create_habit(
         raise handle_database_error(e)
 
 @app.post("/check-ins/", response_model=CheckInResponse)
-async def create_check_in(
+def create_check_in(
     check_in_data: CheckInCreate,
-    current_user: str = Depends(get_current_user)
+    current_user: str = Depends(get_current_user),
+    db: Session = Depends(get_db)
 ) -> CheckInResponse:
     """Create a new well-being check-in."""
+    user = db.query(User).filter(User.username == current_user).first()
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+
     try:
-        check_in = {
-            "user_id": current_user,
+        check_in_values = {
+            "user_id": user.id,
             **check_in_data.dict(),
             "created_at": datetime.utcnow()
         }
-        
-        return CheckInResponse(**check_in)
+
+        # Batch with concurrent writes when group commit is enabled
+        writer = get_group_commit_writer()
+        if writer:
+            check_in_id = writer.insert(CheckIn.__table__, check_in_values)
+        else:
+            db_check_in = CheckIn(**check_in_values)
+            db.add(db_check_in)
+            db.commit()
+            check_in_id = db_check_in.id
+        invalidate(user.id, "check_ins")
+
+        return CheckInResponse(**{
+            **check_in_values,
+            "id": check_in_id,
+            "user_id": current_user,
+            "alerts": check_in_alerts(db, user.id)
+        })
     except Exception as e:
         logger.error(f"Error creating check-in: {str(e)}")
         raise handle_database_error(e)
 
 @app.post("/reflection/", status_code=status.HTTP_201_CREATED)
-async def create_reflection(
+def create_reflection(
     reflection_data: str,
-    current_user: str = Depends(get_current_user)
+    depth: bool = False,
+    current_user: str = Depends(get_current_user),
+    db: Session = Depends(get_db)
 ):
+    user = db.query(User).filter(User.username == current_user).first()
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+
     try:
-        # Get AI analysis
-        agent = ReflectionAgent(user_input=reflection_data)
+        # Get AI analysis, with relevant history retrieved for the user
+        # depth=true skips the local tier when ANALYSIS_MODE is tiered
+        agent = ReflectionAgent(user_input=reflection_data, user_id=user.id, depth=depth)
         result = agent.run()
         
         return {
@@ -276,13 +334,27 @@ async def create_reflection(
         )
 
 @app.post("/habit-tracking/", status_code=status.HTTP_201_CREATED)
-async def create_habit_tracking(
+def create_habit_tracking(
     habit_data: HabitCreate,
-    current_user: str = Depends(get_current_user)
+    current_user: str = Depends(get_current_user),
+    db: Session = Depends(get_db)
 ):
+    user = db.query(User).filter(User.username == current_user).first()
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+
     try:
-        # Get AI analysis
-        agent = HabitTrackerAgent(action="analyze", habit_data={"name": habit_data.habit_name})
+        habit = get_or_create_habit(
+            db, user.id, habit_data.habit_name, habit_data.frequency, habit_data.target_days
+        )
+
+        # Get AI analysis from counts aggregated in SQL rather than the full log history
+        agent = HabitTrackerAgent(action="analyze", habit_data={
+            "name": habit.habit_name,
+            "description": habit_data.description,
+            "frequency": habit.frequency,
+            "progress": habit_progress(db, habit.id)
+        })
         result = agent.run()
         
         return {
@@ -298,16 +370,24 @@ async def create_habit_tracking(
         )
 
 @app.post("/well-being-check-in/", status_code=status.HTTP_201_CREATED)
-async def create_well_being_check_in(
+def create_well_being_check_in(
     mood: int,
     energy: int,
     stress: int,
     notes: str,
-    current_user: str = Depends(get_current_user)
+    current_user: str = Depends(get_current_user),
+    db: Session = Depends(get_db)
 ):
+    user = db.query(User).filter(User.username == current_user).first()
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+
     try:
-        # Get AI analysis
-        agent = CheckInAgent(metrics={"mood": mood, "energy": energy, "stress": stress, "notes": notes})
+        # Get AI analysis, with the user's running check-in statistics as the baseline
+        agent = CheckInAgent(
+            metrics={"mood": mood, "energy": energy, "stress": stress, "notes": notes},
+            user_id=user.id
+        )
         result = agent.run()
         
         return {
@@ -323,77 +403,92 @@ async def create_well_being_check_in(
         )
 
 @app.get("/journal-entries/", response_model=list[JournalEntryResponse])
-async def get_journal_entries(
+def get_journal_entries(
+    request: Request,
+    response: Response,
     current_user: str = Depends(get_current_user),
     skip: int = 0,
-    limit: int = 10
+    limit: int = 10,
+    db: Session = Depends(get_db)
 ) -> list[JournalEntryResponse]:
-    """Get all journal entries for the current user."""
+    """Get journal entries for the current user, newest first."""
+    user = db.query(User).filter(User.username == current_user).first()
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    # Answered from the collection's version stamp before any row is loaded
+    not_modified, version = conditional_response(request, response, db, user.id, "journal_entries", (skip, limit))
+    if not_modified:
+        return not_modified
+
     try:
-        # In a real implementation, you would fetch from database
-        # For now, returning mock data
-        entries = [
-            {
-                "id": 1,
-                "user_id": current_user,
-                "entry_text": "Sample entry",
-                "mood": "Positive",
-                "created_at": datetime.utcnow(),
-                "ai_insights": "Sample insights"
-            }
-        ]
-        return [JournalEntryResponse(**entry) for entry in entries]
+        # Served from the read cache until the user writes a new entry; keyed on the
+        # ETag's version too, as the cache's own versions may be per process
+        entries = cached(user.id, "journal_entries", (version, skip, limit),
+                         lambda: list_journal_entries(db, user.id, skip, limit))
+        if FAST_JSON_ENABLED:
+            return list_response(JournalEntryResponse, [{**entry, "user_id": current_user} for entry in entries], response)
+        return [JournalEntryResponse(**entry, user_id=current_user) for entry in entries]
     except Exception as e:
         logger.error(f"Error fetching journal entries: {str(e)}")
         raise handle_database_error(e)
 
 @app.get("/habits/", response_model=list[HabitResponse])
-async def get_habits(
+def get_habits(
+    request: Request,
+    response: Response,
     current_user: str = Depends(get_current_user),
     skip: int = 0,
-    limit: int = 10
+    limit: int = 10,
+    db: Session = Depends(get_db)
 ) -> list[HabitResponse]:
-    """Get all habits for the current user."""
+    """Get habits for the current user with their current streaks."""
+    user = db.query(User).filter(User.username == current_user).first()
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    # Answered from the collection's version stamp before any row is loaded
+    # Streaks lapse with the date as well as with writes
+    today = datetime.utcnow().date()
+    not_modified, version = conditional_response(request, response, db, user.id, "habits", (skip, limit, today),
+                                                 changes_at=datetime.combine(today, datetime.min.time()))
+    if not_modified:
+        return not_modified
+
     try:
-        # Mock data for now
-        habits = [
-            {
-                "id": 1,
-                "user_id": current_user,
-                "habit_name": "Daily Meditation",
-                "frequency": "daily",
-                "description": "15 minutes morning meditation",
-                "streak": 5,
-                "created_at": datetime.utcnow(),
-                "last_logged": datetime.utcnow()
-            }
-        ]
-        return [HabitResponse(**habit) for habit in habits]
+        habits = cached(user.id, "habits", (version, skip, limit, today),
+                        lambda: list_habits(db, user.id, skip, limit, today))
+        if FAST_JSON_ENABLED:
+            return list_response(HabitResponse, [{**habit, "user_id": current_user} for habit in habits], response)
+        return [HabitResponse(**habit, user_id=current_user) for habit in habits]
     except Exception as e:
         logger.error(f"Error fetching habits: {str(e)}")
         raise handle_database_error(e)
 
 @app.get("/check-ins/", response_model=list[CheckInResponse])
-async def get_check_ins(
+def get_check_ins(
+    request: Request,
+    response: Response,
     current_user: str = Depends(get_current_user),
     skip: int = 0,
-    limit: int = 10
+    limit: int = 10,
+    db: Session = Depends(get_db)
 ) -> list[CheckInResponse]:
-    """Get all check-ins for the current user."""
+    """Get check-ins for the current user, newest first."""
+    user = db.query(User).filter(User.username == current_user).first()
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    # Answered from the collection's version stamp before any row is loaded
+    not_modified, version = conditional_response(request, response, db, user.id, "check_ins", (skip, limit))
+    if not_modified:
+        return not_modified
+
     try:
-        # Mock data for now
-        check_ins = [
-            {
-                "id": 1,
-                "user_id": current_user,
-                "mood": 8,
-                "energy": 7,
-                "stress": 3,
-                "notes": "Feeling great today!",
-                "created_at": datetime.utcnow()
-            }
-        ]
-        return [CheckInResponse(**check_in) for check_in in check_ins]
+        check_ins = cached(user.id, "check_ins", (version, skip, limit), lambda: list_check_ins(db, user.id, skip, limit))
+        if FAST_JSON_ENABLED:
+            return list_response(CheckInResponse, [{**check_in, "user_id": current_user} for check_in in check_ins], response)
+        return [CheckInResponse(**check_in, user_id=current_user) for check_in in check_ins]
     except Exception as e:
         logger.error(f"Error fetching check-ins: {str(e)}")
         raise handle_database_error(e)
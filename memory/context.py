@@ -0,0 +1,191 @@
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import func, select
+from sqlalchemy.engine import Engine
+import hashlib
+import os
+import threading
+
+from database.database import engine
+from database.models import CollectionVersion, Habit, JournalEntry, ProfileSummary
+from habits.streaks import streak_summary
+from memory.semantic_index import get_model, search_entries
+
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "600"))
+ITEM_TOKEN_LIMIT = 120  # longer entries are truncated so one entry cannot take the whole budget
+CANDIDATES = 20  # nearest entries considered before recency weighting
+RECENCY_HALF_LIFE_DAYS = 30
+RECENCY_FLOOR = 0.3  # old but highly relevant memories still count
+CACHED_USERS = 1024
+CACHED_QUERIES_PER_USER = 8
+
+@lru_cache(maxsize=1)
+def _encoder():
+    try:
+        import tiktoken
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        # Offline or not installed: fall back to the ~4 characters per token rule of thumb
+        return None
+
+def count_tokens(text: str) -> int:
+    encoder = _encoder()
+    return len(encoder.encode(text)) if encoder else (len(text) + 3) // 4
+
+def truncate_tokens(text: str, limit: int) -> str:
+    encoder = _encoder()
+    if encoder:
+        tokens = encoder.encode(text)
+        return text if len(tokens) <= limit else encoder.decode(tokens[:limit]).rstrip() + "…"
+    return text if len(text) <= limit * 4 else text[:limit * 4].rstrip() + "…"
+
+def recency_weight(when: Optional[datetime], now: datetime) -> float:
+    if when is None:
+        return RECENCY_FLOOR
+    age_days = max((now - when).total_seconds() / 86400, 0.0)
+    return RECENCY_FLOOR + (1 - RECENCY_FLOOR) * 0.5 ** (age_days / RECENCY_HALF_LIFE_DAYS)
+
+@dataclass
+class MemoryItem:
+    kind: str  # entry, reflection or habit
+    text: str
+    score: float
+    when: Optional[datetime] = None
+
+    def render(self) -> str:
+        day = f"{self.when:%Y-%m-%d} " if self.when else ""
+        return f"- [{day}{self.kind}] {self.text}"
+
+@dataclass
+class MemoryContext:
+    """The packed prompt context and what went into it."""
+    items: List[MemoryItem] = field(default_factory=list)
+    tokens: int = 0
+    budget: int = CONTEXT_TOKEN_BUDGET
+    profile: Optional[str] = None  # rolling profile summary, see memory.profile
+
+    @property
+    def text(self) -> str:
+        lines = [f"Profile: {self.profile}"] if self.profile else []
+        return "\n".join(lines + [item.render() for item in self.items])
+
+def pack(candidates: List[MemoryItem], budget: int = CONTEXT_TOKEN_BUDGET) -> MemoryContext:
+    """Greedily keeps the highest-scoring items that fit in the token budget."""
+    context = MemoryContext(budget=budget)
+    for item in sorted(candidates, key=lambda item: item.score, reverse=True):
+        item.text = truncate_tokens(item.text, ITEM_TOKEN_LIMIT)
+        cost = count_tokens(item.render()) + 1  # newline
+        if context.tokens + cost > budget:
+            continue
+        context.items.append(item)
+        context.tokens += cost
+    # Present the kept items in chronological order
+    context.items.sort(key=lambda item: item.when or datetime.min)
+    return context
+
+def data_version(connection, user_id: int) -> Tuple:
+    """
+    Changes whenever the user adds, edits or deletes an entry, habit or
+    habit log, or adds a profile version. Built from the collection stamps
+    behind the listing ETags, which move on edits as well as inserts.
+    """
+    def collection_version(collection: str):
+        return select(CollectionVersion.version).where(
+            CollectionVersion.user_id == user_id, CollectionVersion.collection == collection
+        ).scalar_subquery()
+
+    return connection.execute(select(
+        collection_version("journal_entries"),
+        collection_version("habits"),  # habit log writes bump it too
+        select(func.max(ProfileSummary.version)).where(ProfileSummary.user_id == user_id).scalar_subquery(),
+    )).one()
+
+def gather_candidates(connection, user_id: int, text: str, bind: Engine, now: datetime) -> List[MemoryItem]:
+    """Relevant entries and their reflections, plus habit facts, scored by relevance and recency."""
+    matches = search_entries(user_id, text, k=CANDIDATES, bind=bind)
+    similarity = dict(matches)
+    entries = connection.execute(
+        select(JournalEntry.id, JournalEntry.entry_text, JournalEntry.ai_reflection, JournalEntry.created_at)
+        .where(JournalEntry.user_id == user_id, JournalEntry.id.in_(list(similarity)))
+    ).all() if similarity else []
+
+    candidates: List[MemoryItem] = []
+    for entry in entries:
+        score = max(similarity[entry.id], 0.0) * recency_weight(entry.created_at, now)
+        candidates.append(MemoryItem("entry", entry.entry_text or "", score, entry.created_at))
+        if entry.ai_reflection:
+            # A past reflection is worth slightly less than the entry it reflects on
+            candidates.append(MemoryItem("reflection", entry.ai_reflection, score * 0.8, entry.created_at))
+
+    habits = connection.execute(
+        select(Habit.habit_name, Habit.frequency, Habit.streak, Habit.best_streak,
+               Habit.last_completed_on, Habit.last_logged)
+        .where(Habit.user_id == user_id)
+    ).all()
+    if habits:
+        model = get_model()
+        query = model.embed([text])[0]
+        relevance = model.embed([habit.habit_name or "" for habit in habits]) @ query
+        for habit, habit_relevance in zip(habits, relevance):
+            summary = streak_summary(habit)
+            fact = (
+                f"Tracks {habit.habit_name} ({habit.frequency}): current streak "
+                f"{summary['current_streak']}, best {summary['best_streak']}"
+            )
+            # Habits are standing facts, so they keep a baseline score even when unrelated
+            score = (0.2 + 0.8 * max(float(habit_relevance), 0.0)) * recency_weight(habit.last_logged, now)
+            candidates.append(MemoryItem("habit", fact, score, habit.last_logged))
+    return candidates
+
+_cache: "OrderedDict[int, Tuple[Tuple, OrderedDict]]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+def build_context(
+    user_id: int,
+    text: str,
+    budget: int = CONTEXT_TOKEN_BUDGET,
+    bind: Engine = engine
+) -> MemoryContext:
+    """
+    The user's profile summary plus the past entries, reflections and habit
+    facts most relevant to text, packed into budget tokens. Results are
+    cached per user until new data arrives.
+    """
+    query_key = (hashlib.sha1(text.encode()).hexdigest(), budget)
+    with bind.connect() as connection:
+        version = data_version(connection, user_id)
+        with _cache_lock:
+            cached = _cache.get(user_id)
+            if cached and cached[0] == version and query_key in cached[1]:
+                _cache.move_to_end(user_id)
+                return cached[1][query_key]
+
+        # The fixed-size profile summary comes first; retrieved items share the rest of the budget
+        profile = connection.execute(
+            select(ProfileSummary.summary)
+            .where(ProfileSummary.user_id == user_id)
+            .order_by(ProfileSummary.version.desc())
+            .limit(1)
+        ).scalar()
+        profile_tokens = count_tokens(f"Profile: {profile}") + 1 if profile else 0
+
+        now = datetime.utcnow()
+        context = pack(gather_candidates(connection, user_id, text, bind, now), max(budget - profile_tokens, 0))
+        context.budget = budget
+        context.profile = profile
+        context.tokens += profile_tokens
+
+    with _cache_lock:
+        cached = _cache.get(user_id)
+        contexts = cached[1] if cached and cached[0] == version else OrderedDict()
+        contexts[query_key] = context
+        while len(contexts) > CACHED_QUERIES_PER_USER:
+            contexts.popitem(last=False)
+        _cache[user_id] = (version, contexts)
+        _cache.move_to_end(user_id)
+        while len(_cache) > CACHED_USERS:
+            _cache.popitem(last=False)
+    return context
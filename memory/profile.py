@@ -0,0 +1,226 @@
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from openai import OpenAI
+from sqlalchemy import func, select
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+import argparse
+import json
+import logging
+import os
+
+from database.database import engine
+from database.models import DailyUserStat, JournalEntry, ProfileSummary
+from memory.context import count_tokens, truncate_tokens
+
+logger = logging.getLogger(__name__)
+
+PROFILE_TOKEN_LIMIT = int(os.getenv("PROFILE_TOKEN_LIMIT", "400"))
+DELTA_MIN_ENTRIES = 5  # new entries needed before a scheduled update folds them in
+DELTA_MAX_ENTRIES = 40  # entries per delta prompt; larger backlogs are folded in several steps
+DELTA_ENTRY_TOKENS = 150
+COMPACTION_EVERY = 8  # delta versions between compactions
+COMPACTION_MONTHS = 6  # months of mood rollups given to the compaction prompt
+
+DELTA_PROMPT = """
+You maintain a concise profile of a journaling app user: recurring themes,
+emotional patterns, goals, stressors, coping strategies and how they are changing.
+
+Current profile (version {version}):
+{summary}
+
+New journal entries since the last update:
+{entries}
+
+Update the profile to reflect the new entries. Keep durable patterns, note
+meaningful changes, and drop details that no longer matter. Write plain prose
+of at most {limit} tokens. Return only the updated profile.
+"""
+
+COMPACTION_PROMPT = """
+Rewrite this user profile so it stays accurate and compact.
+
+Current profile:
+{summary}
+
+Monthly averages from check-ins and journal sentiment:
+{stats}
+
+Merge repeated points, remove outdated or one-off details, keep long-term
+patterns and the most recent direction of change. Write plain prose of at most
+{limit} tokens. Return only the rewritten profile.
+"""
+
+def latest_profile(connection, user_id: int):
+    """The newest profile row for a user (works with a Session or a Connection)."""
+    return connection.execute(
+        select(ProfileSummary.__table__)
+        .where(ProfileSummary.user_id == user_id)
+        .order_by(ProfileSummary.version.desc())
+        .limit(1)
+    ).first()
+
+def get_profile_summary(db: Session, user_id: int) -> Optional[Dict]:
+    """The latest profile summary for agents and the API."""
+    profile = latest_profile(db, user_id)
+    if profile is None:
+        return None
+    return {
+        "version": profile.version,
+        "kind": profile.kind,
+        "summary": profile.summary,
+        "token_count": profile.token_count,
+        "covered_through_entry_id": profile.covered_through_entry_id,
+        "updated_at": profile.created_at,
+    }
+
+def _complete(prompt: str, client: Optional[OpenAI] = None) -> str:
+    client = client or OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    response = client.chat.completions.create(
+        model="gpt-4-turbo-preview",
+        messages=[{"role": "system", "content": prompt}],
+        max_tokens=PROFILE_TOKEN_LIMIT,
+        temperature=0.3
+    )
+    return response.choices[0].message.content.strip()
+
+def _save(connection: Connection, user_id: int, previous, kind: str, summary: str,
+          covered_through: Optional[int], folded: int) -> Dict:
+    # Anything the model returned over the limit is cut so the summary stays fixed-size
+    summary = truncate_tokens(summary, PROFILE_TOKEN_LIMIT)
+    values = {
+        "user_id": user_id,
+        "version": (previous.version if previous else 0) + 1,
+        "kind": kind,
+        "summary": summary,
+        "token_count": count_tokens(summary),
+        "covered_through_entry_id": covered_through,
+        "entries_folded": folded,
+        "created_at": datetime.utcnow(),
+    }
+    connection.execute(ProfileSummary.__table__.insert().values(**values))
+    return values
+
+def monthly_stats(connection: Connection, user_id: int, months: int = COMPACTION_MONTHS) -> List[str]:
+    """Per-month means from the daily rollups, most recent last."""
+    since = (datetime.utcnow() - timedelta(days=31 * months)).date()
+    rows = connection.execute(
+        select(DailyUserStat.day, DailyUserStat.metric, DailyUserStat.count, DailyUserStat.value_sum)
+        .where(DailyUserStat.user_id == user_id, DailyUserStat.day >= since)
+    ).all()
+    totals: Dict[tuple, List[float]] = {}
+    for row in rows:
+        total = totals.setdefault((row.day.strftime("%Y-%m"), row.metric), [0, 0.0])
+        total[0] += row.count or 0
+        total[1] += row.value_sum or 0.0
+    lines: Dict[str, List[str]] = {}
+    for (month, metric), (count, value_sum) in sorted(totals.items()):
+        if count:
+            lines.setdefault(month, []).append(f"{metric} {value_sum / count:.2f}")
+    return [f"{month}: {', '.join(values)}" for month, values in lines.items()]
+
+def compact_profile(user_id: int, bind: Engine = engine, client: Optional[OpenAI] = None) -> Optional[Dict]:
+    """Rewrites the latest summary against the mood rollups so repeated deltas do not drift."""
+    with bind.connect() as connection:
+        previous = latest_profile(connection, user_id)
+        if previous is None:
+            return None
+        stats = monthly_stats(connection, user_id)
+
+    # The model call happens outside any transaction; the unique (user_id, version)
+    # constraint rejects a concurrent update that raced past the same version
+    summary = _complete(COMPACTION_PROMPT.format(
+        summary=previous.summary,
+        stats="\n".join(stats) or "No data",
+        limit=PROFILE_TOKEN_LIMIT
+    ), client)
+    with bind.begin() as connection:
+        return _save(connection, user_id, previous, "compaction", summary, previous.covered_through_entry_id, 0)
+
+def update_profile(
+    user_id: int,
+    bind: Engine = engine,
+    force: bool = False,
+    client: Optional[OpenAI] = None
+) -> Optional[Dict]:
+    """
+    Folds journal entries added since the last version into the profile with
+    a delta prompt, then compacts every COMPACTION_EVERY versions. Returns the
+    newest version, or None when there was nothing to do.
+    """
+    updated = None
+    while True:
+        with bind.connect() as connection:
+            previous = latest_profile(connection, user_id)
+            since = (previous.covered_through_entry_id or 0) if previous else 0
+            entries = connection.execute(
+                select(JournalEntry.id, JournalEntry.entry_text, JournalEntry.created_at)
+                .where(JournalEntry.user_id == user_id, JournalEntry.id > since)
+                .order_by(JournalEntry.id)
+                .limit(DELTA_MAX_ENTRIES)
+            ).all()
+        if not entries or (len(entries) < DELTA_MIN_ENTRIES and not force):
+            break
+
+        summary = _complete(DELTA_PROMPT.format(
+            version=previous.version if previous else 0,
+            summary=previous.summary if previous else "No profile yet.",
+            entries="\n".join(
+                f"- {entry.created_at or datetime.utcnow():%Y-%m-%d}: {truncate_tokens(entry.entry_text or '', DELTA_ENTRY_TOKENS)}"
+                for entry in entries
+            ),
+            limit=PROFILE_TOKEN_LIMIT
+        ), client)
+        with bind.begin() as connection:
+            updated = _save(connection, user_id, previous, "delta", summary, entries[-1].id, len(entries))
+        logger.info(f"Profile for user {user_id}: version {updated['version']}, {len(entries)} entries folded")
+
+        if updated["version"] % COMPACTION_EVERY == 0:
+            updated = compact_profile(user_id, bind, client) or updated
+        if len(entries) < DELTA_MAX_ENTRIES:
+            break
+    return updated
+
+def pending_users(bind: Engine = engine, min_entries: int = DELTA_MIN_ENTRIES) -> List[int]:
+    """Users with at least min_entries entries not yet folded into their profile."""
+    covered = (
+        select(ProfileSummary.user_id, func.max(ProfileSummary.covered_through_entry_id).label("through"))
+        .group_by(ProfileSummary.user_id)
+        .subquery()
+    )
+    query = (
+        select(JournalEntry.user_id)
+        .outerjoin(covered, covered.c.user_id == JournalEntry.user_id)
+        .where(JournalEntry.user_id.isnot(None), JournalEntry.id > func.coalesce(covered.c.through, 0))
+        .group_by(JournalEntry.user_id)
+        .having(func.count() >= min_entries)
+    )
+    with bind.connect() as connection:
+        return list(connection.execute(query).scalars())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintain rolling per-user profile summaries")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    update = subcommands.add_parser("update", help="Fold new journal entries into profiles (run on a schedule)")
+    update.add_argument("--user-id", type=int, help="Only update this user's profile")
+    update.add_argument("--force", action="store_true", help="Fold in new entries even below the batch minimum")
+    compact = subcommands.add_parser("compact", help="Rewrite a profile against its mood history")
+    compact.add_argument("--user-id", type=int, required=True)
+    args = parser.parse_args()
+
+    if args.command == "update":
+        user_ids = [args.user_id] if args.user_id is not None else pending_users(min_entries=1 if args.force else DELTA_MIN_ENTRIES)
+        versions = {}
+        for user_id in user_ids:
+            try:
+                result = update_profile(user_id, force=args.force)
+            except Exception as e:
+                logger.error(f"Profile update failed for user {user_id}: {str(e)}")
+                continue
+            if result:
+                versions[user_id] = result["version"]
+        print(json.dumps({"status": "success", "updated": versions}))
+    elif args.command == "compact":
+        result = compact_profile(args.user_id)
+        print(json.dumps({"status": "success", "version": result["version"] if result else None}))
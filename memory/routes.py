@@ -0,0 +1,58 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+
+from database.database import get_db
+from database.models import JournalEntry, User
+from memory.semantic_index import search_entries
+from memory.profile import get_profile_summary, update_profile
+
+router = APIRouter()
+
+@router.get("/memory/similar")
+def read_similar_entries(user_id: int, q: str, k: int = 5, db: Session = Depends(get_db)):
+    """A user's past journal entries ranked by semantic similarity to q."""
+    user = db.query(User).filter(User.id == user_id).first()
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    matches = search_entries(user.id, q, k=max(min(k, 50), 0))
+    entries = {
+        entry.id: entry
+        for entry in db.query(JournalEntry).filter(
+            JournalEntry.user_id == user.id,
+            JournalEntry.id.in_([entry_id for entry_id, _ in matches])
+        )
+    }
+    return {
+        "user_id": user.id,
+        "results": [
+            {
+                "id": entry_id,
+                "score": round(score, 4),
+                "entry_text": entries[entry_id].entry_text,
+                "mood": entries[entry_id].mood,
+                "created_at": entries[entry_id].created_at,
+            }
+            for entry_id, score in matches
+            if entry_id in entries
+        ]
+    }
+
+@router.get("/memory/profile")
+def read_profile_summary(user_id: int, db: Session = Depends(get_db)):
+    """The user's rolling profile summary, as given to the agents."""
+    user = db.query(User).filter(User.id == user_id).first()
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    return {"user_id": user.id, "profile": get_profile_summary(db, user.id)}
+
+@router.post("/memory/profile/refresh")
+def refresh_profile_summary(user_id: int, db: Session = Depends(get_db)):
+    """Folds any entries written since the last version into the profile now."""
+    user = db.query(User).filter(User.id == user_id).first()
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    update_profile(user.id, force=True)
+    return {"user_id": user.id, "profile": get_profile_summary(db, user.id)}
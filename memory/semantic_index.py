@@ -0,0 +1,294 @@
+from dataclasses import dataclass
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from filelock import FileLock
+from sklearn.decomposition import TruncatedSVD
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.preprocessing import normalize
+from sqlalchemy import func, select
+from sqlalchemy.engine import Connection, Engine
+import argparse
+import json
+import logging
+import numpy as np
+import os
+
+from database.database import engine
+from database.hooks import after_commit, on_insert
+from database.models import JournalEntry
+
+logger = logging.getLogger(__name__)
+
+SEMANTIC_INDEX_DIR = os.getenv("SEMANTIC_INDEX_DIR", "data/semantic_index")
+N_FEATURES = 2 ** 16  # hashed vocabulary size
+DIMENSIONS = 128
+TRAIN_SAMPLE = 20000  # entries used to fit the SVD
+EMBED_BATCH = 1000
+RANDOM_MODEL_VERSION = "random-1"
+
+_hasher = HashingVectorizer(
+    n_features=N_FEATURES, alternate_sign=False, norm=None, stop_words="english", dtype=np.float32
+)
+
+@dataclass(frozen=True)
+class EmbeddingModel:
+    """IDF weights and a projection from hashed term space to DIMENSIONS."""
+    version: str
+    idf: np.ndarray  # (N_FEATURES,)
+    components: np.ndarray  # (DIMENSIONS, N_FEATURES)
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        """Unit-length float32 vectors, one row per text."""
+        if not texts:
+            return np.zeros((0, DIMENSIONS), dtype=np.float32)
+        counts = _hasher.transform(texts)
+        counts.data = np.log1p(counts.data)  # sublinear tf
+        weighted = normalize(counts.multiply(self.idf).tocsr())
+        vectors = np.asarray(weighted @ self.components.T, dtype=np.float32)
+        return normalize(vectors)
+
+def _model_dir() -> str:
+    return os.path.join(SEMANTIC_INDEX_DIR, "model")
+
+def random_model() -> EmbeddingModel:
+    """Seeded random projection, used until a model has been trained."""
+    rng = np.random.default_rng(0)
+    components = rng.standard_normal((DIMENSIONS, N_FEATURES), dtype=np.float32) / np.sqrt(DIMENSIONS)
+    return EmbeddingModel(RANDOM_MODEL_VERSION, np.ones(N_FEATURES, dtype=np.float32), components)
+
+def train_model(texts: Sequence[str]) -> EmbeddingModel:
+    """Fits IDF weights and a truncated SVD (LSA) on a sample of entries."""
+    if len(texts) <= DIMENSIONS:
+        raise ValueError(f"Need more than {DIMENSIONS} entries to train the semantic model")
+    counts = _hasher.transform(texts)
+    counts.data = np.log1p(counts.data)
+    document_frequency = np.bincount(counts.indices, minlength=N_FEATURES)
+    idf = (np.log((1 + len(texts)) / (1 + document_frequency)) + 1).astype(np.float32)
+    svd = TruncatedSVD(n_components=DIMENSIONS, algorithm="randomized", random_state=0)
+    svd.fit(normalize(counts.multiply(idf).tocsr()))
+    version = f"svd-{datetime.utcnow():%Y%m%d%H%M%S}"
+    return EmbeddingModel(version, idf, svd.components_.astype(np.float32))
+
+def save_model(model: EmbeddingModel) -> None:
+    path = _model_dir()
+    os.makedirs(path, exist_ok=True)
+    np.save(os.path.join(path, "idf.npy"), model.idf)
+    np.save(os.path.join(path, "components.npy"), model.components)
+    with open(os.path.join(path, "model.json"), "w") as f:
+        json.dump({"version": model.version, "dimensions": DIMENSIONS, "n_features": N_FEATURES}, f)
+    get_model.cache_clear()
+
+@lru_cache(maxsize=1)
+def get_model() -> EmbeddingModel:
+    """The trained model, memory-mapped from disk, or the random projection."""
+    path = _model_dir()
+    try:
+        with open(os.path.join(path, "model.json")) as f:
+            meta = json.load(f)
+    except FileNotFoundError:
+        return random_model()
+    return EmbeddingModel(
+        meta["version"],
+        np.load(os.path.join(path, "idf.npy"), mmap_mode="r"),
+        np.load(os.path.join(path, "components.npy"), mmap_mode="r"),
+    )
+
+# ids file -> ((path, rows, mtime), rows to keep or None when there are no duplicates)
+_duplicates: Dict[str, Tuple[Tuple, Optional[np.ndarray]]] = {}
+
+class UserIndex:
+    """
+    One user's vectors: an append-only float32 matrix and the matching
+    entry ids, both memory-mapped for search.
+    """
+
+    def __init__(self, user_id: int, root: Optional[str] = None):
+        self.user_id = user_id
+        self.path = os.path.join(root or SEMANTIC_INDEX_DIR, "users", str(user_id))
+        self.vectors_path = os.path.join(self.path, "vectors.f32")
+        self.ids_path = os.path.join(self.path, "ids.i64")
+        self.meta_path = os.path.join(self.path, "meta.json")
+        self.lock: Optional[FileLock] = None
+
+    def _lock(self) -> FileLock:
+        if self.lock is None:
+            os.makedirs(self.path, exist_ok=True)
+            self.lock = FileLock(os.path.join(self.path, ".lock"))
+        return self.lock
+
+    def version(self) -> Optional[str]:
+        try:
+            with open(self.meta_path) as f:
+                return json.load(f)["model_version"]
+        except FileNotFoundError:
+            return None
+
+    def append(self, ids: Sequence[int], vectors: np.ndarray) -> None:
+        """Adds vectors in O(new rows); vectors are written before ids so a torn write is ignored."""
+        with self._lock():
+            with open(self.vectors_path, "ab") as f:
+                f.write(np.ascontiguousarray(vectors, dtype=np.float32).tobytes())
+            with open(self.ids_path, "ab") as f:
+                f.write(np.asarray(ids, dtype=np.int64).tobytes())
+
+    def replace(self, ids: Sequence[int], vectors: np.ndarray, model_version: str) -> None:
+        """Atomically swaps in a full set of vectors built with model_version."""
+        with self._lock():
+            for path, data in ((self.vectors_path, np.asarray(vectors, dtype=np.float32)),
+                               (self.ids_path, np.asarray(ids, dtype=np.int64))):
+                with open(path + ".tmp", "wb") as f:
+                    f.write(data.tobytes())
+                os.replace(path + ".tmp", path)
+            with open(self.meta_path + ".tmp", "w") as f:
+                json.dump({"model_version": model_version, "dimensions": DIMENSIONS}, f)
+            os.replace(self.meta_path + ".tmp", self.meta_path)
+
+    def load(self) -> Tuple[np.ndarray, np.ndarray]:
+        """(ids, vectors), memory-mapped. Later copies of an id win over earlier ones."""
+        try:
+            count = min(os.path.getsize(self.ids_path) // 8, os.path.getsize(self.vectors_path) // (4 * DIMENSIONS))
+        except FileNotFoundError:
+            count = 0
+        if count == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros((0, DIMENSIONS), dtype=np.float32)
+
+        ids = np.memmap(self.ids_path, dtype=np.int64, mode="r", shape=(count,))
+        vectors = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(count, DIMENSIONS))
+        key = (self.ids_path, count, os.stat(self.ids_path).st_mtime_ns)
+        if _duplicates.get(self.ids_path, (None, None))[0] != key:
+            unique, last = np.unique(ids[::-1], return_index=True)
+            _duplicates[self.ids_path] = (key, np.sort(count - 1 - last) if len(unique) < count else None)
+        keep = _duplicates[self.ids_path][1]
+        if keep is not None:
+            return np.asarray(ids[keep]), np.asarray(vectors[keep])
+        return ids, vectors
+
+    def search(
+        self,
+        query: np.ndarray,
+        k: int = 10,
+        exclude_ids: Iterable[int] = ()
+    ) -> List[Tuple[int, float]]:
+        """Top-k (entry id, cosine similarity), best first."""
+        ids, vectors = self.load()
+        if len(ids) == 0 or k <= 0:
+            return []
+        scores = vectors @ np.asarray(query, dtype=np.float32)
+        excluded = np.isin(ids, list(exclude_ids)) if exclude_ids else None
+        if excluded is not None:
+            scores = np.where(excluded, -np.inf, scores)
+        k = min(k, len(ids))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(ids[i]), float(scores[i])) for i in top if np.isfinite(scores[i])]
+
+def rebuild_user_index(user_id: int, bind: Engine = engine) -> int:
+    """Re-embeds all of a user's entries with the current model."""
+    model = get_model()
+    ids: List[int] = []
+    batches: List[np.ndarray] = []
+    with bind.connect() as connection:
+        rows = connection.execution_options(yield_per=EMBED_BATCH).execute(
+            select(JournalEntry.id, JournalEntry.entry_text)
+            .where(JournalEntry.user_id == user_id)
+            .order_by(JournalEntry.id)
+        )
+        for partition in rows.partitions():
+            ids.extend(row.id for row in partition)
+            batches.append(model.embed([row.entry_text or "" for row in partition]))
+    vectors = np.vstack(batches) if batches else np.zeros((0, DIMENSIONS), dtype=np.float32)
+    index = UserIndex(user_id)
+    index.replace(ids, vectors, model.version)
+
+    # Entries committed while the rebuild ran are not in its snapshot, and their
+    # commit skipped the append because the index was still stale
+    indexed = set(ids)
+    with bind.connect() as connection:
+        current = connection.execute(select(JournalEntry.id).where(JournalEntry.user_id == user_id)).scalars().all()
+        missing = [entry_id for entry_id in current if entry_id not in indexed]
+        if missing:
+            rows = connection.execute(
+                select(JournalEntry.id, JournalEntry.entry_text).where(JournalEntry.id.in_(missing))
+            ).all()
+            index.append([row.id for row in rows], model.embed([row.entry_text or "" for row in rows]))
+    return len(ids) + len(missing)
+
+def search_entries(
+    user_id: int,
+    text: str,
+    k: int = 10,
+    exclude_ids: Iterable[int] = (),
+    bind: Engine = engine
+) -> List[Tuple[int, float]]:
+    """Most similar past entries to text, building the user's index on first use."""
+    index = UserIndex(user_id)
+    model = get_model()
+    if index.version() != model.version:
+        rebuild_user_index(user_id, bind)
+    return index.search(model.embed([text])[0], k, exclude_ids)
+
+@on_insert("journal_entries")
+def index_journal_entries(connection: Connection, rows: List[Dict]) -> None:
+    """
+    Appends vectors for new entries once their transaction has committed,
+    so an insert that rolls back or fails to commit never reaches the index.
+    """
+    rows = [row for row in rows if row.get("id") is not None and row.get("user_id") is not None]
+    if rows:
+        after_commit(connection, _append_committed, rows)
+
+def _append_committed(rows: List[Dict]) -> None:
+    try:
+        append_entries(rows)
+    except Exception as e:
+        # The commit already succeeded; the entries are picked up by the next rebuild
+        logger.warning(f"Could not append {len(rows)} entries to the semantic index: {e}")
+
+def append_entries(rows: List[Dict]) -> None:
+    """Appends vectors for committed entries to indexes built with the current model."""
+    model = get_model()
+    rows_by_user: Dict[int, List[Dict]] = {}
+    for row in rows:
+        rows_by_user.setdefault(row["user_id"], []).append(row)
+
+    for user_id, user_rows in rows_by_user.items():
+        index = UserIndex(user_id)
+        # Missing or stale indexes are rebuilt in full on the next search
+        if index.version() != model.version:
+            continue
+        index.append(
+            [row["id"] for row in user_rows],
+            model.embed([row.get("entry_text") or "" for row in user_rows])
+        )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintain the on-disk semantic index of journal entries")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    train = subcommands.add_parser("train", help="Fit the embedding model on a sample of entries")
+    train.add_argument("--sample", type=int, default=TRAIN_SAMPLE, help="Number of entries to fit on")
+    rebuild = subcommands.add_parser("rebuild", help="Re-embed entries with the current model")
+    rebuild.add_argument("--user-id", type=int, help="Only rebuild this user's index")
+    args = parser.parse_args()
+
+    if args.command == "train":
+        with engine.connect() as connection:
+            texts = connection.execute(
+                select(JournalEntry.entry_text)
+                .where(JournalEntry.entry_text.isnot(None))
+                .order_by(func.random())
+                .limit(args.sample)
+            ).scalars().all()
+        model = train_model(texts)
+        save_model(model)
+        print(json.dumps({"status": "success", "model_version": model.version, "entries": len(texts)}))
+    elif args.command == "rebuild":
+        if args.user_id is not None:
+            user_ids = [args.user_id]
+        else:
+            with engine.connect() as connection:
+                user_ids = connection.execute(
+                    select(JournalEntry.user_id).where(JournalEntry.user_id.isnot(None)).distinct()
+                ).scalars().all()
+        indexed = sum(rebuild_user_index(user_id) for user_id in user_ids)
+        print(json.dumps({"status": "success", "users": len(user_ids), "entries": indexed}))
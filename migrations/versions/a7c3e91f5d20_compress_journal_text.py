@@ -0,0 +1,87 @@
+"""Store journal entry text and reflections zstd-compressed
+
+Revision ID: a7c3e91f5d20
+Revises: e6a1b4c7d902
+Create Date: 2026-10-19 19:05:37.210482
+
+"""
+from typing import Callable, Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from database.compression import (
+    MIN_TRAIN_SAMPLES, RECOMPRESS_BATCH, compress_text, create_dictionary, decompress_text, load_dictionaries,
+    sample_texts
+)
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7c3e91f5d20'
+down_revision: Union[str, None] = 'e6a1b4c7d902'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COLUMNS = ('entry_text', 'ai_reflection')
+
+
+def _convert(convert: Callable, new_type) -> None:
+    """
+    Rewrites both columns through convert in id batches. PostgreSQL needs a
+    type change, so values go into new columns that then replace the old
+    ones; SQLite stores either type in place.
+    """
+    bind = op.get_bind()
+    swap = bind.dialect.name != 'sqlite'
+    targets = {name: f'{name}_converted' if swap else name for name in COLUMNS}
+    if swap:
+        for name in COLUMNS:
+            op.add_column('journal_entries', sa.Column(targets[name], new_type, nullable=True))
+
+    entries = sa.table('journal_entries', sa.column('id', sa.Integer), *(sa.column(name) for name in COLUMNS),
+                       *(sa.column(target) for target in targets.values() if swap))
+    update = entries.update().where(entries.c.id == sa.bindparam('row_id'))
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(entries.c.id, *(entries.c[name] for name in COLUMNS))
+            .where(entries.c.id > last_id).order_by(entries.c.id).limit(RECOMPRESS_BATCH)
+        ).mappings().all()
+        if not rows:
+            break
+        bind.execute(update, [
+            {'row_id': row['id'], **{
+                targets[name]: None if row[name] is None else convert(row[name]) for name in COLUMNS
+            }}
+            for row in rows
+        ])
+        last_id = rows[-1]['id']
+
+    if swap:
+        for name in COLUMNS:
+            op.drop_column('journal_entries', name)
+            op.alter_column('journal_entries', targets[name], new_column_name=name)
+
+
+def upgrade() -> None:
+    op.create_table('compression_dictionaries',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('data', sa.LargeBinary(), nullable=True),
+    sa.Column('samples', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    bind = op.get_bind()
+    load_dictionaries(bind)
+    texts = sample_texts(bind)
+    # Small installs start without a dictionary; `python -m database.compression train`
+    # adds one later and `recompress` applies it
+    if len(texts) >= MIN_TRAIN_SAMPLES:
+        create_dictionary(bind, texts)
+    _convert(compress_text, sa.LargeBinary())
+
+
+def downgrade() -> None:
+    load_dictionaries(op.get_bind())
+    _convert(decompress_text, sa.String())
+    op.drop_table('compression_dictionaries')
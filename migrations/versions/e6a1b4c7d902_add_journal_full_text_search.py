@@ -0,0 +1,45 @@
+"""Add full-text search index for journal entries
+
+Revision ID: e6a1b4c7d902
+Revises: 9d3f6b8e2a14
+Create Date: 2026-10-19 18:22:04.671359
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e6a1b4c7d902'
+down_revision: Union[str, None] = '9d3f6b8e2a14'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.execute("ALTER TABLE journal_entries ADD COLUMN search_vector tsvector")
+        op.execute("UPDATE journal_entries SET search_vector = to_tsvector('english', coalesce(entry_text, ''))")
+        op.execute("CREATE INDEX ix_journal_entries_search_vector ON journal_entries USING GIN (search_vector)")
+    elif dialect == 'sqlite':
+        op.execute(
+            "CREATE VIRTUAL TABLE journal_entries_fts USING fts5(entry_text, content='', tokenize='porter unicode61')"
+        )
+        op.execute(
+            "INSERT INTO journal_entries_fts (rowid, entry_text) "
+            "SELECT id, coalesce(entry_text, '') FROM journal_entries"
+        )
+    op.create_index('ix_journal_entries_user_id_created_at', 'journal_entries', ['user_id', 'created_at'], unique=False)
+
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    op.drop_index('ix_journal_entries_user_id_created_at', table_name='journal_entries')
+    if dialect == 'postgresql':
+        op.execute("DROP INDEX ix_journal_entries_search_vector")
+        op.drop_column('journal_entries', 'search_vector')
+    elif dialect == 'sqlite':
+        op.execute("DROP TABLE journal_entries_fts")
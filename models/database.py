@@ -3,6 +3,8 @@ from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from datetime import datetime
 
+from database.compression import CompressedText
+
 Base = declarative_base()
 
 class User(Base):
@@ -24,9 +26,9 @@ class JournalEntry(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
-    entry_text = Column(Text)
+    entry_text = Column(CompressedText)
     mood = Column(String(50))
-    ai_insights = Column(Text)
+    ai_insights = Column(CompressedText)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
@@ -0,0 +1,296 @@
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timedelta
+from io import BytesIO
+from typing import Dict, Iterator, List, Optional, Tuple
+from matplotlib.figure import Figure
+from sqlalchemy import case, create_engine, delete, func, select
+from sqlalchemy.engine import Connection, Engine
+import argparse
+import json
+import logging
+import os
+import time
+
+from analytics.daily_stats import ALL_METRICS
+from database.database import engine
+from database.models import DailyUserStat, Habit, HabitLog, JournalEntry, ReviewReport, ReviewReportChart, User
+
+logger = logging.getLogger(__name__)
+
+REPORT_CHUNK_SIZE = int(os.getenv("REPORT_CHUNK_SIZE", "200"))  # users per worker task
+REPORT_WORKERS = int(os.getenv("REPORT_WORKERS", str(os.cpu_count() or 1)))
+PERIODS = ("month", "quarter")
+CHECK_IN_METRICS = ("mood", "energy", "stress")
+TOP_HABITS = 10  # habits shown in the habit chart
+
+def period_bounds(period: str, day: date) -> Tuple[date, date]:
+    """(first day, last day) of the month or quarter containing day."""
+    first_month = day.month if period == "month" else 3 * ((day.month - 1) // 3) + 1
+    start = date(day.year, first_month, 1)
+    months = 1 if period == "month" else 3
+    next_year, next_month = divmod(first_month - 1 + months, 12)
+    return start, date(day.year + next_year, next_month + 1, 1) - timedelta(days=1)
+
+def last_complete_period(period: str, today: date) -> Tuple[date, date]:
+    """The most recent month or quarter that ended before today."""
+    start, _ = period_bounds(period, today)
+    return period_bounds(period, start - timedelta(days=1))
+
+def user_chunks(bind: Engine, chunk_size: int, user_ids: Optional[List[int]] = None) -> Iterator[List[int]]:
+    """User ids in ascending chunks, paged by id so no query holds them all."""
+    if user_ids is not None:
+        for i in range(0, len(user_ids), chunk_size):
+            yield user_ids[i:i + chunk_size]
+        return
+    after = 0
+    while True:
+        with bind.connect() as connection:
+            chunk = connection.execute(
+                select(User.id).where(User.id > after).order_by(User.id).limit(chunk_size)
+            ).scalars().all()
+        if not chunk:
+            return
+        yield chunk
+        after = chunk[-1]
+
+def compute_aggregates(connection: Connection, user_ids: List[int], start: date, end: date) -> Dict[int, Dict]:
+    """
+    Mood, sentiment, journaling and habit aggregates for a chunk of users
+    over [start, end], in three statements whatever the chunk size. The
+    daily rollups also cover the previous period of the same length, for
+    the change figures.
+    """
+    previous_start = start - (end - start) - timedelta(days=1)
+    reports = {
+        user_id: {"daily": {metric: {} for metric in ALL_METRICS}, "previous": {}, "journal_entries": 0, "habits": []}
+        for user_id in user_ids
+    }
+
+    previous: Dict[Tuple[int, str], List[float]] = {}
+    for user_id, day, metric, count, value_sum in connection.execute(
+        select(DailyUserStat.user_id, DailyUserStat.day, DailyUserStat.metric, DailyUserStat.count,
+               DailyUserStat.value_sum)
+        .where(DailyUserStat.user_id.in_(user_ids), DailyUserStat.day.between(previous_start, end))
+    ):
+        if day >= start:
+            reports[user_id]["daily"][metric][day] = (count, value_sum)
+        else:
+            totals = previous.setdefault((user_id, metric), [0, 0.0])
+            totals[0] += count
+            totals[1] += value_sum
+    for (user_id, metric), (count, value_sum) in previous.items():
+        if count:
+            reports[user_id]["previous"][metric] = value_sum / count
+
+    for user_id, entries in connection.execute(
+        select(JournalEntry.user_id, func.count())
+        .where(JournalEntry.user_id.in_(user_ids),
+               JournalEntry.created_at >= datetime.combine(start, datetime.min.time()),
+               JournalEntry.created_at < datetime.combine(end + timedelta(days=1), datetime.min.time()))
+        .group_by(JournalEntry.user_id)
+    ):
+        reports[user_id]["journal_entries"] = entries
+
+    for user_id, habit_id, habit_name, logged, completed in connection.execute(
+        select(HabitLog.user_id, HabitLog.habit_id, Habit.habit_name, func.count(),
+               func.sum(case((HabitLog.completed, 1), else_=0)))
+        .join(Habit, Habit.id == HabitLog.habit_id)
+        .where(HabitLog.user_id.in_(user_ids), HabitLog.logged_on.between(start, end))
+        .group_by(HabitLog.user_id, HabitLog.habit_id, Habit.habit_name)
+    ):
+        reports[user_id]["habits"].append(
+            {"habit_id": habit_id, "habit_name": habit_name, "logged": logged, "completed": int(completed or 0)}
+        )
+
+    return {user_id: _summarize(report, start, end) for user_id, report in reports.items()}
+
+def _summarize(report: Dict, start: date, end: date) -> Dict:
+    metrics = {}
+    series = {}
+    for metric, days in report["daily"].items():
+        count = sum(day_count for day_count, _ in days.values())
+        mean = sum(value_sum for _, value_sum in days.values()) / count if count else None
+        previous = report["previous"].get(metric)
+        metrics[metric] = {
+            "count": count,
+            "mean": round(mean, 3) if mean is not None else None,
+            "change": round(mean - previous, 3) if mean is not None and previous is not None else None,
+        }
+        series[metric] = [
+            [day.isoformat(), round(value_sum / day_count, 3)]
+            for day, (day_count, value_sum) in sorted(days.items()) if day_count
+        ]
+    habits = sorted(report["habits"], key=lambda habit: (-habit["completed"], habit["habit_name"] or ""))
+    return {
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "journal_entries": report["journal_entries"],
+        "check_ins": metrics["mood"]["count"],
+        "metrics": metrics,
+        "series": series,
+        "habits": habits,
+    }
+
+def _png(figure: Figure) -> bytes:
+    buffer = BytesIO()
+    # Margins are fixed per chart; bbox_inches="tight" or a layout engine would draw every figure twice
+    figure.savefig(buffer, format="png", dpi=100)
+    return buffer.getvalue()
+
+def render_charts(summary: Dict) -> Dict[str, bytes]:
+    """
+    PNG charts for a report. Figures are built without pyplot, so rendering
+    needs no display and keeps no global state between users.
+    """
+    charts = {}
+    if any(summary["series"][metric] for metric in CHECK_IN_METRICS):
+        figure = Figure(figsize=(8, 3.5))
+        figure.subplots_adjust(left=0.07, right=0.98, top=0.9, bottom=0.2)
+        axes = figure.subplots()
+        for metric in CHECK_IN_METRICS:
+            points = summary["series"][metric]
+            if points:
+                axes.plot([date.fromisoformat(day) for day, _ in points], [value for _, value in points],
+                          marker="o", markersize=3, label=metric)
+        axes.set_ylim(0, 10.5)
+        axes.set_title(f"Check-ins, {summary['start']} to {summary['end']}")
+        axes.legend(loc="upper left")
+        figure.autofmt_xdate()
+        charts["mood"] = _png(figure)
+
+    habits = summary["habits"][:TOP_HABITS]
+    if habits:
+        height = 0.4 * len(habits) + 1.2
+        figure = Figure(figsize=(8, height))
+        # Half an inch for the title and for the axis labels, whatever the height
+        figure.subplots_adjust(left=0.25, right=0.98, top=1 - 0.45 / height, bottom=0.5 / height)
+        axes = figure.subplots()
+        names = [habit["habit_name"] or f"habit {habit['habit_id']}" for habit in reversed(habits)]
+        axes.barh(names, [habit["logged"] for habit in reversed(habits)], color="#d9d9d9", label="logged")
+        axes.barh(names, [habit["completed"] for habit in reversed(habits)], color="#4c72b0", label="completed")
+        axes.set_title("Habit completions")
+        axes.legend(loc="lower right")
+        charts["habits"] = _png(figure)
+    return charts
+
+def store_reports(connection: Connection, period: str, start: date, end: date, reports: Dict[int, Tuple[Dict, Dict[str, bytes]]]) -> None:
+    """Replaces the chunk's reports for the period, so reruns are idempotent."""
+    user_ids = list(reports)
+    existing = select(ReviewReport.id).where(
+        ReviewReport.user_id.in_(user_ids), ReviewReport.period == period, ReviewReport.period_start == start
+    )
+    connection.execute(delete(ReviewReportChart).where(ReviewReportChart.report_id.in_(existing)))
+    connection.execute(delete(ReviewReport).where(
+        ReviewReport.user_id.in_(user_ids), ReviewReport.period == period, ReviewReport.period_start == start
+    ))
+
+    now = datetime.utcnow()
+    charts = []
+    for user_id, (summary, pngs) in reports.items():
+        report_id = connection.execute(
+            ReviewReport.__table__.insert().values(
+                user_id=user_id, period=period, period_start=start, period_end=end,
+                summary=json.dumps(summary), generated_at=now
+            )
+        ).inserted_primary_key[0]
+        charts.extend({"report_id": report_id, "name": name, "png": png} for name, png in pngs.items())
+    if charts:
+        connection.execute(ReviewReportChart.__table__.insert(), charts)
+
+def build_reports(bind: Engine, user_ids: List[int], period: str, start: date, end: date) -> int:
+    """Aggregates, renders and stores one chunk's reports."""
+    with bind.connect() as connection:
+        summaries = compute_aggregates(connection, user_ids, start, end)
+    reports = {user_id: (summary, render_charts(summary)) for user_id, summary in summaries.items()}
+    with bind.begin() as connection:
+        store_reports(connection, period, start, end, reports)
+    return len(reports)
+
+# One engine per worker process, created on its first chunk
+_worker_engine: Optional[Engine] = None
+
+def build_chunk(database_url: str, user_ids: List[int], period: str, start: date, end: date) -> int:
+    """build_reports in a worker process, which cannot share the parent's connections."""
+    global _worker_engine
+    if _worker_engine is None:
+        _worker_engine = create_engine(database_url)
+    return build_reports(_worker_engine, user_ids, period, start, end)
+
+def generate_reports(
+    period: str,
+    start: date,
+    end: date,
+    bind: Engine = engine,
+    chunk_size: int = REPORT_CHUNK_SIZE,
+    workers: int = REPORT_WORKERS,
+    user_ids: Optional[List[int]] = None
+) -> Dict:
+    """
+    Builds every user's review for a period. Chunks of users are spread over
+    a process pool, and each worker holds at most one connection at a time,
+    so the database sees at most `workers` concurrent report queries.
+    """
+    started = time.perf_counter()
+    generated = chunks = 0
+    if workers > 1:
+        database_url = bind.url.render_as_string(hide_password=False)
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(build_chunk, database_url, chunk, period, start, end)
+                for chunk in user_chunks(bind, chunk_size, user_ids)
+            ]
+            for future in futures:
+                generated += future.result()
+                chunks += 1
+                logger.info(f"{period} reports from {start}: {generated} users done")
+    else:
+        for chunk in user_chunks(bind, chunk_size, user_ids):
+            generated += build_reports(bind, chunk, period, start, end)
+            chunks += 1
+    return {
+        "period": period,
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "users": generated,
+        "chunks": chunks,
+        "elapsed_seconds": round(time.perf_counter() - started, 3),
+    }
+
+def scheduled_reports(today: Optional[date] = None, **options) -> List[Dict]:
+    """
+    Scheduler hook, meant to run daily: on the first day of a month or
+    quarter, generates the reports for the period that just ended.
+    """
+    today = today or datetime.utcnow().date()
+    results = []
+    for period in PERIODS:
+        if period_bounds(period, today)[0] == today:
+            start, end = last_complete_period(period, today)
+            results.append(generate_reports(period, start, end, **options))
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Precompute monthly and quarterly review reports")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    generate = subcommands.add_parser("generate", help="Build reports for one period")
+    generate.add_argument("--period", choices=PERIODS, default="month")
+    generate.add_argument("--date", type=date.fromisoformat,
+                          help="A day inside the period (default: the last complete period)")
+    generate.add_argument("--user-id", type=int, action="append", help="Only build this user's report")
+    scheduled = subcommands.add_parser("scheduled", help="Build whatever periods ended yesterday (run daily)")
+    for subcommand in (generate, scheduled):
+        subcommand.add_argument("--chunk-size", type=int, default=REPORT_CHUNK_SIZE)
+        subcommand.add_argument("--workers", type=int, default=REPORT_WORKERS)
+    args = parser.parse_args()
+
+    options = {"chunk_size": args.chunk_size, "workers": args.workers}
+    if args.command == "generate":
+        if args.date:
+            start, end = period_bounds(args.period, args.date)
+        else:
+            start, end = last_complete_period(args.period, datetime.utcnow().date())
+        results = [generate_reports(args.period, start, end, user_ids=args.user_id, **options)]
+    else:
+        results = scheduled_reports(**options)
+    print(json.dumps({"status": "success", "reports": results}, indent=2))
@@ -0,0 +1,55 @@
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from datetime import date
+from typing import Optional
+import json
+
+from database.database import get_db
+from database.models import ReviewReport, ReviewReportChart
+from reports.pipeline import PERIODS
+
+router = APIRouter()
+
+@router.get("/reviews")
+def read_review(
+    user_id: int,
+    period: str = "month",
+    start: Optional[date] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    A precomputed monthly or quarterly review: the newest one, or the one
+    starting on start. Reports are built by the batch pipeline, never here.
+    """
+    if period not in PERIODS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Unknown period: {period}")
+
+    query = select(ReviewReport).where(ReviewReport.user_id == user_id, ReviewReport.period == period)
+    if start is not None:
+        query = query.where(ReviewReport.period_start == start)
+    report = db.execute(query.order_by(ReviewReport.period_start.desc()).limit(1)).scalar_one_or_none()
+    if report is None:
+        raise HTTPException(status_code=404, detail="Review not generated yet")
+
+    charts = db.execute(
+        select(ReviewReportChart.name).where(ReviewReportChart.report_id == report.id).order_by(ReviewReportChart.name)
+    ).scalars().all()
+    return {
+        "id": report.id,
+        "user_id": report.user_id,
+        "period": report.period,
+        "generated_at": report.generated_at,
+        **json.loads(report.summary),
+        "charts": {name: f"/reviews/{report.id}/charts/{name}.png" for name in charts},
+    }
+
+@router.get("/reviews/{report_id}/charts/{name}.png")
+def read_review_chart(report_id: int, name: str, db: Session = Depends(get_db)):
+    """A rendered chart from a review, served as stored."""
+    png = db.execute(
+        select(ReviewReportChart.png).where(ReviewReportChart.report_id == report_id, ReviewReportChart.name == name)
+    ).scalar_one_or_none()
+    if png is None:
+        raise HTTPException(status_code=404, detail="Chart not found")
+    return Response(png, media_type="image/png")
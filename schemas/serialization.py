@@ -0,0 +1,52 @@
+from typing import Any, Dict, List, Optional, Type
+from fastapi import Response
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, TypeAdapter
+import orjson
+import os
+
+from schemas.validation import CheckInResponse, HabitResponse, JournalEntryResponse
+
+# Opt-in: listings skip per-item model construction and jsonable_encoder
+FAST_JSON_ENABLED = os.getenv("FAST_JSON_ENABLED", "false").lower() in ("1", "true", "yes")
+
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson, for payloads that are already plain dicts and lists."""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=ORJSON_OPTIONS)
+
+# Built once at import; building a TypeAdapter compiles its validator and serializer
+LIST_ADAPTERS: Dict[Type[BaseModel], TypeAdapter] = {
+    model: TypeAdapter(List[model])
+    for model in (JournalEntryResponse, HabitResponse, CheckInResponse)
+}
+
+def list_adapter(model: Type[BaseModel]) -> TypeAdapter:
+    # Not built on demand: a model missing here is one the endpoints should not be passing
+    adapter = LIST_ADAPTERS.get(model)
+    if adapter is None:
+        raise ValueError(f"No precompiled list adapter for {model.__module__}.{model.__name__}")
+    return adapter
+
+def dump_list(model: Type[BaseModel], rows: List[Dict]) -> bytes:
+    """
+    Validates plain row dicts against a response model and serializes them
+    in one pass through pydantic-core, without building a model per row in
+    Python or walking the result with jsonable_encoder.
+    """
+    adapter = list_adapter(model)
+    return adapter.dump_json(adapter.validate_python(rows))
+
+def list_response(model: Type[BaseModel], rows: List[Dict], response: Optional[Response] = None) -> Response:
+    """
+    A listing as a ready-made JSON response. Headers already set on the
+    endpoint's injected response (ETag, Last-Modified) are carried over,
+    since FastAPI only merges them into responses it builds itself.
+    """
+    headers = None
+    if response is not None:
+        headers = {name: value for name, value in response.headers.items() if name != "content-length"}
+    return Response(content=dump_list(model, rows), media_type="application/json", headers=headers)
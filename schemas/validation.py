@@ -1,6 +1,6 @@
 from pydantic import BaseModel, Field, EmailStr
 from typing import Optional
-from datetime import datetime
+from datetime import date, datetime
 
 class UserBase(BaseModel):
     """Base schema for user data."""
@@ -22,6 +22,13 @@ class HabitCreate(BaseModel):
     habit_name: str = Field(..., min_length=1, max_length=100)
     frequency: str = Field(..., pattern='^(daily|weekly|monthly)$')
     description: Optional[str] = Field(None, max_length=500)
+    target_days: Optional[list[str]] = None  # e.g. ["Monday", "Friday"] for weekly habits
+
+class HabitLogCreate(BaseModel):
+    """Schema for logging a habit completion (or miss)."""
+    logged_on: Optional[date] = None  # defaults to today
+    completed: bool = True
+    notes: Optional[str] = Field(None, max_length=500)
 
 class CheckInCreate(BaseModel):
     """Schema for creating a well-being check-in."""
@@ -41,6 +48,18 @@ class JournalEntryResponse(JournalEntryCreate):
     class Config:
         from_attributes = True
 
+class StoredJournalEntryResponse(BaseModel):
+    """Schema for a journal entry as stored, for the endpoints addressed by user id."""
+    id: int
+    entry_text: str
+    sentiment_score: float
+    mood: str
+    ai_reflection: Optional[str]
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
 class HabitResponse(HabitCreate):
     """Schema for habit response."""
     id: int
@@ -52,11 +71,20 @@ class HabitResponse(HabitCreate):
     class Config:
         from_attributes = True
 
+class HabitLogResponse(HabitLogCreate):
+    """Schema for habit log response, with the habit's updated streak."""
+    id: Optional[int]
+    habit_id: int
+    current_streak: int
+    best_streak: int
+    last_completed_on: Optional[date]
+
 class CheckInResponse(CheckInCreate):
     """Schema for check-in response."""
-    id: int
+    id: Optional[int]  # None when acknowledged before the group commit flushes
     user_id: str
     created_at: datetime
+    alerts: dict[str, str] = {}  # metric -> "change" or "distress" from online statistics
     
     class Config:
         from_attributes = True
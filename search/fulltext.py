@@ -0,0 +1,271 @@
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+from sqlalchemy import Float, column, select, text
+from sqlalchemy.engine import Connection, Engine
+import argparse
+import json
+import logging
+import re
+import threading
+
+from database.database import engine
+from database.hooks import PREVIOUS, on_change, on_insert
+from database.models import JournalEntry
+
+logger = logging.getLogger(__name__)
+
+TS_CONFIG = "english"
+FTS_TABLE = "journal_entries_fts"
+PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+SNIPPET_CHARS = 160
+REBUILD_BATCH = 1000
+
+# Idempotent DDL per backend; also run by the migration
+SCHEMA = {
+    "postgresql": [
+        "ALTER TABLE journal_entries ADD COLUMN IF NOT EXISTS search_vector tsvector",
+        "CREATE INDEX IF NOT EXISTS ix_journal_entries_search_vector ON journal_entries USING GIN (search_vector)",
+        "CREATE INDEX IF NOT EXISTS ix_journal_entries_user_id_created_at ON journal_entries (user_id, created_at)",
+    ],
+    "sqlite": [
+        # Contentless: the text lives in journal_entries, FTS5 keeps only the index, keyed by entry id
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(entry_text, content='', tokenize='porter unicode61')",
+        "CREATE INDEX IF NOT EXISTS ix_journal_entries_user_id_created_at ON journal_entries (user_id, created_at)",
+    ],
+}
+
+_ready = set()
+_ready_lock = threading.Lock()
+_unsupported_logged = set()
+
+def _dialect(connection: Connection) -> str:
+    name = connection.dialect.name
+    if name not in SCHEMA:
+        raise NotImplementedError(f"Full-text search is not supported on {name}")
+    return name
+
+def _indexable(connection: Connection) -> bool:
+    """
+    Whether the write hooks can index on this backend. Elsewhere they skip,
+    logging once per backend, so writes never fail over the search index.
+    """
+    name = connection.dialect.name
+    if name in SCHEMA:
+        return True
+    if name not in _unsupported_logged:
+        _unsupported_logged.add(name)
+        logger.warning(f"Full-text search is not supported on {name}; journal entries will not be indexed")
+    return False
+
+# Whether the search column/table already exists, per backend
+SCHEMA_CHECK = {
+    "postgresql": "SELECT 1 FROM information_schema.columns "
+                  "WHERE table_name = 'journal_entries' AND column_name = 'search_vector'",
+    "sqlite": f"SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = '{FTS_TABLE}'",
+}
+
+def ensure_search_schema(connection: Connection) -> None:
+    """
+    Creates the search column/table and indexes if the migration has not.
+    Only remembered once seen to exist, since DDL run inside a transaction
+    that later rolls back is undone.
+    """
+    key = str(connection.engine.url)
+    if key in _ready:
+        return
+    dialect = _dialect(connection)
+    if connection.execute(text(SCHEMA_CHECK[dialect])).first():
+        with _ready_lock:
+            _ready.add(key)
+        return
+    for statement in SCHEMA[dialect]:
+        connection.execute(text(statement))
+
+def index_rows(connection: Connection, rows: List[Dict]) -> None:
+    """Adds entries to the search index; rows need id and the plain entry_text."""
+    rows = [{"id": row["id"], "text": row.get("entry_text") or ""} for row in rows if row.get("id") is not None]
+    if not rows:
+        return
+    ensure_search_schema(connection)
+    if _dialect(connection) == "postgresql":
+        connection.execute(
+            text(f"UPDATE journal_entries SET search_vector = to_tsvector('{TS_CONFIG}', :text) WHERE id = :id"),
+            rows
+        )
+    else:
+        connection.execute(text(f"INSERT INTO {FTS_TABLE} (rowid, entry_text) VALUES (:id, :text)"), rows)
+
+def unindex_rows(connection: Connection, rows: List[Dict]) -> None:
+    """
+    Removes entries from the search index; rows need id and the entry_text
+    they were indexed with, as a contentless FTS5 table can only drop terms
+    it is given. On PostgreSQL the vector goes with the row.
+    """
+    rows = [{"id": row["id"], "text": row.get("entry_text") or ""} for row in rows if row.get("id") is not None]
+    if not rows:
+        return
+    ensure_search_schema(connection)
+    if _dialect(connection) == "sqlite":
+        connection.execute(
+            text(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rowid, entry_text) VALUES ('delete', :id, :text)"),
+            rows
+        )
+
+@on_insert("journal_entries")
+def index_journal_entries(connection: Connection, rows: List[Dict]) -> None:
+    # Indexed from the inserted values rather than by a trigger, so the index
+    # does not depend on how entry_text is stored
+    if _indexable(connection):
+        index_rows(connection, rows)
+
+@on_change("journal_entries", "update")
+def reindex_journal_entries(connection: Connection, rows: List[Dict]) -> None:
+    # Only edits to the text move the index
+    rows = [row for row in rows if "entry_text" in row.get(PREVIOUS, {})]
+    if not rows or not _indexable(connection):
+        return
+    unindex_rows(connection, [{"id": row["id"], "entry_text": row[PREVIOUS]["entry_text"]} for row in rows])
+    index_rows(connection, rows)
+
+@on_change("journal_entries", "delete")
+def unindex_journal_entries(connection: Connection, rows: List[Dict]) -> None:
+    # Otherwise SQLite hands the rowid, terms and all, to the next entry
+    if _indexable(connection):
+        unindex_rows(connection, rows)
+
+def _terms(query: str) -> List[str]:
+    return re.findall(r"\w+", query.lower())
+
+def fts5_query(query: str) -> str:
+    """
+    Quotes each term so user input cannot inject FTS5 syntax. Terms are
+    ANDed, except around a bare "or", like websearch_to_tsquery.
+    """
+    parts: List[str] = []
+    for term in _terms(query):
+        if term == "or":
+            if parts and parts[-1] != "OR":
+                parts.append("OR")
+            continue
+        parts.append('"' + term.replace('"', '""') + '"')
+    if parts and parts[-1] == "OR":
+        parts.pop()
+    return " ".join(parts)
+
+def snippet(entry_text: str, query: str, width: int = SNIPPET_CHARS) -> str:
+    """The part of the entry around the first matching term, with terms marked."""
+    entry_text = entry_text or ""
+    terms = _terms(query)
+    pattern = re.compile(r"\b(" + "|".join(re.escape(term) for term in terms) + r")\w*", re.IGNORECASE) if terms else None
+    match = pattern.search(entry_text) if pattern else None
+    start = max(match.start() - width // 3, 0) if match else 0
+    excerpt = entry_text[start:start + width]
+    if pattern:
+        excerpt = pattern.sub(lambda m: f"**{m.group(0)}**", excerpt)
+    return ("…" if start else "") + excerpt + ("…" if start + width < len(entry_text) else "")
+
+def search_journal(
+    connection: Connection,
+    user_id: int,
+    query: str,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    page: int = 1,
+    page_size: int = PAGE_SIZE
+) -> Dict:
+    """Ranked, paginated matches for one user's entries, optionally within a date range."""
+    page = max(page, 1)
+    page_size = min(max(page_size, 1), MAX_PAGE_SIZE)
+    result = {"query": query, "page": page, "page_size": page_size, "total": 0, "results": []}
+    if not [term for term in _terms(query) if term != "or"]:
+        return result
+
+    ensure_search_schema(connection)
+    params = {
+        "user_id": user_id,
+        "start": datetime.combine(start, datetime.min.time()) if start else None,
+        "end": datetime.combine(end + timedelta(days=1), datetime.min.time()) if end else None,
+        "limit": page_size,
+        "offset": (page - 1) * page_size,
+    }
+    filters = "e.user_id = :user_id"
+    if start:
+        filters += " AND e.created_at >= :start"
+    if end:
+        filters += " AND e.created_at < :end"
+
+    if _dialect(connection) == "postgresql":
+        params["query"] = query
+        source = (
+            f"FROM journal_entries e, websearch_to_tsquery('{TS_CONFIG}', :query) q "
+            f"WHERE {filters} AND e.search_vector @@ q"
+        )
+        rank = "ts_rank_cd(e.search_vector, q)"
+    else:
+        params["query"] = fts5_query(query)
+        source = (
+            f"FROM {FTS_TABLE} f JOIN journal_entries e ON e.id = f.rowid "
+            f"WHERE {FTS_TABLE} MATCH :query AND {filters}"
+        )
+        rank = f"-bm25({FTS_TABLE})"  # bm25 is lower-is-better
+
+    result["total"] = connection.execute(text(f"SELECT count(*) {source}"), params).scalar()
+    entries = JournalEntry.__table__.c
+    rows = connection.execute(text(
+        f"SELECT e.id, e.entry_text, e.mood, e.created_at, {rank} AS rank {source} "
+        f"ORDER BY rank DESC, e.created_at DESC LIMIT :limit OFFSET :offset"
+    ).columns(
+        # Typed so values go through the model's column types
+        entries.id, entries.entry_text, entries.mood, entries.created_at, column("rank", Float)
+    ), params).all()
+    result["results"] = [
+        {
+            "id": row.id,
+            "created_at": row.created_at,
+            "mood": row.mood,
+            "rank": round(float(row.rank), 6),
+            "snippet": snippet(row.entry_text, query),
+        }
+        for row in rows
+    ]
+    return result
+
+def rebuild_search_index(bind: Engine = engine, user_id: Optional[int] = None) -> int:
+    """Re-indexes existing entries in batches, for one user or everyone."""
+    indexed = 0
+    with bind.begin() as connection:
+        ensure_search_schema(connection)
+        if _dialect(connection) == "sqlite":
+            if user_id is not None:
+                raise ValueError("A contentless FTS5 index can only be rebuilt for all users")
+            connection.execute(text(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('delete-all')"))
+        last_id = 0
+        while True:
+            query = (
+                select(JournalEntry.id, JournalEntry.entry_text)
+                .where(JournalEntry.id > last_id)
+                .order_by(JournalEntry.id)
+                .limit(REBUILD_BATCH)
+            )
+            if user_id is not None:
+                query = query.where(JournalEntry.user_id == user_id)
+            batch = connection.execute(query).all()
+            if not batch:
+                break
+            index_rows(connection, [{"id": row.id, "entry_text": row.entry_text} for row in batch])
+            indexed += len(batch)
+            last_id = batch[-1].id
+    return indexed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintain the journal full-text search index")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    rebuild = subcommands.add_parser("rebuild", help="Re-index existing journal entries")
+    rebuild.add_argument("--user-id", type=int, help="Only re-index this user's entries (PostgreSQL)")
+    args = parser.parse_args()
+
+    if args.command == "rebuild":
+        indexed = rebuild_search_index(user_id=args.user_id)
+        print(json.dumps({"status": "success", "indexed": indexed}))
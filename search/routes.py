@@ -0,0 +1,27 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from datetime import date
+from typing import Optional
+
+from database.database import get_db
+from database.models import User
+from search.fulltext import PAGE_SIZE, search_journal
+
+router = APIRouter()
+
+@router.get("/journal/search")
+def search_journal_entries(
+    user_id: int,
+    q: str,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    page: int = 1,
+    page_size: int = PAGE_SIZE,
+    db: Session = Depends(get_db)
+):
+    """Ranked full-text search over a user's journal entries, optionally within a date range."""
+    user = db.query(User).filter(User.id == user_id).first()
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    return {"user_id": user.id, **search_journal(db.connection(), user.id, q, start, end, page, page_size)}
@@ -0,0 +1,157 @@
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Tuple
+from sqlalchemy import and_, delete, exists, select
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import aliased
+import argparse
+import json
+
+from database.database import engine
+from database.hooks import on_change, on_insert
+from database.models import ChangeLogEntry, CheckIn, Habit, HabitLog, JournalEntry, SyncSequence
+from database.upsert import upsert
+
+SYNC_PAGE_SIZE = 500
+MAX_SYNC_PAGE_SIZE = 5000
+
+# Synced collections and the fields clients receive
+SYNC_COLLECTIONS = {
+    "journal_entries": (JournalEntry, ("id", "entry_text", "sentiment_score", "mood", "ai_reflection", "created_at")),
+    "habits": (Habit, ("id", "habit_name", "frequency", "target_days", "streak", "best_streak",
+                       "last_completed_on", "last_logged", "created_at")),
+    "habit_logs": (HabitLog, ("id", "habit_id", "logged_on", "completed", "notes", "created_at")),
+    "check_ins": (CheckIn, ("id", "mood", "energy", "stress", "notes", "created_at")),
+}
+
+Change = Tuple[int, str, int, str]  # (user_id, collection, row_id, operation)
+
+def record_changes(connection: Connection, changes: Iterable[Change]) -> None:
+    """
+    Appends changes to the log under each user's next sequence numbers.
+    Allocating them locks the user's sync_sequences row until commit, so a
+    user's changes become visible in sequence order and a client that has
+    read up to seq N can never miss a later commit with a lower number.
+    """
+    by_user: Dict[int, List[Change]] = {}
+    for change in changes:
+        if change[0] is not None and change[2] is not None:
+            by_user.setdefault(change[0], []).append(change)
+    if not by_user:
+        return
+
+    sequences = SyncSequence.__table__
+    now = datetime.utcnow()
+    log_rows = []
+    for user_id in sorted(by_user):
+        user_changes = by_user[user_id]
+        (last_seq,), = upsert(
+            connection, sequences, [{"user_id": user_id, "last_seq": len(user_changes)}],
+            index_elements=("user_id",),
+            update=lambda excluded: {"last_seq": sequences.c.last_seq + excluded.last_seq},
+            returning=(sequences.c.last_seq,)
+        )
+        first = last_seq - len(user_changes) + 1
+        log_rows.extend(
+            {"user_id": user_id, "seq": first + offset, "collection": collection,
+             "row_id": row_id, "operation": operation, "changed_at": now}
+            for offset, (_, collection, row_id, operation) in enumerate(user_changes)
+        )
+    connection.execute(ChangeLogEntry.__table__.insert(), log_rows)
+
+def _recorder(collection: str, operation: str):
+    def record(connection: Connection, rows: List[Dict]) -> None:
+        record_changes(connection, [(row.get("user_id"), collection, row.get("id"), operation) for row in rows])
+    return record
+
+# Every write path reports inserts; ORM flushes also report updates and deletes
+for _collection in SYNC_COLLECTIONS:
+    on_insert(_collection)(_recorder(_collection, "upsert"))
+    on_change(_collection, "update")(_recorder(_collection, "upsert"))
+    on_change(_collection, "delete")(_recorder(_collection, "delete"))
+
+@on_insert("habit_logs")
+@on_change("habit_logs", "update")
+def record_habit_streaks(connection: Connection, rows: List[Dict]) -> None:
+    # The streak hooks rewrite the habit with a Core UPDATE, which on_change does not see
+    record_changes(connection, {(row.get("user_id"), "habits", row.get("habit_id"), "upsert") for row in rows})
+
+def _serialize(row, fields: Tuple[str, ...]) -> Dict:
+    values = {field: getattr(row, field) for field in fields}
+    if "target_days" in values:
+        values["target_days"] = values["target_days"].split(",") if values["target_days"] else None
+    return values
+
+def read_changes(connection, user_id: int, since: int = 0, limit: int = SYNC_PAGE_SIZE) -> Dict:
+    """
+    Changes to a user's collections after sequence since: current rows for
+    everything created or updated, ids for everything deleted. Follow
+    next_token while has_more is set; since=0 returns the full history.
+    """
+    limit = min(max(limit, 1), MAX_SYNC_PAGE_SIZE)
+    log = connection.execute(
+        select(ChangeLogEntry.seq, ChangeLogEntry.collection, ChangeLogEntry.row_id, ChangeLogEntry.operation)
+        .where(ChangeLogEntry.user_id == user_id, ChangeLogEntry.seq > since)
+        .order_by(ChangeLogEntry.seq)
+        .limit(limit + 1)
+    ).all()
+    has_more = len(log) > limit
+    log = log[:limit]
+
+    # Only the latest operation on a row within the page matters
+    latest: Dict[Tuple[str, int], str] = {}
+    for entry in log:
+        latest[(entry.collection, entry.row_id)] = entry.operation
+
+    changes: Dict[str, List[Dict]] = {}
+    deleted: Dict[str, List[int]] = {}
+    for collection, (model, fields) in SYNC_COLLECTIONS.items():
+        upserted = [row_id for (name, row_id), operation in latest.items() if name == collection and operation == "upsert"]
+        removed = {row_id for (name, row_id), operation in latest.items() if name == collection and operation == "delete"}
+        if upserted:
+            rows = connection.execute(
+                select(*(getattr(model, field) for field in fields))
+                .where(model.id.in_(upserted), model.user_id == user_id)
+                .order_by(model.id)
+            ).all()
+            changes[collection] = [_serialize(row, fields) for row in rows]
+            # Deleted after this page's entry; the tombstone is sent now
+            removed |= set(upserted) - {row.id for row in rows}
+        if removed:
+            deleted[collection] = sorted(removed)
+
+    return {
+        "next_token": str(log[-1].seq if log else since),
+        "has_more": has_more,
+        "changes": changes,
+        "deleted": deleted,
+    }
+
+def compact_change_log(bind: Engine = engine) -> int:
+    """Drops log entries superseded by a later change to the same row; tokens stay valid."""
+    later = aliased(ChangeLogEntry)
+    with bind.begin() as connection:
+        return connection.execute(
+            delete(ChangeLogEntry).where(exists().where(and_(
+                later.user_id == ChangeLogEntry.user_id,
+                later.collection == ChangeLogEntry.collection,
+                later.row_id == ChangeLogEntry.row_id,
+                later.seq > ChangeLogEntry.seq,
+            )))
+        ).rowcount
+
+def encode_value(value):
+    """msgpack default hook for the types sync payloads contain."""
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"Cannot encode {type(value).__name__}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintain the sync change log")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    subcommands.add_parser("compact", help="Remove change log entries superseded by later changes")
+    args = parser.parse_args()
+
+    if args.command == "compact":
+        removed = compact_change_log()
+        print(json.dumps({"status": "success", "removed": removed}))
@@ -0,0 +1,41 @@
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from sqlalchemy.orm import Session
+from typing import Optional
+import msgpack
+
+from database.database import get_db
+from database.models import User
+from schemas.serialization import FAST_JSON_ENABLED, FastJSONResponse
+from sync.changes import SYNC_PAGE_SIZE, encode_value, read_changes
+
+router = APIRouter()
+
+MSGPACK_TYPES = ("application/msgpack", "application/x-msgpack")
+
+@router.get("/sync")
+def read_sync(
+    request: Request,
+    user_id: int,
+    since: str = "0",
+    limit: int = SYNC_PAGE_SIZE,
+    format: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Journal entries, habits, habit logs and check-ins changed since a sync
+    token, with tombstones for deletions. Send format=msgpack (or Accept:
+    application/msgpack) for a compact binary body.
+    """
+    user = db.query(User).filter(User.id == user_id).first()
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    if not since.isdigit():
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid sync token")
+
+    result = {"user_id": user.id, **read_changes(db, user.id, int(since), limit)}
+    accept = request.headers.get("accept", "")
+    if format == "msgpack" or any(media_type in accept for media_type in MSGPACK_TYPES):
+        return Response(msgpack.packb(result, default=encode_value), media_type=MSGPACK_TYPES[0])
+    if FAST_JSON_ENABLED:
+        return FastJSONResponse(result)
+    return result